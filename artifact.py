@@ -0,0 +1,391 @@
+# Precompiled v3 programs
+# compile() parses and validates a program, the way Interpreter.load does, and writes
+# the result to an artifact file: its struct definitions and function table, and every
+# node of their ASTs along with what load annotated them with. Interpreter.run_artifact
+# runs one without the source or the parser. The loader memory-maps the file and only
+# reads what a run needs: the struct definitions up front, and a function's nodes when
+# it is first called, so functions that are never called cost nothing.
+#
+# Layout: a header (magic, format version, the number of node ids the nodes use, and a
+# digest of the grammar's signature, so that artifacts built for another grammar are
+# refused), a table of section offsets, then the sections, each aligned to 8 bytes:
+#   string offsets, strings   every name, type and string literal once, in UTF-8
+#   ints                      each int literal that fits in 64 bits, once
+#   nodes                     elem_type, line, node id and the node's run of attributes
+#   attributes                key and value of each attribute, each node's together
+#   values, sequences         the items of list and tuple attributes, and where each starts
+#   functions, structs        the function table and the struct definitions, by node
+#   imports                   the import statements of a module (see modules.py)
+# Values are a tag and a payload: a node index, a string index, an index into the ints
+# (or into the strings, for an int that doesn't fit in 64 bits), a bool or a sequence.
+#
+# Node ids are stored counting from the first_node_id given to write and read back
+# counting from the one given to Artifact, so a module's nodes can be numbered after
+# those of the modules linked before it, wherever it comes in the link (see modules.py).
+#
+# usage: python artifact.py build program.br [--output program.brc]
+#        python artifact.py run program.brc [--input file]
+
+import argparse
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+
+import parsetab
+from brewparse import LazyBody, make_lazy, parse_program
+from element import Element
+from intbase import InterpreterBase
+
+MAGIC = b"BREWART\0"
+FORMAT_VERSION = 3
+# format -> its number of sections; 1 is 2 without imports, 2 is 3 without the node id count
+READABLE_FORMATS = {1: 9, 2: 10, 3: 10}
+GRAMMAR_DIGEST = hashlib.sha256(parsetab._lr_signature.encode()).digest()
+
+HEADER = struct.Struct("<8sH2xI32s")  # magic, format, node ids, grammar digest
+SECTIONS = ("string_offsets", "strings", "ints", "nodes", "attributes", "values", "sequences", "functions", "structs",
+            "imports")
+SECTION = struct.Struct("<QQ")  # offset and length
+NODE = struct.Struct("<IiiII")  # elem_type, line (-1 for none), node id (-1 for none), first attribute, attributes
+ATTRIBUTE = struct.Struct("<IB3xq")  # key, tag, payload
+VALUE = struct.Struct("<B7xq")  # tag, payload
+SEQUENCE = struct.Struct("<II")  # first value, values
+FUNCTION = struct.Struct("<III")  # name, arity, node
+STRUCT = struct.Struct("<I")  # node, of a struct definition or an import
+
+# value tags
+NONE = 0
+BOOL = 1
+INT = 2  # index into the ints
+BIG_INT = 3  # index into the strings, of the int in decimal
+STRING = 4
+NODE_REF = 5
+LIST = 6  # index into the sequences
+TUPLE = 7
+
+
+class _Writer:
+    def __init__(self, first_node_id):
+        self.first_node_id = first_node_id
+        self.node_count = 0  # one more than the largest node id written
+        self.strings = {}
+        self.ints = array("q")
+        self.int_ids = {}
+        self.node_ids = {}
+        self.pending = []
+        self.nodes = []
+        self.attributes = []
+        self.values = []
+        self.sequences = []
+
+    def string(self, text):
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+        return index
+
+    def node(self, elem):
+        index = self.node_ids.get(id(elem))
+        if index is None:
+            index = self.node_ids[id(elem)] = len(self.node_ids)
+            self.pending.append(elem)
+        return index
+
+    # every node reachable from those given so far, in the order they were numbered
+    def write_nodes(self):
+        written = 0
+        while written < len(self.pending):
+            elem = self.pending[written]
+            written += 1
+            first = len(self.attributes)
+            for key, value in elem.dict.items():
+                self.attributes.append((self.string(key),) + self.value(value))
+            node_id = -1 if elem.node_id is None else elem.node_id - self.first_node_id
+            self.node_count = max(self.node_count, node_id + 1)
+            self.nodes.append((
+                self.string(elem.elem_type),
+                -1 if elem.line_num is None else elem.line_num,
+                node_id,
+                first,
+                len(self.attributes) - first,
+            ))
+
+    def value(self, value):
+        if value is None:
+            return NONE, 0
+        if type(value) is bool:
+            return BOOL, int(value)
+        if type(value) is int:
+            if -2**63 <= value < 2**63:
+                index = self.int_ids.get(value)
+                if index is None:
+                    index = self.int_ids[value] = len(self.ints)
+                    self.ints.append(value)
+                return INT, index
+            return BIG_INT, self.string(str(value))
+        if type(value) is str:
+            return STRING, self.string(value)
+        if isinstance(value, Element):
+            return NODE_REF, self.node(value)
+        if isinstance(value, (list, tuple)):
+            items = [self.value(item) for item in value]
+            self.sequences.append((len(self.values), len(items)))
+            self.values.extend(items)
+            return (LIST if isinstance(value, list) else TUPLE), len(self.sequences) - 1
+        raise TypeError(f"Can't store a {type(value).__name__} in an artifact")
+
+
+# Parse and validate program and write it to path. Errors in the program are raised as
+# they would be by running it
+def compile(program, path):
+    from interpreterv3 import Interpreter
+
+    ast = parse_program(program)
+    if ast.get("imports"):
+        raise ValueError("A program that imports modules can't be compiled on its own")
+    interpreter = Interpreter(console_output=False)
+    interpreter.load(ast)
+    functions = [func_def for overloads in interpreter.func_name_to_ast.values() for func_def in overloads.values()]
+    write(path, ast.get("structs"), functions)
+
+
+# write struct and function definitions and import nodes to an artifact at path, as
+# they are, with node ids stored counting from first_node_id
+def write(path, struct_defs, func_defs, imports=(), first_node_id=0):
+    writer = _Writer(first_node_id)
+    functions = [(writer.string(func_def.get("name")), len(func_def.get("args")), writer.node(func_def))
+                 for func_def in func_defs]
+    structs = [writer.node(struct_def) for struct_def in struct_defs]
+    import_nodes = [writer.node(import_def) for import_def in imports]
+    writer.write_nodes()
+
+    encoded = [text.encode() for text in writer.strings]
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    sections = [
+        offsets.tobytes(),
+        b"".join(encoded),
+        writer.ints.tobytes(),
+        b"".join(NODE.pack(*record) for record in writer.nodes),
+        b"".join(ATTRIBUTE.pack(*record) for record in writer.attributes),
+        b"".join(VALUE.pack(*record) for record in writer.values),
+        b"".join(SEQUENCE.pack(*record) for record in writer.sequences),
+        b"".join(FUNCTION.pack(*record) for record in functions),
+        b"".join(STRUCT.pack(index) for index in structs),
+        b"".join(STRUCT.pack(index) for index in import_nodes),
+    ]
+    offset = HEADER.size + SECTION.size * len(SECTIONS)
+    table = []
+    for data in sections:
+        offset = _aligned(offset)
+        table.append(SECTION.pack(offset, len(data)))
+        offset += len(data)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, writer.node_count, GRAMMAR_DIGEST))
+        file.write(b"".join(table))
+        for data in sections:
+            file.write(b"\0" * (_aligned(file.tell()) - file.tell()))
+            file.write(data)
+
+
+def _aligned(offset):
+    return (offset + 7) & ~7
+
+
+# the statements of a function, read from the artifact when they are first asked for
+class _ArtifactBody(LazyBody):
+    __slots__ = ("artifact", "tag", "payload")
+
+    def __init__(self, artifact, tag, payload):
+        super().__init__()
+        self.artifact = artifact
+        self.tag = tag
+        self.payload = payload
+
+    def statements(self, func_def):
+        return self.artifact.value(self.tag, self.payload)
+
+
+class Artifact:
+    # nodes are read with the ids they were written with, counted from first_node_id
+    def __init__(self, path, first_node_id=0):
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self.map)
+        if len(buffer) < HEADER.size:
+            raise ValueError(f"{path} is not a Brewin artifact")
+        magic, version, node_count, digest = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Brewin artifact")
+        if version not in READABLE_FORMATS:
+            raise ValueError(f"Unsupported artifact format {version}")
+        if digest != GRAMMAR_DIGEST:
+            raise ValueError(f"{path} was built for another version of the grammar")
+        sections = {}
+        for position, name in enumerate(SECTIONS):
+            if position < READABLE_FORMATS[version]:
+                offset, length = SECTION.unpack_from(buffer, HEADER.size + position * SECTION.size)
+                sections[name] = buffer[offset:offset + length]
+            else:
+                sections[name] = memoryview(b"")
+        self.string_offsets = sections["string_offsets"].cast("I")
+        self.string_data = sections["strings"]
+        self.ints = sections["ints"].cast("q")
+        self.sections = sections
+        self.first_node_id = first_node_id
+        if version < 3:
+            node_count = max((node_id + 1 for _, _, node_id, _, _ in NODE.iter_unpack(sections["nodes"])), default=0)
+        self.node_count = node_count  # the node ids used, from first_node_id on
+        self.strings = {}  # index -> str, for those read so far
+        self.elements = {}  # node index -> Element, for those read so far
+
+    def string(self, index):
+        text = self.strings.get(index)
+        if text is None:
+            text = self.strings[index] = str(self.string_data[self.string_offsets[index]:self.string_offsets[index + 1]],
+                                             "utf-8")
+        return text
+
+    # the struct definitions, read now
+    def struct_defs(self):
+        return [self.element(index) for (index,) in STRUCT.iter_unpack(self.sections["structs"])]
+
+    # the import nodes, read now
+    def imports(self):
+        return [self.element(index) for (index,) in STRUCT.iter_unpack(self.sections["imports"])]
+
+    # the function definitions in the order they were written, each with its signature
+    # read now and its statements when they are first asked for (see brewparse.LazyFunction)
+    def func_defs(self):
+        func_defs = []
+        for _, _, index in FUNCTION.iter_unpack(self.sections["functions"]):
+            func_def = self.elements.get(index)
+            if func_def is None:
+                func_def = self.elements[index] = self.__shell(index, Element)
+                body = None
+                for key, tag, payload in self.__attributes(index):
+                    if key == "statements":
+                        body = _ArtifactBody(self, tag, payload)
+                    else:
+                        func_def.dict[key] = self.value(tag, payload)
+                make_lazy(func_def, body)
+            func_defs.append(func_def)
+        return func_defs
+
+    # the function table, as Interpreter keeps it
+    def function_table(self):
+        table = {}
+        for func_def in self.func_defs():
+            table.setdefault(func_def.get("name"), {})[len(func_def.get("args"))] = func_def
+        return table
+
+    # the node at index, with everything below it
+    def element(self, index):
+        pending = []
+        elem = self.__node(index, pending)
+        self.__read(pending)
+        return elem
+
+    # a value stored in the artifact, with any nodes in it read
+    def value(self, tag, payload):
+        pending = []
+        value = self.__value(tag, payload, pending)
+        self.__read(pending)
+        return value
+
+    # read the attributes of the nodes given, and of the nodes below them, which get
+    # shells as they are found; a loop rather than recursion, like the writer's
+    def __read(self, pending):
+        while pending:
+            index = pending.pop()
+            elem_dict = self.elements[index].dict
+            for key, tag, payload in self.__attributes(index):
+                elem_dict[key] = self.__value(tag, payload, pending)
+
+    def __attributes(self, index):
+        _, _, _, first, count = NODE.unpack_from(self.sections["nodes"], index * NODE.size)
+        attributes = self.sections["attributes"]
+        for position in range(first, first + count):
+            key, tag, payload = ATTRIBUTE.unpack_from(attributes, position * ATTRIBUTE.size)
+            yield self.string(key), tag, payload
+
+    # the node at index, read or to be read
+    def __node(self, index, pending):
+        elem = self.elements.get(index)
+        if elem is None:
+            elem = self.elements[index] = self.__shell(index, Element)
+            pending.append(index)
+        return elem
+
+    def __shell(self, index, cls):
+        elem_type, line_num, node_id, _, _ = NODE.unpack_from(self.sections["nodes"], index * NODE.size)
+        elem = cls(self.string(elem_type))
+        elem.line_num = None if line_num < 0 else line_num
+        elem.node_id = None if node_id < 0 else node_id + self.first_node_id
+        return elem
+
+    def __value(self, tag, payload, pending):
+        if tag == NODE_REF:
+            return self.__node(payload, pending)
+        if tag == STRING:
+            return self.string(payload)
+        if tag == INT:
+            return self.ints[payload]
+        if tag == BOOL:
+            return bool(payload)
+        if tag == NONE:
+            return None
+        if tag == BIG_INT:
+            return int(self.string(payload))
+        first, count = SEQUENCE.unpack_from(self.sections["sequences"], payload * SEQUENCE.size)
+        values = self.sections["values"]
+        items = [self.__value(*VALUE.unpack_from(values, position * VALUE.size), pending)
+                 for position in range(first, first + count)]
+        return items if tag == LIST else tuple(items)
+
+
+# set interpreter up to run the program in the artifact at path
+def load(interpreter, path):
+    artifact = Artifact(path)
+    interpreter.load(Element(InterpreterBase.PROGRAM_NODE, structs=artifact.struct_defs(), functions=[]))
+    interpreter.func_name_to_ast = artifact.function_table()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build Brewin v3 programs ahead of time, and run them")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="parse and validate a program and write its artifact")
+    build.add_argument("program", help="source file")
+    build.add_argument("--output", help="artifact to write (default: the program's name with .brc)")
+    run = commands.add_parser("run", help="run an artifact")
+    run.add_argument("artifact")
+    run.add_argument("--input", help="file whose lines are the program's input")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with open(args.program) as file:
+            source = file.read()
+        output = args.output or args.program.rsplit(".", 1)[0] + ".brc"
+        compile(source, output)
+        return 0
+
+    from interpreterv3 import Interpreter
+
+    inp = None
+    if args.input is not None:
+        with open(args.input) as file:
+            inp = file.read().splitlines()
+    interpreter = Interpreter(inp=inp)
+    try:
+        interpreter.run_artifact(args.artifact)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,442 @@
+# Batched lockstep execution of one v3 program over many input lists
+# Batch(program).run(inputs) runs the program once per input list, like N scalar runs,
+# but walks the tree once for all of them: every variable is a NumPy array with one
+# element per lane, and `if`/`for` carry a mask of the lanes executing them.
+#
+# Only main's int and bool arithmetic, if, for, print, inputi and `return;` are run
+# this way. A program using anything else (other functions, structs, strings outside
+# print and prompts) runs entirely on the scalar interpreter, as does every batch when
+# NumPy isn't installed. A lane is evicted, and later re-run from scratch on the scalar
+# interpreter, whenever the vectorised run can't be sure to match it exactly: it reads
+# a variable before assigning it, an int leaves the range where int64 arithmetic can't
+# wrap, it divides by zero, it runs out of (or can't parse) its input, or it is one of
+# the few lanes still iterating a loop the rest of the batch has left.
+# Every lane therefore ends with the output and error a scalar run would give.
+
+import itertools
+
+try:
+    import numpy as np
+except ImportError:  # every lane then runs on the scalar interpreter
+    np = None
+
+from brewparse import parse_program
+from intbase import InterpreterBase
+from interpreterv3 import Interpreter
+from type_valuev2 import Type
+
+# a loop still iterating on fewer than 1/DIVERGENCE_LIMIT of the batch evicts those lanes
+DIVERGENCE_LIMIT = 32
+# ints are kept below this magnitude, so that +, - and * of two of them can't wrap
+INT_LIMIT = 2**62
+
+COMPARISONS = {"<", "<=", ">", ">="}
+
+
+class _Unsupported(Exception):
+    pass
+
+
+# one run on the scalar interpreter, described like a daemon result
+def run_scalar(program, inp, coverage=None):
+    interpreter = Interpreter(console_output=False, inp=inp)
+    interpreter.interactive = False  # a lane with no input reads None, not the process's stdin
+    interpreter.coverage = coverage
+    result = {"output": [], "error": None, "message": None}
+    try:
+        interpreter.run(program)
+    except SyntaxError as e:
+        result["error"] = "SYNTAX_ERROR"
+        result["message"] = str(e)
+    except Exception as e:
+        error_type, _ = interpreter.get_error_type_and_line()
+        result["error"] = error_type.name if error_type is not None else type(e).__name__
+        result["message"] = str(e)
+    result["output"] = [str(line) for line in interpreter.get_output()]
+    return result
+
+
+# per-run state shared by the compiled closures
+class _Lanes:
+    def __init__(self, inputs, slot_types, coverage=None):
+        self.n = len(inputs)
+        self.coverage = coverage  # flags indexed by node_id, as the scalar interpreter keeps them
+        self.running = np.ones(self.n, dtype=bool)  # neither evicted nor returned
+        self.evicted = np.zeros(self.n, dtype=bool)
+        self.values = [np.zeros(self.n, dtype=np.int64 if t == Type.INT else bool) for t in slot_types]
+        self.init = [np.zeros(self.n, dtype=bool) for _ in slot_types]
+        self.events = []  # (lanes, parts) for every line of output
+
+        # inputs as a padded table; entries inputi() would not read back exactly are invalid
+        self.lengths = np.array([len(inp) for inp in inputs], dtype=np.int64)
+        width = max(1, int(self.lengths.max(initial=0)))
+        self.inputs = np.zeros((self.n, width), dtype=np.int64)
+        self.valid = np.zeros((self.n, width), dtype=bool)
+        for lane, inp in enumerate(inputs):
+            for position, text in enumerate(inp):
+                try:
+                    number = int(text)
+                except (TypeError, ValueError):
+                    continue
+                if -INT_LIMIT < number < INT_LIMIT:
+                    self.inputs[lane, position] = number
+                    self.valid[lane, position] = True
+        self.cursor = np.zeros(self.n, dtype=np.int64)
+
+    def evict(self, mask):
+        self.evicted |= mask
+        self.running &= ~mask
+
+    def evict_lanes(self, lanes):
+        self.evicted[lanes] = True
+        self.running[lanes] = False
+
+    # parts are (None, literal text) or (type, values) for one line of output per lane
+    # mark an if or for as having gone each way some live lane in mask went
+    def cover_branch(self, node_id, mask, taken):
+        live = mask & self.running
+        if (live & taken).any():
+            self.coverage[node_id] |= InterpreterBase.BRANCH_TAKEN
+        if (live & ~taken).any():
+            self.coverage[node_id] |= InterpreterBase.BRANCH_NOT_TAKEN
+
+    def emit(self, mask, parts):
+        lanes = np.flatnonzero(mask)
+        columns = [(t, part if t is None else np.broadcast_to(part, self.n)[lanes]) for t, part in parts]
+        self.events.append((lanes, columns))
+
+    # the output of every lane that wasn't evicted
+    def outputs(self):
+        outputs = [[] for _ in range(self.n)]
+        for lanes, parts in self.events:
+            columns = []
+            for t, part in parts:
+                if t is None:
+                    columns.append(itertools.repeat(part))
+                elif t == Type.INT:
+                    columns.append(map(str, part.tolist()))
+                else:
+                    columns.append(["true" if v else "false" for v in part.tolist()])
+            lines = map("".join, zip(*columns)) if columns else itertools.repeat("")
+            for lane, line in zip(lanes.tolist(), lines):
+                outputs[lane].append(line)
+        return outputs
+
+
+class Batch:
+    def __init__(self, program):
+        self.program = program
+        self.reason = None  # why the program runs lane by lane, if it does
+        self.scalar_lanes = 0  # lanes the last run() handed to the scalar interpreter
+        self.slot_types = []
+        self.main_id = None
+        ast = parse_program(program)
+        if np is None:
+            self.reason = "NumPy is not installed"
+            return
+        try:
+            self.main = self.__compile_program(ast)
+        except _Unsupported as e:
+            self.reason = str(e)
+
+    # coverage, if given, is a bytearray that collects brewcov's flags for every lane
+    def run(self, inputs, coverage=None):
+        inputs = [list(inp) for inp in inputs]
+        if self.reason is not None:
+            self.scalar_lanes = len(inputs)
+            return [run_scalar(self.program, inp, coverage) for inp in inputs]
+
+        lanes = _Lanes(inputs, self.slot_types, coverage)
+        if coverage is not None and lanes.n:
+            coverage[self.main_id] |= InterpreterBase.COVERED
+        with np.errstate(all="ignore"):  # lanes that aren't running may hold anything
+            self.main(lanes, lanes.running.copy())
+        outputs = lanes.outputs()
+        results = []
+        for lane, inp in enumerate(inputs):
+            if lanes.evicted[lane]:
+                results.append(run_scalar(self.program, inp, coverage))
+            else:
+                results.append({"output": outputs[lane], "error": None, "message": None})
+        self.scalar_lanes = int(lanes.evicted.sum())
+        return results
+
+    # compilation turns the tree into closures taking (lanes, mask)
+
+    def __compile_program(self, ast):
+        if ast.get("structs"):
+            raise _Unsupported("structs")
+        functions = ast.get("functions")
+        if len(functions) != 1 or functions[0].get("name") != "main":
+            raise _Unsupported("functions other than main")
+        main = functions[0]
+        if main.get("args") or main.get("return_type") != Type.VOID:
+            raise _Unsupported("main must be `func main(): void`")
+        self.main_id = main.node_id
+        return self.__compile_block(main.get("statements"), [])
+
+    def __compile_block(self, statements, scopes):
+        scopes = scopes + [{}]
+        compiled = [(statement.node_id, self.__compile_statement(statement, scopes)) for statement in statements]
+
+        def block(lanes, mask):
+            coverage = lanes.coverage
+            for node_id, statement in compiled:
+                if coverage is not None:
+                    coverage[node_id] |= InterpreterBase.COVERED
+                statement(lanes, mask)
+                mask = mask & lanes.running
+                if not mask.any():
+                    return
+
+        return block
+
+    def __compile_statement(self, statement, scopes):
+        kind = statement.elem_type
+        if kind == InterpreterBase.VAR_DEF_NODE:
+            return self.__compile_var_def(statement, scopes)
+        if kind == "=":
+            return self.__compile_assign(statement, scopes)
+        if kind == InterpreterBase.FCALL_NODE:
+            if statement.get("name") == "print":
+                return self.__compile_print(statement, scopes)
+            _, call = self.__compile_expr(statement, scopes)
+            return call
+        if kind == InterpreterBase.IF_NODE:
+            return self.__compile_if(statement, scopes)
+        if kind == InterpreterBase.FOR_NODE:
+            return self.__compile_for(statement, scopes)
+        if kind == InterpreterBase.RETURN_NODE:
+            if statement.get("expression") is not None:
+                raise _Unsupported("returning a value from main")
+
+            def do_return(lanes, mask):
+                lanes.running &= ~mask
+
+            return do_return
+        raise _Unsupported(f"{kind} statements")
+
+    def __compile_var_def(self, statement, scopes):
+        name = statement.get("name")
+        var_type = statement.get("var_type")
+        if var_type not in (Type.INT, Type.BOOL):
+            raise _Unsupported(f"variables of type {var_type}")
+        if name in scopes[-1]:
+            raise _Unsupported(f"duplicate definition of {name}")
+        slot = len(self.slot_types)
+        self.slot_types.append(var_type)
+        scopes[-1][name] = slot
+
+        # a new variable is unassigned; reading it evicts the lane
+        def var_def(lanes, mask):
+            lanes.init[slot] &= ~mask
+
+        return var_def
+
+    def __lookup(self, name, scopes):
+        if "." in name:
+            raise _Unsupported("struct fields")
+        for scope in reversed(scopes):
+            if name in scope:
+                return scope[name]
+        raise _Unsupported(f"undefined variable {name}")
+
+    def __compile_assign(self, statement, scopes):
+        slot = self.__lookup(statement.get("name"), scopes)
+        var_type = self.slot_types[slot]
+        expr_type, expr = self.__compile_expr(statement.get("expression"), scopes)
+        if var_type == Type.BOOL and expr_type == Type.INT:
+            expr = self.__coerce(expr_type, expr)
+        elif var_type != expr_type:
+            raise _Unsupported(f"assigning {expr_type} to {var_type}")
+
+        def assign(lanes, mask):
+            np.copyto(lanes.values[slot], expr(lanes, mask), where=mask)
+            lanes.init[slot] |= mask
+
+        return assign
+
+    def __compile_print(self, statement, scopes):
+        parts = [self.__compile_printable(arg, scopes) for arg in statement.get("args")]
+
+        def do_print(lanes, mask):
+            lanes.emit(mask, [(t, part if t is None else part(lanes, mask)) for t, part in parts])
+
+        return do_print
+
+    # string literals are only supported where they go straight to the output
+    def __compile_printable(self, arg, scopes):
+        if arg.elem_type == InterpreterBase.STRING_NODE:
+            return (None, arg.get("val"))
+        return self.__compile_expr(arg, scopes)
+
+    def __compile_if(self, statement, scopes):
+        condition = self.__compile_condition(statement.get("condition"), scopes)
+        then_block = self.__compile_block(statement.get("statements"), scopes)
+        else_statements = statement.get("else_statements")
+        else_block = self.__compile_block(else_statements, scopes) if else_statements is not None else None
+
+        def do_if(lanes, mask):
+            taken = condition(lanes, mask)
+            if lanes.coverage is not None:
+                lanes.cover_branch(statement.node_id, mask, taken)
+            then_mask = mask & taken & lanes.running
+            if then_mask.any():
+                then_block(lanes, then_mask)
+            if else_block is not None:
+                else_mask = mask & ~taken & lanes.running
+                if else_mask.any():
+                    else_block(lanes, else_mask)
+
+        return do_if
+
+    def __compile_for(self, statement, scopes):
+        init = self.__compile_statement(statement.get("init"), scopes)
+        condition = self.__compile_condition(statement.get("condition"), scopes)
+        update = self.__compile_statement(statement.get("update"), scopes)
+        body = self.__compile_block(statement.get("statements"), scopes)
+
+        def do_for(lanes, mask):
+            init(lanes, mask)
+            mask = mask & lanes.running
+            while mask.any():
+                taken = condition(lanes, mask)
+                if lanes.coverage is not None:
+                    lanes.cover_branch(statement.node_id, mask, taken)
+                mask = mask & taken & lanes.running
+                iterating = int(mask.sum())
+                if iterating == 0:
+                    return
+                if iterating * DIVERGENCE_LIMIT < lanes.n:
+                    lanes.evict(mask)
+                    return
+                body(lanes, mask)
+                mask = mask & lanes.running
+                update(lanes, mask)
+                mask = mask & lanes.running
+
+        return do_for
+
+    def __compile_condition(self, cond_ast, scopes):
+        cond_type, cond = self.__compile_expr(cond_ast, scopes)
+        return self.__coerce(cond_type, cond)
+
+    # int to bool coercion, as the scalar interpreter does for conditions, && || ! and ==
+    def __coerce(self, expr_type, expr):
+        if expr_type == Type.BOOL:
+            return expr
+        if expr_type != Type.INT:
+            raise _Unsupported(f"{expr_type} used as a bool")
+        return lambda lanes, mask: expr(lanes, mask) != 0
+
+    # returns (type, closure) for an int or bool expression
+    def __compile_expr(self, expr_ast, scopes):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.INT_NODE:
+            value = np.int64(expr_ast.get("val")) if -INT_LIMIT < expr_ast.get("val") < INT_LIMIT else None
+            if value is None:
+                raise _Unsupported("int literal out of range")
+            return Type.INT, lambda lanes, mask: value
+        if kind == InterpreterBase.BOOL_NODE:
+            value = np.bool_(expr_ast.get("val"))
+            return Type.BOOL, lambda lanes, mask: value
+        if kind == InterpreterBase.VAR_NODE:
+            return self.__compile_var(expr_ast, scopes)
+        if kind == InterpreterBase.FCALL_NODE:
+            return self.__compile_call(expr_ast, scopes)
+        if kind == InterpreterBase.NEG_NODE:
+            op_type, op = self.__compile_expr(expr_ast.get("op1"), scopes)
+            if op_type != Type.INT:
+                raise _Unsupported("negating a non-int")
+            return Type.INT, lambda lanes, mask: -op(lanes, mask)
+        if kind == InterpreterBase.NOT_NODE:
+            op = self.__coerce(*self.__compile_expr(expr_ast.get("op1"), scopes))
+            return Type.BOOL, lambda lanes, mask: np.logical_not(op(lanes, mask))
+        if kind in Interpreter.BIN_OPS:
+            return self.__compile_binary(expr_ast, scopes)
+        raise _Unsupported(f"{kind} expressions")
+
+    def __compile_var(self, expr_ast, scopes):
+        slot = self.__lookup(expr_ast.get("name"), scopes)
+
+        def var(lanes, mask):
+            unassigned = mask & ~lanes.init[slot]
+            if unassigned.any():
+                lanes.evict(unassigned)
+            return lanes.values[slot]
+
+        return self.slot_types[slot], var
+
+    def __compile_call(self, call_ast, scopes):
+        name = call_ast.get("name")
+        args = call_ast.get("args")
+        if name != "inputi" or len(args) > 1:
+            raise _Unsupported(f"calls to {name}")
+        prompt = self.__compile_printable(args[0], scopes) if args else None
+
+        def inputi(lanes, mask):
+            if prompt is not None:
+                t, part = prompt
+                lanes.emit(mask, [(t, part if t is None else part(lanes, mask))])
+            reading = np.flatnonzero(mask)
+            cursor = lanes.cursor[reading]
+            position = np.minimum(cursor, lanes.inputs.shape[1] - 1)
+            readable = (cursor < lanes.lengths[reading]) & lanes.valid[reading, position]
+            if not readable.all():
+                lanes.evict_lanes(reading[~readable])
+            result = np.zeros(lanes.n, dtype=np.int64)
+            result[reading] = lanes.inputs[reading, position]
+            lanes.cursor[reading] += 1
+            return result
+
+        return Type.INT, inputi
+
+    def __compile_binary(self, expr_ast, scopes):
+        operator = expr_ast.elem_type
+        left_type, left = self.__compile_expr(expr_ast.get("op1"), scopes)
+        right_type, right = self.__compile_expr(expr_ast.get("op2"), scopes)
+
+        if operator in ("&&", "||"):
+            left = self.__coerce(left_type, left)
+            right = self.__coerce(right_type, right)
+            combine = np.logical_and if operator == "&&" else np.logical_or
+            return Type.BOOL, lambda lanes, mask: combine(left(lanes, mask), right(lanes, mask))
+
+        if operator in ("==", "!="):
+            if left_type != right_type:  # an int compared with a bool is coerced to bool
+                left = self.__coerce(left_type, left)
+                right = self.__coerce(right_type, right)
+            compare = np.equal if operator == "==" else np.not_equal
+            return Type.BOOL, lambda lanes, mask: compare(left(lanes, mask), right(lanes, mask))
+
+        if left_type != Type.INT or right_type != Type.INT:
+            raise _Unsupported(f"{operator} on {left_type} and {right_type}")
+        if operator in COMPARISONS:
+            compare = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}[operator]
+            return Type.BOOL, lambda lanes, mask: compare(left(lanes, mask), right(lanes, mask))
+
+        def arithmetic(lanes, mask):
+            a = left(lanes, mask)
+            b = right(lanes, mask)
+            if operator == "+":
+                result = a + b
+            elif operator == "-":
+                result = a - b
+            elif operator == "*":
+                # the float estimate stays well clear of int64's limit whenever it's accepted
+                estimate = np.abs(np.multiply(a, b, dtype=np.float64))
+                big = mask & (estimate >= INT_LIMIT // 2)
+                if big.any():
+                    lanes.evict(big)
+                return a * b
+            else:
+                zero = mask & (b == 0)
+                if zero.any():
+                    lanes.evict(zero)
+                return np.floor_divide(a, np.where(b == 0, 1, b))
+            big = mask & (np.abs(result) >= INT_LIMIT)
+            if big.any():
+                lanes.evict(big)
+            return result
+
+        return Type.INT, arithmetic
@@ -0,0 +1,1396 @@
+# Benchmark suite for the Brewin interpreters
+# `python benchmarks.py` runs every benchmark; pass names to run only some of them,
+# e.g. `python benchmarks.py metering`
+
+import contextlib
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import numpy as np
+except ImportError:  # the numpy rows of bench_host are left out
+    np = None
+
+import artifact
+import batch
+import brewcov
+import brewtrace
+import env_v2
+import green
+import heapprof
+import lineprof
+import modules
+import pool
+import rope
+from brewparse import parse_program
+from element import Element
+from interpreterv3 import Interpreter as InterpreterV3
+from interpreterv4 import Interpreter as InterpreterV4
+
+FIB = """
+func fib(n: int): int {
+  if (n < 2) { return n; }
+  return fib(n - 1) + fib(n - 2);
+}
+func main(): void {
+  print(fib(18));
+}
+"""
+
+NESTED_LOOPS = """
+func main(): void {
+  var i: int;
+  var j: int;
+  var s: int;
+  s = 0;
+  for (i = 0; i < 150; i = i + 1) {
+    for (j = 0; j < 150; j = j + 1) {
+      s = s + i * j;
+    }
+  }
+  print(s);
+}
+"""
+
+# three deep, with a light body so that loop overhead dominates
+TRIPLE_LOOPS = """
+func main(): void {
+  var i: int;
+  var j: int;
+  var k: int;
+  var n: int;
+  var c: int;
+  n = 40;
+  c = 0;
+  for (i = 0; i < n; i = i + 1) {
+    for (j = 0; j < n; j = j + 1) {
+      for (k = j; k < n; k = k + 2) {
+        c = c + 1;
+      }
+    }
+  }
+  print(c);
+}
+"""
+
+STRUCT_LIST = """
+struct Node { val: int; next: Node; }
+func main(): void {
+  var head: Node;
+  var n: Node;
+  var i: int;
+  var s: int;
+  head = nil;
+  for (i = 0; i < 3000; i = i + 1) {
+    n = new Node;
+    n.val = i;
+    n.next = head;
+    head = n;
+  }
+  s = 0;
+  for (n = head; n != nil; n = n.next) {
+    s = s + n.val;
+  }
+  print(s);
+}
+"""
+
+# builds a list of n nodes, then checkpoints
+SNAPSHOT_HEAP = """
+struct Node { val: int; name: string; next: Node; }
+func main(): void {
+  var head: Node;
+  var n: Node;
+  var i: int;
+  var count: int;
+  count = inputi();
+  head = nil;
+  for (i = 0; i < count; i = i + 1) {
+    n = new Node;
+    n.val = i;
+    n.name = "node";
+    n.next = head;
+    head = n;
+  }
+  checkpoint();
+  print(head.val);
+}
+"""
+
+# appends 10 characters per iteration, inputi() times
+STRING_BUILD = """
+func main(): void {
+  var s: string;
+  var i: int;
+  var n: int;
+  n = inputi();
+  s = "";
+  for (i = 0; i < n; i = i + 1) {
+    s = s + "0123456789";
+  }
+  print(s == s + "");
+}
+"""
+
+# arithmetic programs for the batch benchmark, each with a generator of one lane's input
+SUM_OF_SQUARES = """
+func main(): void {
+  var n: int;
+  var i: int;
+  var s: int;
+  n = inputi();
+  s = 0;
+  for (i = 1; i <= n; i = i + 1) {
+    s = s + i * i;
+  }
+  print(s);
+}
+"""
+
+COLLATZ = """
+func main(): void {
+  var n: int;
+  var steps: int;
+  n = inputi();
+  for (steps = 0; n > 1; steps = steps + 1) {
+    if (n / 2 * 2 == n) {
+      n = n / 2;
+    } else {
+      n = 3 * n + 1;
+    }
+  }
+  print(steps);
+}
+"""
+
+POLYNOMIAL = """
+func main(): void {
+  var x: int;
+  var y: int;
+  x = inputi();
+  y = inputi();
+  print(3 * x * x - 2 * x * y + y / 7, " ", x > y && y != 0);
+}
+"""
+
+BATCH_PROGRAMS = {
+    "sum_of_squares": (SUM_OF_SQUARES, lambda rng: [str(rng.randint(40, 60))]),
+    "collatz": (COLLATZ, lambda rng: [str(rng.randint(1, 100))]),
+    "polynomial": (POLYNOMIAL, lambda rng: [str(rng.randint(-1000, 1000)), str(rng.randint(-1000, 1000))]),
+}
+
+HELLO = """
+func main(): void {
+  print("hello");
+}
+"""
+
+LAZY_FACT = """
+func fact(n) {
+  if (n <= 1) { return 1; }
+  return n * fact(n - 1);
+}
+func main() {
+  print(fact(60));
+  print(fact(120));
+}
+"""
+
+LAZY_FIB = """
+func fib(n) {
+  if (n < 2) { return n; }
+  return fib(n - 1) + fib(n - 2);
+}
+func main() {
+  print(fib(14));
+}
+"""
+
+LAZY_CHAIN = """
+func step(a, b) {
+  var c;
+  c = a + b;
+  return c;
+}
+func main() {
+  var x;
+  var y;
+  var i;
+  x = 1;
+  y = 2;
+  for (i = 0; i < 20; i = i + 1) {
+    x = step(x, y);
+    y = step(x, y);
+  }
+  print(x, " ", y);
+}
+"""
+
+V4_PROGRAMS = {"fact": LAZY_FACT, "fib": LAZY_FIB, "chain": LAZY_CHAIN}
+
+# the loops and list walks of NESTED_LOOPS and STRUCT_LIST, moved into functions that
+# are called often enough to be compiled
+CALLED_LOOPS = """
+func work(n: int): int {
+  var i: int;
+  var j: int;
+  var s: int;
+  s = 0;
+  for (i = 0; i < n; i = i + 1) {
+    for (j = 0; j < n; j = j + 1) {
+      s = s + i * j;
+      if (s > 1000000) { s = s - 1000000; }
+    }
+  }
+  return s;
+}
+func main(): void {
+  var k: int;
+  var total: int;
+  total = 0;
+  for (k = 0; k < 200; k = k + 1) {
+    total = total + work(30);
+  }
+  print(total);
+}
+"""
+
+CALLED_STRUCTS = """
+struct Node { val: int; next: Node; }
+func total(head: Node): int {
+  var s: int;
+  var n: Node;
+  s = 0;
+  for (n = head; n != nil; n = n.next) {
+    s = s + n.val;
+  }
+  return s;
+}
+func main(): void {
+  var head: Node;
+  var n: Node;
+  var i: int;
+  var s: int;
+  head = nil;
+  for (i = 0; i < 300; i = i + 1) {
+    n = new Node;
+    n.val = i;
+    n.next = head;
+    head = n;
+  }
+  s = 0;
+  for (i = 0; i < 200; i = i + 1) {
+    s = s + total(head);
+  }
+  print(s);
+}
+"""
+
+# selection sort of 300 pseudo-random ints, in an array and in a linked list
+ARRAY_SORT = """
+func main(): void {
+  var a: int[];
+  var n: int;
+  var i: int;
+  var j: int;
+  var m: int;
+  var t: int;
+  var x: int;
+  n = 300;
+  x = 1;
+  a = new int[n];
+  for (i = 0; i < n; i = i + 1) {
+    x = x * 75 + 74;
+    x = x - (x / 65537) * 65537;
+    a[i] = x;
+  }
+  for (i = 0; i < n - 1; i = i + 1) {
+    m = i;
+    for (j = i + 1; j < n; j = j + 1) {
+      if (a[j] < a[m]) { m = j; }
+    }
+    t = a[i];
+    a[i] = a[m];
+    a[m] = t;
+  }
+  print(a[0], " ", a[n / 2], " ", a[n - 1]);
+}
+"""
+
+LIST_SORT = """
+struct Node { val: int; next: Node; }
+func main(): void {
+  var head: Node;
+  var tail: Node;
+  var node: Node;
+  var p: Node;
+  var q: Node;
+  var m: Node;
+  var n: int;
+  var i: int;
+  var t: int;
+  var x: int;
+  n = 300;
+  x = 1;
+  for (i = 0; i < n; i = i + 1) {
+    x = x * 75 + 74;
+    x = x - (x / 65537) * 65537;
+    node = new Node;
+    node.val = x;
+    if (head == nil) { head = node; } else { tail.next = node; }
+    tail = node;
+  }
+  for (p = head; p != nil; p = p.next) {
+    m = p;
+    for (q = p.next; q != nil; q = q.next) {
+      if (q.val < m.val) { m = q; }
+    }
+    t = p.val;
+    p.val = m.val;
+    m.val = t;
+  }
+  p = head;
+  for (i = 0; i < n / 2; i = i + 1) { p = p.next; }
+  print(head.val, " ", p.val, " ", tail.val);
+}
+"""
+
+# prefix sums of 2000 ints, then 200 range sums looked up in them
+ARRAY_PREFIX = """
+func main(): void {
+  var a: int[];
+  var sums: int[];
+  var n: int;
+  var i: int;
+  var x: int;
+  var l: int;
+  var r: int;
+  var t: int;
+  var total: int;
+  n = 2000;
+  x = 1;
+  a = new int[n];
+  for (i = 0; i < n; i = i + 1) {
+    x = x * 75 + 74;
+    x = x - (x / 65537) * 65537;
+    a[i] = x - (x / 100) * 100;
+  }
+  sums = new int[n + 1];
+  for (i = 0; i < n; i = i + 1) { sums[i + 1] = sums[i] + a[i]; }
+  total = 0;
+  for (i = 0; i < 200; i = i + 1) {
+    x = x * 75 + 74;
+    x = x - (x / 65537) * 65537;
+    l = x - (x / n) * n;
+    x = x * 75 + 74;
+    x = x - (x / 65537) * 65537;
+    r = x - (x / n) * n;
+    if (l > r) { t = l; l = r; r = t; }
+    total = total + sums[r + 1] - sums[l];
+  }
+  print(sums[n], " ", total);
+}
+"""
+
+LIST_PREFIX = """
+struct Node { val: int; sum: int; next: Node; }
+func main(): void {
+  var head: Node;
+  var tail: Node;
+  var node: Node;
+  var cur: Node;
+  var n: int;
+  var i: int;
+  var x: int;
+  var l: int;
+  var r: int;
+  var t: int;
+  var total: int;
+  var before: int;
+  n = 2000;
+  x = 1;
+  head = nil;
+  for (i = 0; i < n; i = i + 1) {
+    x = x * 75 + 74;
+    x = x - (x / 65537) * 65537;
+    node = new Node;
+    node.val = x - (x / 100) * 100;
+    if (head == nil) { head = node; node.sum = node.val; } else { tail.next = node; node.sum = tail.sum + node.val; }
+    tail = node;
+  }
+  total = 0;
+  for (i = 0; i < 200; i = i + 1) {
+    x = x * 75 + 74;
+    x = x - (x / 65537) * 65537;
+    l = x - (x / n) * n;
+    x = x * 75 + 74;
+    x = x - (x / 65537) * 65537;
+    r = x - (x / n) * n;
+    if (l > r) { t = l; l = r; r = t; }
+    cur = head;
+    before = 0;
+    for (t = 0; t < r; t = t + 1) {
+      if (t == l - 1) { before = cur.sum; }
+      cur = cur.next;
+    }
+    total = total + cur.sum - before;
+  }
+  print(tail.sum, " ", total);
+}
+"""
+
+# word counts, read as a count and then that many words (see word_input)
+MAP_WORD_COUNT = """
+func main(): void {
+  var counts: map[string]int;
+  var order: string[];
+  var n: int;
+  var i: int;
+  var w: string;
+  var best: string;
+  counts = new map[string]int;
+  n = inputi();
+  for (i = 0; i < n; i = i + 1) {
+    w = inputs();
+    if (contains(counts, w)) { put(counts, w, get(counts, w) + 1); } else { put(counts, w, 1); }
+  }
+  order = keys(counts);
+  best = order[0];
+  for (i = 1; i < len(order); i = i + 1) {
+    if (get(counts, order[i]) > get(counts, best)) { best = order[i]; }
+  }
+  print(len(order), " ", order[0], " ", order[len(order) - 1], " ", best, " ", get(counts, best));
+}
+"""
+
+LIST_WORD_COUNT = """
+struct Entry { word: string; count: int; next: Entry; }
+func find(head: Entry, w: string): Entry {
+  var e: Entry;
+  for (e = head; e != nil; e = e.next) {
+    if (e.word == w) { return e; }
+  }
+  return nil;
+}
+func main(): void {
+  var head: Entry;
+  var tail: Entry;
+  var e: Entry;
+  var best: Entry;
+  var n: int;
+  var i: int;
+  var w: string;
+  var distinct: int;
+  head = nil;
+  distinct = 0;
+  n = inputi();
+  for (i = 0; i < n; i = i + 1) {
+    w = inputs();
+    e = find(head, w);
+    if (e == nil) {
+      e = new Entry;
+      e.word = w;
+      e.count = 1;
+      distinct = distinct + 1;
+      if (head == nil) { head = e; } else { tail.next = e; }
+      tail = e;
+    } else {
+      e.count = e.count + 1;
+    }
+  }
+  best = head;
+  for (e = head.next; e != nil; e = e.next) {
+    if (e.count > best.count) { best = e; }
+  }
+  print(distinct, " ", head.word, " ", tail.word, " ", best.word, " ", best.count);
+}
+"""
+
+MAP_COLLATZ = """
+func main(): void {
+  var memo: map[int]int;
+  var path: int[];
+  var i: int;
+  var n: int;
+  var k: int;
+  var s: int;
+  var best: int;
+  var arg: int;
+  memo = new map[int]int;
+  path = new int[300];
+  best = 0;
+  arg = 1;
+  put(memo, 1, 0);
+  for (i = 1; i <= 300; i = i + 1) {
+    k = 0;
+    for (n = i; !contains(memo, n); k = k + 1) {
+      path[k] = n;
+      if (n - (n / 2) * 2 == 0) { n = n / 2; } else { n = 3 * n + 1; }
+    }
+    s = get(memo, n);
+    for (k = k - 1; k >= 0; k = k - 1) {
+      s = s + 1;
+      put(memo, path[k], s);
+    }
+    if (s > best) { best = s; arg = i; }
+  }
+  print(arg, " ", best, " ", len(memo));
+}
+"""
+
+LIST_COLLATZ = """
+struct Entry { key: int; val: int; next: Entry; }
+func lookup(head: Entry, key: int): Entry {
+  var e: Entry;
+  for (e = head; e != nil; e = e.next) {
+    if (e.key == key) { return e; }
+  }
+  return nil;
+}
+func main(): void {
+  var head: Entry;
+  var e: Entry;
+  var path: int[];
+  var i: int;
+  var n: int;
+  var k: int;
+  var s: int;
+  var best: int;
+  var arg: int;
+  var size: int;
+  head = new Entry;
+  head.key = 1;
+  head.val = 0;
+  size = 1;
+  path = new int[300];
+  best = 0;
+  arg = 1;
+  for (i = 1; i <= 300; i = i + 1) {
+    k = 0;
+    for (e = lookup(head, i); e == nil; e = lookup(head, n)) {
+      if (k == 0) { n = i; }
+      path[k] = n;
+      k = k + 1;
+      if (n - (n / 2) * 2 == 0) { n = n / 2; } else { n = 3 * n + 1; }
+    }
+    s = e.val;
+    for (k = k - 1; k >= 0; k = k - 1) {
+      s = s + 1;
+      e = new Entry;
+      e.key = path[k];
+      e.val = s;
+      e.next = head;
+      head = e;
+      size = size + 1;
+    }
+    if (s > best) { best = s; arg = i; }
+  }
+  print(arg, " ", best, " ", size);
+}
+"""
+
+# dot products of two int arrays, in Brewin or by a host function; DOT_LOOP is
+# DOT_HOST with `dot` defined in Brewin
+DOT_HOST = """
+func main(): void {
+  var a: int[];
+  var b: int[];
+  var n: int;
+  var i: int;
+  var total: int;
+  n = 5000;
+  a = new int[n];
+  b = new int[n];
+  for (i = 0; i < n; i = i + 1) {
+    a[i] = i - (i / 7) * 7;
+    b[i] = n - i;
+  }
+  total = 0;
+  for (i = 0; i < 20; i = i + 1) { total = total + dot(a, b); }
+  print(total);
+}
+"""
+
+DOT_LOOP = DOT_HOST + """
+func dot(a: int[], b: int[]): int {
+  var i: int;
+  var total: int;
+  total = 0;
+  for (i = 0; i < len(a); i = i + 1) { total = total + a[i] * b[i]; }
+  return total;
+}
+"""
+
+# calls of a trivial function, from Brewin to Brewin or to the host
+CALLS_HOST = """
+func main(): void {
+  var i: int;
+  var total: int;
+  total = 0;
+  for (i = 0; i < 20000; i = i + 1) { total = total + twice(i); }
+  print(total);
+}
+"""
+
+CALLS_LOOP = CALLS_HOST + """
+func twice(n: int): int { return n + n; }
+"""
+
+# a loop calling small helpers: early returns, a struct parameter, an int returned as a bool
+SMALL_HELPERS = """
+struct Point { x: int; y: int; }
+func clamp(v: int, lo: int, hi: int): int {
+  if (v < lo) { return lo; }
+  if (v > hi) { return hi; }
+  return v;
+}
+func odd(n: int): bool { return n - n / 2 * 2; }
+func norm1(p: Point): int { return clamp(p.x, 0, 100) + clamp(p.y, 0, 100); }
+func main(): void {
+  var i: int;
+  var s: int;
+  var p: Point;
+  p = new Point;
+  s = 0;
+  for (i = 0; i < 5000; i = i + 1) {
+    p.x = i - 2500;
+    p.y = i / 3;
+    s = s + norm1(p);
+    if (odd(i)) { s = s + 1; }
+  }
+  print(s);
+}
+"""
+
+# a session that spends its life waiting for its next line of input
+ACCUMULATE = """
+func main(): void {
+  var total: int;
+  var n: int;
+  total = 0;
+  for (n = inputi(); n != 0; n = inputi()) {
+    total = total + n;
+    print(total);
+  }
+}
+"""
+
+PROGRAMS = {"fib": FIB, "nested_loops": NESTED_LOOPS, "struct_list": STRUCT_LIST}
+
+BENCHMARKS = {}
+
+# budget for a fresh process to import the parser and parse its first program
+STARTUP_BUDGET_MS = 50
+# budget for the slowdown of collecting coverage
+COVERAGE_BUDGET = 0.20
+
+# run in a fresh interpreter so that nothing is already imported or built
+STARTUP_PROBE = """
+import sys, time
+start = time.perf_counter()
+import brewparse
+imported = time.perf_counter()
+if sys.argv[1] == "yacc":
+    from ply import yacc
+    yacc.yacc(module=brewparse, write_tables=False, debug=False, errorlog=yacc.NullLogger())
+brewparse.parse_program(sys.argv[2])
+parsed = time.perf_counter()
+print((imported - start) * 1000, (parsed - imported) * 1000)
+"""
+
+
+# a function of n blocks of straight-line code, for measuring the AST itself
+def generated_program(blocks):
+    lines = ["func f(a: int): int {"]
+    for i in range(blocks):
+        lines.append(f"  var x{i}: int;")
+        lines.append(f"  x{i} = a * {i} + (a - {i});")
+        lines.append(f"  if (x{i} > {i}) {{ print(x{i}); }}")
+    lines.append("  return a;")
+    lines.append("}")
+    lines.append("func main(): void { f(1); }")
+    return "\n".join(lines)
+
+
+# a library of functions of which main calls only the first few
+def library_program(functions, blocks, called):
+    lines = []
+    for index in range(functions):
+        lines.append(f"func f{index}(a: int): int {{")
+        for i in range(blocks):
+            lines.append(f"  var x{i}: int;")
+            lines.append(f"  x{i} = a * {i} + (a - {i});")
+            lines.append(f"  if (x{i} > {i}) {{ a = a + 1; }}")
+        lines.append("  return a;")
+        lines.append("}")
+    calls = " ".join(f"print(f{index}(1));" for index in range(called))
+    lines.append(f"func main(): void {{ {calls} }}")
+    return "\n".join(lines)
+
+
+# input for the word count programs: count words drawn from vocabulary distinct ones
+def word_input(count, vocabulary, seed=7):
+    rng = random.Random(seed)
+    return [str(count)] + [f"w{rng.randrange(vocabulary)}" for _ in range(count)]
+
+
+def count_nodes(ast):
+    count = 0
+    pending = [ast]
+    while pending:
+        node = pending.pop()
+        count += 1
+        for value in node.dict.values():
+            if isinstance(value, Element):
+                pending.append(value)
+            elif isinstance(value, list):
+                pending.extend(item for item in value if isinstance(item, Element))
+    return count
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__[len("bench_"):]] = func
+    return func
+
+
+# best wall-clock time of running program on a fresh interpreter from make_interpreter
+def best_time(make_interpreter, program, inp=None, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        interpreter = make_interpreter(inp)
+        start = time.perf_counter()
+        interpreter.run(program)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(title, rows, header):
+    print(f"== {title}")
+    widths = [max(len(str(row[i])) for row in rows + [header]) for i in range(len(header))]
+    for row in [header] + rows:
+        print("  ".join(str(cell).ljust(width) for cell, width in zip(row, widths)))
+    print()
+
+
+@benchmark
+def bench_metering():
+    def unlimited(inp):
+        return InterpreterV3(console_output=False, inp=inp)
+
+    def limited(inp):
+        interpreter = InterpreterV3(console_output=False, inp=inp)
+        interpreter.set_limits(max_steps=10**12, max_seconds=3600, max_memory_kb=10**9)
+        return interpreter
+
+    rows = []
+    for name, program in PROGRAMS.items():
+        base = best_time(unlimited, program)
+        metered = best_time(limited, program)
+        rows.append([name, f"{base * 1000:.1f}", f"{metered * 1000:.1f}", f"{(metered / base - 1) * 100:+.1f}%"])
+    report("metering (v3): no limits vs all limits armed", rows, ["program", "no limits ms", "limits ms", "overhead"])
+
+
+@benchmark
+def bench_startup():
+    import brewparse
+
+    if not brewparse.tables_are_current():
+        print("parsetab.py is stale; run `python brewparse.py` to regenerate it")
+    here = os.path.dirname(os.path.abspath(__file__))
+    rows = []
+    for mode in ("frozen", "yacc"):
+        best_import, best_parse = float("inf"), float("inf")
+        for _ in range(5):
+            out = subprocess.run([sys.executable, "-c", STARTUP_PROBE, mode, HELLO],
+                                 cwd=here, capture_output=True, text=True, check=True).stdout
+            import_ms, parse_ms = map(float, out.split()[-2:])
+            best_import, best_parse = min(best_import, import_ms), min(best_parse, parse_ms)
+        total = best_import + best_parse
+        verdict = "ok" if total <= STARTUP_BUDGET_MS else "over budget"
+        rows.append([mode, f"{best_import:.1f}", f"{best_parse:.1f}", f"{total:.1f}", verdict])
+    report(f"startup: import + first parse (budget {STARTUP_BUDGET_MS} ms)", rows,
+           ["tables", "import ms", "first parse ms", "total ms", "budget"])
+
+
+@benchmark
+def bench_snapshot():
+    rows = []
+    for count in (1000, 10000, 100000):
+        interpreter = InterpreterV3(console_output=False, inp=[str(count)])
+        interpreter.run_to_checkpoint(SNAPSHOT_HEAP, io.BytesIO())
+        best_save, best_load = float("inf"), float("inf")
+        for _ in range(3):
+            file = io.BytesIO()
+            start = time.perf_counter()
+            interpreter.save_snapshot(file)
+            best_save = min(best_save, time.perf_counter() - start)
+            file.seek(0)
+            restored = InterpreterV3(console_output=False)
+            start = time.perf_counter()
+            restored.load_snapshot(file)
+            best_load = min(best_load, time.perf_counter() - start)
+        restored.resume()
+        assert restored.get_output() == [str(count - 1)]
+        size = len(file.getvalue())
+        rows.append([count, f"{best_save * 1000:.1f}", f"{best_load * 1000:.1f}",
+                     f"{(best_save + best_load) / count * 1e6:.2f}", f"{size / 1024:.0f}", f"{size / count:.1f}"])
+    report("snapshot/restore (v3): linked list of n structs", rows,
+           ["nodes", "save ms", "load ms", "us/node", "KB", "bytes/node"])
+
+
+@benchmark
+def bench_ropes():
+    def v3(inp):
+        return InterpreterV3(console_output=False, inp=inp)
+
+    rows = []
+    for length in (10**4, 10**5, 10**6):
+        inp = [str(length // 10)]
+        repeat = 3 if length < 10**6 else 1  # plain strs take a while at 10^6
+        with_ropes = best_time(v3, STRING_BUILD, inp, repeat)
+        threshold, rope.ROPE_THRESHOLD = rope.ROPE_THRESHOLD, float("inf")
+        try:
+            plain = best_time(v3, STRING_BUILD, inp, repeat)
+        finally:
+            rope.ROPE_THRESHOLD = threshold
+        rows.append([length, f"{with_ropes * 1000:.1f}", f"{plain * 1000:.1f}", f"{plain / with_ropes:.1f}x"])
+    report("string building (v3): s = s + \"0123456789\" in a loop", rows, ["chars", "ropes ms", "plain str ms", "speedup"])
+
+
+@benchmark
+def bench_counting_loops():
+    def v3(inp):
+        return InterpreterV3(console_output=False, inp=inp)
+
+    rows = []
+    for name, program in (("nested_loops", NESTED_LOOPS), ("triple_loops", TRIPLE_LOOPS), ("struct_list", STRUCT_LIST)):
+        InterpreterV3.COUNTING_LOOPS = False
+        try:
+            generic = best_time(v3, program)
+        finally:
+            InterpreterV3.COUNTING_LOOPS = True
+        counting = best_time(v3, program)
+        rows.append([name, f"{generic * 1000:.1f}", f"{counting * 1000:.1f}", f"{generic / counting:.2f}x"])
+    report("counting loops (v3): generic for vs specialised", rows, ["program", "generic ms", "counting ms", "speedup"])
+
+
+@benchmark
+def bench_batch():
+    if batch.np is None:
+        print("== batch: skipped, NumPy is not installed\n")
+        return
+    lanes = 10**5
+    sample = 500  # lanes timed on the scalar interpreter and compared against the batch
+    rng = random.Random(0)
+    rows = []
+    for name, (program, make_input) in BATCH_PROGRAMS.items():
+        inputs = [make_input(rng) for _ in range(lanes)]
+        runner = batch.Batch(program)
+        start = time.perf_counter()
+        results = runner.run(inputs)
+        batch_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scalar = [batch.run_scalar(program, inp) for inp in inputs[:sample]]
+        scalar_time = (time.perf_counter() - start) / sample * lanes
+        assert results[:sample] == scalar, f"{name}: batch output differs from scalar runs"
+        rows.append([name, f"{lanes / batch_time:,.0f}", f"{lanes / scalar_time:,.0f}",
+                     f"{scalar_time / batch_time:.1f}x", runner.scalar_lanes])
+    report(f"batch (v3): {lanes:,} lanes", rows, ["program", "batch lanes/s", "scalar lanes/s", "speedup", "evicted"])
+
+
+@benchmark
+def bench_positions():
+    import tracemalloc
+
+    program = generated_program(2000)
+    parse_program(program)  # build the parser outside the measurements
+    tracemalloc.start()
+    ast = parse_program(program)
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    nodes = count_nodes(ast)
+    best_parse = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        parse_program(program)
+        best_parse = min(best_parse, time.perf_counter() - start)
+    report("AST with source lines: 2,000 generated blocks", [[
+        nodes, sys.getsizeof(ast), f"{heap / nodes:.1f}", f"{best_parse / nodes * 1e6:.2f}",
+    ]], ["nodes", "node bytes", "heap bytes/node", "parse us/node"])
+
+    def v3(inp):
+        return InterpreterV3(console_output=False, inp=inp)
+
+    def profiled(inp):
+        interpreter = v3(inp)
+        lineprof.LineProfiler(interpreter).attach()
+        return interpreter
+
+    rows = []
+    for name, program in PROGRAMS.items():
+        plain = best_time(v3, program)
+        with_profiler = best_time(profiled, program)
+        rows.append([name, f"{plain * 1000:.1f}", f"{with_profiler * 1000:.1f}", f"{(with_profiler / plain - 1) * 100:+.1f}%"])
+    report("line profiler (v3): overhead of timing every statement", rows,
+           ["program", "plain ms", "profiled ms", "overhead"])
+
+
+@benchmark
+def bench_coverage():
+    def v3(inp):
+        return InterpreterV3(console_output=False, inp=inp)
+
+    rows = []
+    for name, program in PROGRAMS.items():
+        coverage = brewcov.Coverage(program)
+
+        def covered(inp):
+            interpreter = v3(inp)
+            interpreter.coverage = coverage.flags
+            return interpreter
+
+        plain = best_time(v3, program)
+        with_coverage = best_time(covered, program)
+        overhead = with_coverage / plain - 1
+        verdict = "ok" if overhead <= COVERAGE_BUDGET else "over budget"
+        rows.append([name, f"{plain * 1000:.1f}", f"{with_coverage * 1000:.1f}", f"{overhead * 100:+.1f}%", verdict])
+    report(f"coverage (v3): slowdown of collecting it (budget {COVERAGE_BUDGET:.0%})", rows,
+           ["program", "plain ms", "coverage ms", "overhead", "budget"])
+
+
+# how many block scopes a v3 run of program creates
+def count_scopes(program, inp=None):
+    created = 0
+    push_block = env_v2.EnvironmentManager.push_block
+
+    def counting_push_block(env):
+        nonlocal created
+        created += 1
+        push_block(env)
+
+    env_v2.EnvironmentManager.push_block = counting_push_block
+    try:
+        InterpreterV3(console_output=False, inp=inp).run(program)
+    finally:
+        env_v2.EnvironmentManager.push_block = push_block
+    return created
+
+
+@benchmark
+def bench_scopes():
+    def v3(inp):
+        return InterpreterV3(console_output=False, inp=inp)
+
+    rows = []
+    programs = dict(PROGRAMS, triple_loops=TRIPLE_LOOPS, collatz=COLLATZ)
+    inputs = {"collatz": ["77031"]}
+    for name, program in programs.items():
+        inp = inputs.get(name)
+        InterpreterV3.ELIDE_SCOPES = False
+        try:
+            scoped = best_time(v3, program, inp)
+            scoped_count = count_scopes(program, inp)
+        finally:
+            InterpreterV3.ELIDE_SCOPES = True
+        elided = best_time(v3, program, inp)
+        elided_count = count_scopes(program, inp)
+        rows.append([name, scoped_count, elided_count, f"{scoped * 1000:.1f}", f"{elided * 1000:.1f}",
+                     f"{scoped / elided:.2f}x"])
+    report("block scopes (v3): every block scoped vs bare blocks elided", rows,
+           ["program", "scopes before", "scopes after", "before ms", "after ms", "speedup"])
+
+
+@benchmark
+def bench_lazy():
+    rows = []
+    for name, program in V4_PROGRAMS.items():
+        interpreter = InterpreterV4(console_output=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracemalloc.start()
+            start = time.perf_counter()
+            interpreter.run(program)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        rows.append([name, f"{elapsed * 1000:.1f}", peak // 1024])
+    report("lazy evaluation (v4): traced run", rows, ["program", "ms", "peak KB"])
+
+
+@benchmark
+def bench_tracing():
+    def untraced(inp):
+        return InterpreterV4(console_output=False, inp=inp)
+
+    def errors_only(inp):
+        return InterpreterV4(console_output=False, inp=inp,
+                             trace_output=brewtrace.Tracer(brewtrace.RingSink(), brewtrace.Level.ERROR))
+
+    rows = []
+    for name, program in V4_PROGRAMS.items():
+        sink = brewtrace.RingSink(capacity=1000)
+        off = best_time(untraced, program)
+        errors = best_time(errors_only, program)
+        full = best_time(lambda inp: InterpreterV4(console_output=False, inp=inp,
+                                                   trace_output=brewtrace.Tracer(sink)), program, repeat=1)
+        records = len(sink.records) + sink.dropped
+        rows.append([name, f"{off * 1000:.1f}", f"{errors * 1000:.1f}", f"{full * 1000:.1f}", records])
+    report("tracing (v4): no tracer vs errors only vs every category into a ring", rows,
+           ["program", "off ms", "errors ms", "all ms", "records"])
+
+
+@benchmark
+def bench_jit():
+    def v3(inp):
+        return InterpreterV3(console_output=False, inp=inp)
+
+    rows = []
+    for name, program in (("fib", FIB), ("called_loops", CALLED_LOOPS), ("called_structs", CALLED_STRUCTS)):
+        threshold = InterpreterV3.JIT_THRESHOLD
+        InterpreterV3.JIT_THRESHOLD = None
+        try:
+            interpreted = best_time(v3, program)
+            expected = InterpreterV3(console_output=False)
+            expected.run(program)
+        finally:
+            InterpreterV3.JIT_THRESHOLD = threshold
+        compiled = best_time(v3, program)
+        actual = InterpreterV3(console_output=False)
+        actual.run(program)
+        assert actual.get_output() == expected.get_output(), f"{name}: compiled output differs"
+        rows.append([name, f"{interpreted * 1000:.1f}", f"{compiled * 1000:.1f}", f"{interpreted / compiled:.1f}x"])
+    report(f"jit (v3): tree walker vs functions compiled after {InterpreterV3.JIT_THRESHOLD} calls", rows,
+           ["program", "interpreted ms", "jit ms", "speedup"])
+
+
+@benchmark
+def bench_pool():
+    runs = 10**5
+    rows = []
+    for name, cls in (("v3", InterpreterV3), ("v4", InterpreterV4)):
+        start = time.perf_counter()
+        for _ in range(runs):
+            cls(console_output=False)
+        construct = time.perf_counter() - start
+
+        interpreters = pool.InterpreterPool(cls)
+        start = time.perf_counter()
+        for _ in range(runs):
+            interpreters.release(interpreters.acquire())
+        recycle = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            interpreter = cls(console_output=False)
+            interpreter.run(HELLO)
+        fresh = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            with interpreters.interpreter() as interpreter:
+                interpreter.run(HELLO)
+        pooled = time.perf_counter() - start
+        rows.append([name, f"{construct / runs * 1e6:.1f}", f"{recycle / runs * 1e6:.1f}",
+                     f"{fresh * 1000:.0f}", f"{pooled * 1000:.0f}", f"{fresh / pooled:.2f}x"])
+    report(f"pooling: {runs:,} runs of a one-line program on fresh vs pooled instances", rows,
+           ["version", "new instance us", "acquire+release us", "fresh ms", "pooled ms", "speedup"])
+
+
+@benchmark
+def bench_green():
+    sessions = 5000
+    rounds = 5
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    scheduler = green.Scheduler()
+    waiting = [scheduler.spawn(ACCUMULATE) for _ in range(sessions)]
+    scheduler.run()
+    idle = (tracemalloc.get_traced_memory()[0] - before) / sessions
+    tracemalloc.stop()
+    assert scheduler.counts()["WAITING"] == sessions
+
+    start = time.perf_counter()
+    for round in range(rounds):
+        for session in waiting:
+            session.feed(str(round + 1))
+        scheduler.run()
+    wakeups = time.perf_counter() - start
+    assert all(session.output()[-1] == str(rounds * (rounds + 1) // 2) for session in waiting)
+    report(f"green threads: {sessions:,} sessions waiting for input", [
+        [f"{idle / 1024:.1f}", f"{sessions * rounds / wakeups:,.0f}"]],
+        ["KB per idle session", "inputs handled per s"])
+
+    rows = []
+    copies = 20
+    threshold = InterpreterV3.JIT_THRESHOLD
+    InterpreterV3.JIT_THRESHOLD = None  # green sessions don't compile
+    try:
+        plain = best_time(lambda inp: InterpreterV3(console_output=False, inp=inp), FIB, repeat=1)
+    finally:
+        InterpreterV3.JIT_THRESHOLD = threshold
+    for quantum in (10, 100, 1000):
+        scheduler = green.Scheduler(quantum)
+        for _ in range(copies):
+            scheduler.spawn(FIB)
+        start = time.perf_counter()
+        scheduler.run()
+        elapsed = time.perf_counter() - start
+        assert scheduler.counts()["DONE"] == copies
+        rows.append([quantum, f"{scheduler.slices:,}", f"{scheduler.slices / elapsed:,.0f}",
+                     f"{elapsed * 1000:.0f}", f"{plain * copies * 1000:.0f}"])
+    report(f"green threads: {copies} copies of fib sharing the CPU, round robin", rows,
+           ["quantum", "slices", "slices per s", "green ms", "tree walker, one after another ms"])
+
+
+@benchmark
+def bench_arrays():
+    def v3(inp):
+        return InterpreterV3(console_output=False, inp=inp)
+
+    rows = []
+    for name, array_program, list_program in (("sort", ARRAY_SORT, LIST_SORT),
+                                              ("prefix sums", ARRAY_PREFIX, LIST_PREFIX)):
+        # timed first, so that the parser is loaded before memory is traced
+        with_array = best_time(v3, array_program, repeat=3)
+        with_list = best_time(v3, list_program, repeat=3)
+        outputs = []
+        peaks = []
+        for program in (array_program, list_program):
+            interpreter = InterpreterV3(console_output=False)
+            tracemalloc.start()
+            interpreter.run(program)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            outputs.append(interpreter.get_output())
+        assert outputs[0] == outputs[1], f"{name}: the array and list programs disagree"
+        rows.append([name, f"{with_array * 1000:.0f}", f"{with_list * 1000:.0f}", f"{with_list / with_array:.2f}x",
+                     f"{peaks[0] / 1024:.0f}", f"{peaks[1] / 1024:.0f}"])
+    report("arrays (v3): the same programs on arrays and on linked lists of structs", rows,
+           ["program", "array ms", "list ms", "speedup", "array peak KB", "list peak KB"])
+
+
+@benchmark
+def bench_maps():
+    def v3(inp):
+        return InterpreterV3(console_output=False, inp=inp)
+
+    words = word_input(1500, 500)
+    rows = []
+    for name, map_program, list_program, inp in (("word count", MAP_WORD_COUNT, LIST_WORD_COUNT, words),
+                                                 ("memoised collatz", MAP_COLLATZ, LIST_COLLATZ, None)):
+        with_map = best_time(v3, map_program, inp, repeat=3)
+        with_list = best_time(v3, list_program, inp, repeat=1)  # each lookup scans the list
+        outputs = []
+        for program in (map_program, list_program):
+            interpreter = v3(inp)
+            interpreter.run(program)
+            outputs.append(interpreter.get_output())
+        assert outputs[0] == outputs[1], f"{name}: the map and list programs disagree"
+        rows.append([name, f"{with_map * 1000:.0f}", f"{with_list * 1000:.0f}", f"{with_list / with_map:.1f}x"])
+    report("maps (v3): lookups in a map and in a linked list of structs", rows,
+           ["program", "map ms", "list ms", "speedup"])
+
+
+@benchmark
+def bench_host():
+    def python_dot(a, b):
+        return sum(x * y for x, y in zip(a, b))
+
+    def numpy_dot(a, b):
+        return int(np.dot(np.frombuffer(a, dtype=np.int64), np.frombuffer(b, dtype=np.int64)))
+
+    # makes v3 interpreters with the given host function, if any, registered
+    def interpreter_with(*registration):
+        def make(inp):
+            interpreter = InterpreterV3(console_output=False, inp=inp)
+            if registration:
+                interpreter.register_function(*registration)
+            return interpreter
+        return make
+
+    cases = [("dot product", "Brewin", DOT_LOOP, interpreter_with()),
+             ("dot product", "Python", DOT_HOST, interpreter_with("dot", ["int[]", "int[]"], "int", python_dot))]
+    if np is not None:
+        cases.append(("dot product", "numpy", DOT_HOST, interpreter_with("dot", ["int[]", "int[]"], "int", numpy_dot)))
+    cases += [("20,000 calls", "Brewin", CALLS_LOOP, interpreter_with()),
+              ("20,000 calls", "Python", CALLS_HOST, interpreter_with("twice", ["int"], "int", lambda n: n + n))]
+    for threshold in (None, InterpreterV3.JIT_THRESHOLD):
+        rows = []
+        baseline = {}
+        for name, implementation, program, make in cases:
+            def make_at_threshold(inp, make=make):
+                interpreter = make(inp)
+                interpreter.jit_threshold = threshold
+                return interpreter
+            elapsed = best_time(make_at_threshold, program, repeat=3)
+            baseline.setdefault(name, elapsed)
+            rows.append([name, implementation, f"{elapsed * 1000:.1f}", f"{baseline[name] / elapsed:.2f}x"])
+        jit = "off" if threshold is None else f"after {threshold} calls"
+        report(f"host functions (v3, JIT {jit}): Brewin code vs registered Python functions", rows,
+               ["program", "implementation", "ms", "speedup"])
+
+
+@benchmark
+def bench_heap():
+    # a profiler patches classes while it is attached, so each run attaches its own
+    # and detaches it when the run ends
+    def profiled_time(version, program, attached, repeat=3):
+        best = float("inf")
+        for _ in range(repeat):
+            interpreter = heapprof.INTERPRETERS[version](console_output=False)
+            profiler = heapprof.HeapProfiler(interpreter)
+            profiler.attach()
+            if not attached:
+                profiler.detach()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                interpreter.run(program)
+            best = min(best, time.perf_counter() - start)
+            if attached:
+                profiler.detach()
+        return best
+
+    rows = []
+    cases = [(3, "struct list", STRUCT_LIST), (3, "list sort", LIST_SORT), (4, "lazy chain", LAZY_CHAIN)]
+    for version, name, program in cases:
+        plain = profiled_time(version, program, attached=False)
+        attached = profiled_time(version, program, attached=True)
+        rows.append([f"{name} (v{version})", f"{plain * 1000:.1f}", f"{attached * 1000:.1f}",
+                     f"{(attached / plain - 1) * 100:+.1f}%"])
+    report("heap profiler: detached vs counting allocations and a snapshot at exit", rows,
+           ["program", "detached ms", "attached ms", "overhead"])
+
+
+@benchmark
+def bench_artifact():
+    program = library_program(300, 20, 5)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "library.brc")
+        artifact.compile(program, path)
+        size = os.path.getsize(path)
+
+        def timed(start_run):
+            best, heap = float("inf"), 0
+            for _ in range(3):
+                interpreter = InterpreterV3(console_output=False)
+                tracemalloc.start()
+                start = time.perf_counter()
+                start_run(interpreter)
+                best = min(best, time.perf_counter() - start)
+                heap = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+            return best, heap
+
+        parse_program(program)  # build the parser outside the measurements
+        rows = []
+        for name, start_run in (("parse source", lambda interpreter: interpreter.run(program)),
+                                ("load artifact", lambda interpreter: interpreter.run_artifact(path))):
+            elapsed, heap = timed(start_run)
+            rows.append([name, f"{elapsed * 1000:.1f}", heap // 1024])
+    report(f"artifacts (v3): 300 functions, 5 called; artifact {size // 1024} KB, source {len(program) // 1024} KB",
+           rows, ["run from", "ms", "heap KB after"])
+
+
+@benchmark
+def bench_lazy_parsing():
+    program = library_program(50000, 1, 5)
+    parse_program(HELLO)  # build the parser outside the measurements
+    rows = []
+    for lazy, repeat in ((False, 1), (True, 3)):
+        InterpreterV3.LAZY_PARSING = lazy
+        try:
+            elapsed = best_time(lambda inp: InterpreterV3(console_output=False, inp=inp), program, repeat=repeat)
+        finally:
+            InterpreterV3.LAZY_PARSING = False
+        rows.append(["lazy" if lazy else "eager", f"{elapsed * 1000:.0f}"])
+    eager_ms = float(rows[0][1])
+    for row in rows:
+        row.append(f"{eager_ms / float(row[1]):.1f}x")
+    report(f"lazy parsing (v3): run a 50,000-function source ({len(program) // 1024} KB) that calls 5 of them",
+           rows, ["bodies parsed", "ms", "speedup"])
+
+
+@benchmark
+def bench_modules():
+    count = 100
+    # module i defines 20 functions, and main imports every module and calls one of each
+    sources = {f"m{i}.br": library_program(20, 5, 0).replace("func f", f"func m{i}_f").split("\nfunc main")[0]
+               for i in range(count)}
+    imports = "".join(f'import "m{i}.br";\n' for i in range(count))
+    calls = " ".join(f"m{i}_f0(1);" for i in range(count))
+    sources["main.br"] = imports + f"func main(): void {{ {calls} }}"
+    concatenated = "\n".join(source for name, source in sources.items() if name != "main.br")
+    concatenated += f"\nfunc main(): void {{ {calls} }}"
+    parse_program(HELLO)  # build the parser outside the measurements
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, source in sources.items():
+            with open(os.path.join(directory, name), "w") as file:
+                file.write(source)
+        main_path = os.path.join(directory, "main.br")
+        cache_dir = os.path.join(directory, "cache")
+
+        def build(cache):
+            interpreter = InterpreterV3(console_output=False)
+            linker = modules.Linker(interpreter, cache)
+            start = time.perf_counter()
+            interpreter.load(linker.link_file(main_path))
+            return time.perf_counter() - start, linker.parsed
+
+        rows = []
+        start = time.perf_counter()
+        InterpreterV3(console_output=False).load(parse_program(concatenated))
+        rows.append(["one concatenated source", f"{(time.perf_counter() - start) * 1000:.0f}", "all"])
+        for label in ("modules, empty cache", "modules, nothing changed"):
+            elapsed, parsed = build(cache_dir)
+            rows.append([label, f"{elapsed * 1000:.0f}", parsed])
+        with open(os.path.join(directory, "m50.br"), "a") as file:
+            file.write("\nfunc m50_extra(): int { return 1; }\n")
+        elapsed, parsed = build(cache_dir)
+        rows.append(["modules, one line added to one", f"{elapsed * 1000:.0f}", parsed])
+    report(f"modules (v3): building a {count}-module program", rows, ["build from", "ms", "modules parsed"])
+
+
+@benchmark
+def bench_inlining():
+    sizes = (None, 10, InterpreterV3.INLINE_MAX_NODES, 200)
+    rows = []
+    for name, program in (("small_helpers", SMALL_HELPERS), ("20,000 calls", CALLS_LOOP), ("fib", FIB),
+                          ("called_loops", CALLED_LOOPS)):
+        times = []
+        outputs = []
+        for max_nodes in sizes:
+            def make(inp, max_nodes=max_nodes):
+                interpreter = InterpreterV3(console_output=False, inp=inp)
+                interpreter.jit_threshold = None  # inlining is the tree walker's
+                interpreter.inline_max_nodes = max_nodes
+                return interpreter
+            times.append(best_time(make, program))
+            interpreter = make(None)
+            interpreter.run(program)
+            outputs.append(interpreter.get_output())
+        assert all(output == outputs[0] for output in outputs), f"{name}: inlined output differs"
+        rows.append([name] + [f"{elapsed * 1000:.1f}" for elapsed in times]
+                    + [f"{times[0] / times[2]:.2f}x"])
+    report("inlining (v3, JIT off): calls vs bodies of up to n nodes inlined", rows,
+           ["program", "calls ms"] + [f"n={size} ms" for size in sizes[1:]]
+           + [f"speedup at n={InterpreterV3.INLINE_MAX_NODES}"])
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark {name}; choose from {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
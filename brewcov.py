@@ -0,0 +1,233 @@
+# Statement, branch and function coverage for Brewin test suites
+# Parsing a program numbers its nodes from 0 (Element.node_id), and parsing the same
+# text again gives the same numbers, so coverage of a program is a bytearray indexed by
+# node id. The v3 and v4 interpreters and the batch runner or their flags into the
+# byte of every node they run (see InterpreterBase.COVERED and the BRANCH_ flags) when
+# their coverage attribute is set to one; there are no per-node dict lookups. A program
+# that imports modules is linked as Interpreter.run links it, which numbers the nodes of
+# all its modules as one program (see modules.py), and its tracefile has a record for
+# each module's source file.
+#
+# Runs are merged by handing the same bytearray to each of them, or, for runs in other
+# processes, by or-ing their bytearrays together. Coverage.lcov() writes the result in
+# LCOV's tracefile format, keyed by source line. Flags only record whether something
+# ran, so line and branch counts are 0 or 1.
+#
+# usage: python brewcov.py program.br [input files...] [--version 3|4] [--batch]
+#                          [--processes N] [-o coverage.info]
+# Each input file holds one run's input lines; with none, the program runs once.
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+import batch
+import interpreterv3
+import interpreterv4
+import modules
+from brewparse import parse_program
+from intbase import InterpreterBase
+
+INTERPRETERS = {
+    3: interpreterv3.Interpreter,
+    4: interpreterv4.Interpreter,
+}
+DEFAULT_VERSION = 3
+
+# statement nodes whose children are statement lists
+NESTED_STATEMENTS = ("statements", "else_statements")
+
+
+class Coverage:
+    def __init__(self, program, path="<program>", version=DEFAULT_VERSION):
+        self.program = program
+        self.path = path
+        self.version = version
+        self.paths = [path]  # the source files, main's first
+        self.functions = []  # (node id, line, name, path)
+        self.statements = []  # (node id, line, path)
+        self.branches = []  # (node id, line, path) of every if and for
+        self.handlers = []  # (node id of the catch, line of its try, position among the try's catches, path)
+        ast = parse_program(program, version=version)
+        sources = [(path, ast)]
+        if ast.get("imports"):
+            linker = modules.Linker(INTERPRETERS[version](console_output=False))
+            linker.link(ast)
+            sources = [(path if module is ast else module_path, module) for module_path, module in linker.modules]
+            self.paths += [module_path for module_path, module in linker.modules if module is not ast]
+        # nodes are numbered bottom-up, so a function's node has the largest id of any in it
+        size = 0
+        for _, module in sources:
+            for func_ast in module.get("functions"):
+                size = max(size, func_ast.node_id + 1)
+        self.flags = bytearray(size)
+        for module_path, module in sources:
+            self.__index(module_path, module)
+        self.statements.sort(key=lambda statement: statement[1])
+        self.branches.sort(key=lambda branch: branch[1])
+
+    def __index(self, path, ast):
+        pending = []
+        for func_ast in ast.get("functions"):
+            self.functions.append((func_ast.node_id, func_ast.line_num, func_ast.get("name"), path))
+            pending.append(func_ast.get("statements"))
+        while pending:
+            for statement in pending.pop():
+                self.statements.append((statement.node_id, statement.line_num, path))
+                kind = statement.elem_type
+                if kind in (InterpreterBase.IF_NODE, InterpreterBase.FOR_NODE):
+                    self.branches.append((statement.node_id, statement.line_num, path))
+                if kind == InterpreterBase.TRY_NODE:
+                    for position, catch_ast in enumerate(statement.get("catchers")):
+                        self.handlers.append((catch_ast.node_id, statement.line_num, position, path))
+                        pending.append(catch_ast.get("statements"))
+                for key in NESTED_STATEMENTS:
+                    nested = statement.get(key)
+                    if isinstance(nested, list):
+                        pending.append(nested)
+
+    # or the flags of other runs of the same program, e.g. from another process, into these
+    def merge(self, flags):
+        if len(flags) != len(self.flags):
+            raise ValueError("coverage of a different program")
+        merged = int.from_bytes(self.flags, "little") | int.from_bytes(flags, "little")
+        self.flags[:] = merged.to_bytes(len(self.flags), "little")
+
+    def run(self, inp=None, version=None):
+        interpreter = INTERPRETERS[version or self.version](console_output=False, inp=inp)
+        interpreter.coverage = self.flags
+        # a run that fails with a Brewin error still covers what it ran up to the error;
+        # anything else is a fault in the interpreter, not in the program
+        try:
+            interpreter.run(self.program)
+        except ZeroDivisionError:
+            pass  # v3 has no error type for dividing by zero, and lets Python's through
+        except Exception:
+            if interpreter.get_error_type_and_line()[0] is None:
+                raise
+        return interpreter
+
+    def run_batch(self, inputs):
+        return batch.Batch(self.program).run(inputs, coverage=self.flags)
+
+    # run every input list, spread over worker processes, and merge their coverage here
+    def run_all(self, inputs, version=None, use_batch=False, processes=None):
+        version = version or self.version
+        processes = processes or os.cpu_count() or 1
+        chunks = [inputs[i::processes] for i in range(processes) if inputs[i::processes]]
+        if len(chunks) <= 1:
+            for chunk in chunks:
+                _cover_chunk((self.program, chunk, version, use_batch), coverage=self)
+            return
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with context.Pool(len(chunks)) as pool:
+            for flags in pool.imap_unordered(_cover_chunk, [(self.program, chunk, version, use_batch) for chunk in chunks]):
+                self.merge(flags)
+
+    def is_covered(self, node_id, flag=InterpreterBase.COVERED):
+        return bool(self.flags[node_id] & flag)
+
+    # a summary of (covered, total) for lines, branches and functions
+    def summary(self):
+        lines = self.__line_hits()
+        branches = self.__branch_hits()
+        return {
+            "lines": (sum(lines.values()), len(lines)),
+            "branches": (sum(taken for *_, taken in branches if taken == 1), len(branches)),
+            "functions": (sum(self.is_covered(node_id) for node_id, *_ in self.functions), len(self.functions)),
+        }
+
+    # (path, line) -> whether it ran
+    def __line_hits(self):
+        hits = {}
+        for node_id, line, path in self.statements:
+            hits[path, line] = hits.get((path, line), 0) | self.is_covered(node_id)
+        return hits
+
+    # (path, line, block, branch, taken) for LCOV's BRDA records; taken is None where the
+    # statement holding the branch never ran
+    def __branch_hits(self):
+        branches = []
+        for block, (node_id, line, path) in enumerate(self.branches):
+            ran = self.is_covered(node_id)
+            for branch, flag in enumerate((InterpreterBase.BRANCH_TAKEN, InterpreterBase.BRANCH_NOT_TAKEN)):
+                branches.append((path, line, block, branch, int(self.is_covered(node_id, flag)) if ran else None))
+        try_blocks = {}
+        for node_id, line, position, path in self.handlers:
+            block = try_blocks.setdefault((path, line), len(self.branches) + len(try_blocks))
+            branches.append((path, line, block, position, int(self.is_covered(node_id))))
+        return sorted(branches)
+
+    def lcov(self):
+        return "".join(self.__record(path) for path in self.paths)
+
+    # the tracefile record of one source file
+    def __record(self, path):
+        records = ["TN:", f"SF:{path}"]
+        defined = sorted((f for f in self.functions if f[3] == path), key=lambda f: f[1])
+        names = [name for _, _, name, _ in defined]
+        functions = []
+        for node_id, line, name, _ in defined:
+            if names.count(name) > 1:  # overloads by argument count need distinct names
+                name = f"{name}#{line}"
+            functions.append((line, name, int(self.is_covered(node_id))))
+        records += [f"FN:{line},{name}" for line, name, _ in functions]
+        records += [f"FNDA:{hit},{name}" for _, name, hit in functions]
+        records += [f"FNF:{len(functions)}", f"FNH:{sum(hit for *_, hit in functions)}"]
+
+        branches = [branch[1:] for branch in self.__branch_hits() if branch[0] == path]
+        for line, block, branch, taken in branches:
+            records.append(f"BRDA:{line},{block},{branch},{'-' if taken is None else taken}")
+        records += [f"BRF:{len(branches)}", f"BRH:{sum(taken == 1 for *_, taken in branches)}"]
+
+        lines = {line: hit for (file, line), hit in self.__line_hits().items() if file == path}
+        records += [f"DA:{line},{hit}" for line, hit in sorted(lines.items())]
+        records += [f"LF:{len(lines)}", f"LH:{sum(lines.values())}", "end_of_record"]
+        return "\n".join(records) + "\n"
+
+
+# worker side of run_all(): the flags of running one chunk of inputs
+def _cover_chunk(job, coverage=None):
+    program, inputs, version, use_batch = job
+    if coverage is None:
+        coverage = Coverage(program, version=version)
+    if use_batch:
+        coverage.run_batch(inputs)
+    else:
+        for inp in inputs:
+            coverage.run(inp, version)
+    return bytes(coverage.flags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure which lines, branches and functions of a Brewin program run")
+    parser.add_argument("program", help="source file to run")
+    parser.add_argument("inputs", nargs="*", help="files holding one run's input lines each")
+    parser.add_argument("--version", type=int, choices=sorted(INTERPRETERS), default=DEFAULT_VERSION)
+    parser.add_argument("--batch", action="store_true", help="run the inputs through the v3 batch runner")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("-o", "--output", default="coverage.info", help="LCOV tracefile to write")
+    args = parser.parse_args()
+
+    with open(args.program) as file:
+        coverage = Coverage(file.read(), path=os.path.abspath(args.program), version=args.version)
+    if args.inputs:
+        inputs = []
+        for path in args.inputs:
+            with open(path) as file:
+                inputs.append(file.read().splitlines())
+        coverage.run_all(inputs, args.version, args.batch, args.processes)
+    else:
+        coverage.run(version=args.version)
+
+    with open(args.output, "w") as file:
+        file.write(coverage.lcov())
+    for kind, (covered, total) in coverage.summary().items():
+        percent = covered / total * 100 if total else 100.0
+        print(f"{kind}: {covered}/{total} ({percent:.1f}%)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
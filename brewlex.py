@@ -1,5 +1,4 @@
-
-from ply import lex
+import re
 
 reserved = (
     "VAR",
@@ -16,17 +15,30 @@ reserved = (
     "TRY",
     "CATCH",
     "RAISE",
+    "MAP",
+    "IMPORT",
 )
 
 reserved_map = {}
 for r in reserved:
     reserved_map[r.lower()] = r
 
+# Keywords only v3 has. The four versions share this lexer and grammar, so for the
+# others these words are names, as they were before v3 added them
+V3_RESERVED = ("MAP", "IMPORT")
+# the keywords of each version, for t_NAME to look names up in
+reserved_maps = {
+    3: reserved_map,
+    None: {word: r for word, r in reserved_map.items() if r not in V3_RESERVED},
+}
+
 tokens = reserved + (
     "LPAREN",
     "RPAREN",
     "LBRACE",
     "RBRACE",
+    "LBRACKET",
+    "RBRACKET",
     "COMMA",
     "COLON",
     "SEMI",
@@ -78,6 +90,8 @@ t_LPAREN = r"\("
 t_RPAREN = r"\)"
 t_LBRACE = r"\{"
 t_RBRACE = r"\}"
+t_LBRACKET = r"\["
+t_RBRACKET = r"\]"
 t_COMMA = r","
 t_COLON = r":"
 t_SEMI = r";"
@@ -106,7 +120,7 @@ def t_NUMBER(t):
 
 def t_NAME(t):
     r"[A-Za-z_][\w_]*"
-    t.type = reserved_map.get(t.value, "NAME")
+    t.type = t.lexer.reserved_map.get(t.value, "NAME")
     return t
 
 def t_newline(t):
@@ -129,8 +143,54 @@ def t_error(t):
     print(f"Illegal character {t.value[0]}")
     t.lexer.skip(1)
 
-def reset_lineno():
-    lexer.lineno = 1
-
-# Build the lexer
-lexer = lex.lex()
+# The lexer is built on first use rather than at import, so that importing the
+# parser stays cheap for short-lived processes. lex() reads this module's globals in
+# definition order, which the t_ string rules above depend on
+_lexer = None
+
+
+def get_lexer():
+    global _lexer
+    if _lexer is None:
+        from ply import lex
+
+        _lexer = lex.lex()
+        _lexer.reserved_map = reserved_map
+    return _lexer
+
+
+def reset_lineno(line=1):
+    get_lexer().lineno = line
+
+
+# lex the next input as the given interpreter version would
+def set_version(version):
+    get_lexer().reserved_map = reserved_maps.get(version, reserved_maps[None])
+
+
+# Top-level function definitions, found by matching braces outside string literals and
+# comments without tokenizing anything else: (offset of `func`, offset of the body's
+# `{`, offset after its `}`) for each, or None if the braces don't balance
+_SCANNED = re.compile(r'"[^"\n]*"|/\*.*?\*/|\bfunc\b|[{}]', re.S)
+
+
+def scan_functions(program):
+    functions = []
+    depth = 0
+    func_start = body_start = None
+    for match in _SCANNED.finditer(program):
+        text = match.group()
+        if text == "{":
+            if depth == 0 and func_start is not None:
+                body_start = match.start()
+            depth += 1
+        elif text == "}":
+            depth -= 1
+            if depth < 0:
+                return None
+            if depth == 0 and body_start is not None:
+                functions.append((func_start, body_start, match.end()))
+                func_start = body_start = None
+        elif text == "func" and depth == 0:
+            func_start = match.start()
+    return functions if depth == 0 else None
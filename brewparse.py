@@ -1,7 +1,11 @@
+import itertools
+import os
+import re
+import sys
+
 from element import Element
 from brewlex import *
 from intbase import InterpreterBase
-from ply import yacc
 
 # Parsing rules
 
@@ -14,6 +18,19 @@ precedence = (
     ("right", "UMINUS", "NOT"),
 )
 
+# ids for the nodes of the program being parsed; parsing the same text again hands out
+# the same ids, so tools like brewcov can index per-node data by them
+_node_ids = itertools.count()
+
+
+# an AST node that records the source line of the index-th symbol of the production
+def node(p, index, elem_type, **kwargs):
+    element = Element(elem_type, **kwargs)
+    element.line_num = p.lineno(index)
+    element.node_id = next(_node_ids)
+    return element
+
+
 def collapse_items(p, group_index, singleton_index):
     if len(p) == 2:
         p[0] = [p[1]]
@@ -22,13 +39,28 @@ def collapse_items(p, group_index, singleton_index):
         p[0].append(p[singleton_index])
 
 
+# imports come first, and a module may define only structs (see modules.py)
 def p_program(p):
-    """program : structs funcs
+    """program : imports structs funcs
+    | imports structs
+    | imports funcs
+    | structs funcs
+    | structs
     | funcs"""
-    if len(p) == 2:
-        p[0] = Element(InterpreterBase.PROGRAM_NODE, structs=[], functions=p[1])
-    else:
-        p[0] = Element(InterpreterBase.PROGRAM_NODE, structs=p[1], functions=p[2])
+    parts = {"imports": [], "structs": [], "funcs": []}
+    for position in range(1, len(p)):
+        parts[p.slice[position].type] = p[position]
+    p[0] = Element(InterpreterBase.PROGRAM_NODE, structs=parts["structs"], functions=parts["funcs"],
+                   imports=parts["imports"])
+
+def p_imports(p):
+    """imports : imports import
+    | import"""
+    collapse_items(p, 1, 2)  # 2 -> import
+
+def p_import(p):
+    "import : IMPORT STRING SEMI"
+    p[0] = node(p, 1, InterpreterBase.IMPORT_NODE, path=p[2])
 
 def p_structs(p):
     """structs : structs struct
@@ -37,7 +69,7 @@ def p_structs(p):
 
 def p_struct(p):
    "struct : STRUCT NAME LBRACE fields RBRACE"
-   p[0] = Element(InterpreterBase.STRUCT_NODE, name=p[2], fields=p[4])
+   p[0] = node(p, 1, InterpreterBase.STRUCT_NODE, name=p[2], fields=p[4])
 
 def p_fields(p):
    """fields : fields field
@@ -45,44 +77,54 @@ def p_fields(p):
    collapse_items(p, 1, 2)  # 2 -> field
 
 def p_field(p):
-  "field : NAME COLON NAME SEMI"  # field_name: type
-  p[0] = Element(InterpreterBase.FIELD_DEF_NODE, name=p[1], var_type=p[3])
+  "field : NAME COLON type SEMI"  # field_name: type
+  p[0] = node(p, 1, InterpreterBase.FIELD_DEF_NODE, name=p[1], var_type=p[3])
 
 def p_funcs(p):
     """funcs : funcs func
     | func"""
     collapse_items(p, 1, 2)  # 2 -> func
 
-# Note: the second NAME is the return type, not a function name
 def p_func(p):
-    """func : FUNC NAME LPAREN formal_args RPAREN COLON NAME LBRACE statements RBRACE
-    | FUNC NAME LPAREN RPAREN COLON NAME LBRACE statements RBRACE"""
+    """func : FUNC NAME LPAREN formal_args RPAREN COLON type LBRACE statements RBRACE
+    | FUNC NAME LPAREN RPAREN COLON type LBRACE statements RBRACE"""
     if len(p) == 11:  # handle with 1+ formal args
-        p[0] = Element(InterpreterBase.FUNC_NODE, name=p[2], args=p[4], return_type = p[7], statements=p[9])
+        p[0] = node(p, 1, InterpreterBase.FUNC_NODE, name=p[2], args=p[4], return_type = p[7], statements=p[9])
     else:  # handle no formal args
-        p[0] = Element(InterpreterBase.FUNC_NODE, name=p[2], args=[], return_type = p[6], statements=p[8])
+        p[0] = node(p, 1, InterpreterBase.FUNC_NODE, name=p[2], args=[], return_type = p[6], statements=p[8])
 
 def p_func2(p):
     """func : FUNC NAME LPAREN formal_args RPAREN LBRACE statements RBRACE
     | FUNC NAME LPAREN RPAREN LBRACE statements RBRACE"""
     if len(p) == 9:  # handle with 1+ formal args
-        p[0] = Element(InterpreterBase.FUNC_NODE, name=p[2], args=p[4], return_type = None, statements=p[7])
+        p[0] = node(p, 1, InterpreterBase.FUNC_NODE, name=p[2], args=p[4], return_type = None, statements=p[7])
     else:  # handle no formal args
-        p[0] = Element(InterpreterBase.FUNC_NODE, name=p[2], args=[], return_type = None, statements=p[6])
+        p[0] = node(p, 1, InterpreterBase.FUNC_NODE, name=p[2], args=[], return_type = None, statements=p[6])
 
 def p_formal_args(p):
     """formal_args : formal_args COMMA formal_arg
     | formal_arg"""
     collapse_items(p, 1, 3)  # 3 -> formal_arg
 
-# Note: the second NAME is the return type, not a function name
 def p_formal_arg(p):
-    """formal_arg : NAME COLON NAME
+    """formal_arg : NAME COLON type
     | NAME"""
     if len(p) == 2:
-      p[0] = Element(InterpreterBase.ARG_NODE, name=p[1], var_type = None)
+      p[0] = node(p, 1, InterpreterBase.ARG_NODE, name=p[1], var_type = None)
     else:
-      p[0] = Element(InterpreterBase.ARG_NODE, name=p[1], var_type = p[3])
+      p[0] = node(p, 1, InterpreterBase.ARG_NODE, name=p[1], var_type = p[3])
+
+# a type name, or an array of them: int, Node, int[], Node[]
+def p_type(p):
+    """type : NAME
+    | NAME LBRACKET RBRACKET
+    | MAP LBRACKET NAME RBRACKET type"""
+    if len(p) == 2:
+        p[0] = p[1]
+    elif len(p) == 4:
+        p[0] = p[1] + "[]"
+    else:
+        p[0] = f"map[{p[3]}]{p[5]}"
 
 def p_statements(p):
     """statements : statements statement
@@ -96,15 +138,20 @@ def p_statement___assign(p):
 
 def p_assign(p):
     "assign : variable_w_dot ASSIGN expression"
-    p[0] = Element("=", name=p[1], expression=p[3])
+    p[0] = node(p, 2, "=", name=p[1], expression=p[3])
+
+def p_assign_index(p):
+    "assign : variable_w_dot LBRACKET expression RBRACKET ASSIGN expression"
+    array = node(p, 1, InterpreterBase.VAR_NODE, name=p[1])
+    p[0] = node(p, 5, InterpreterBase.INDEX_ASSIGN_NODE, array=array, subscript=p[3], expression=p[6])
 
 def p_statement___var(p):
-    """statement : VAR variable COLON NAME SEMI
+    """statement : VAR variable COLON type SEMI
     | VAR variable SEMI"""
     if len(p) == 6:
-      p[0] = Element(InterpreterBase.VAR_DEF_NODE, name=p[2], var_type=p[4])
+      p[0] = node(p, 1, InterpreterBase.VAR_DEF_NODE, name=p[2], var_type=p[4])
     else:
-      p[0] = Element(InterpreterBase.VAR_DEF_NODE, name=p[2], var_type=None)
+      p[0] = node(p, 1, InterpreterBase.VAR_DEF_NODE, name=p[2], var_type=None)
 
 def p_variable(p):
     "variable : NAME"
@@ -117,20 +164,25 @@ def p_variable_w_dot(p):
         p[0] = p[1] + "." + p[3]
     else:
         p[0] = p[1]
+    p.set_lineno(0, p.lineno(1))  # so the var node built from it knows its line
 
 def p_statement_if(p):
     """statement : IF LPAREN expression RPAREN LBRACE statements RBRACE
     | IF LPAREN expression RPAREN LBRACE statements RBRACE ELSE LBRACE statements RBRACE
     """
     if len(p) == 8:
-        p[0] = Element(
+        p[0] = node(
+            p,
+            1,
             InterpreterBase.IF_NODE,
             condition=p[3],
             statements=p[6],
             else_statements=None,
         )
     else:
-        p[0] = Element(
+        p[0] = node(
+            p,
+            1,
             InterpreterBase.IF_NODE,
             condition=p[3],
             statements=p[6],
@@ -139,7 +191,7 @@ def p_statement_if(p):
 
 def p_statement_try(p):
     """statement : TRY LBRACE statements RBRACE catchers"""
-    p[0] = Element(InterpreterBase.TRY_NODE, statements=p[3], catchers=p[5])
+    p[0] = node(p, 1, InterpreterBase.TRY_NODE, statements=p[3], catchers=p[5])
 
 def p_catches(p):
     """catchers : catchers catch
@@ -148,15 +200,15 @@ def p_catches(p):
 
 def p_catch(p):
     "catch : CATCH STRING LBRACE statements RBRACE"
-    p[0] = Element(InterpreterBase.CATCH_NODE, exception_type=p[2], statements=p[4])
+    p[0] = node(p, 1, InterpreterBase.CATCH_NODE, exception_type=p[2], statements=p[4])
 
 def p_statement_for(p):
     "statement : FOR LPAREN assign SEMI expression SEMI assign RPAREN LBRACE statements RBRACE"
-    p[0] = Element(InterpreterBase.FOR_NODE, init=p[3], condition=p[5], update=p[7], statements=p[10])
+    p[0] = node(p, 1, InterpreterBase.FOR_NODE, init=p[3], condition=p[5], update=p[7], statements=p[10])
 
 def p_statement_raise(p):
     "statement : RAISE expression SEMI"
-    p[0] = Element(InterpreterBase.RAISE_NODE, exception_type=p[2])
+    p[0] = node(p, 1, InterpreterBase.RAISE_NODE, exception_type=p[2])
 
 def p_statement_expr(p):
     "statement : expression SEMI"
@@ -170,21 +222,30 @@ def p_statement_return(p):
         expr = p[2]
     else:
         expr = None
-    p[0] = Element(InterpreterBase.RETURN_NODE, expression=expr)
+    p[0] = node(p, 1, InterpreterBase.RETURN_NODE, expression=expr)
 
 
 def p_expression_not(p):
     "expression : NOT expression"
-    p[0] = Element(InterpreterBase.NOT_NODE, op1=p[2])
+    p[0] = node(p, 1, InterpreterBase.NOT_NODE, op1=p[2])
 
 
 def p_expression_uminus(p):
     "expression : MINUS expression %prec UMINUS"
-    p[0] = Element(InterpreterBase.NEG_NODE, op1=p[2])
+    p[0] = node(p, 1, InterpreterBase.NEG_NODE, op1=p[2])
 
 def p_expression_new(p):
     "expression : NEW NAME"
-    p[0] = Element(InterpreterBase.NEW_NODE, var_type=p[2])
+    p[0] = node(p, 1, InterpreterBase.NEW_NODE, var_type=p[2])
+
+def p_expression_new_array(p):
+    "expression : NEW NAME LBRACKET expression RBRACKET"
+    p[0] = node(p, 1, InterpreterBase.NEW_ARRAY_NODE, var_type=p[2], size=p[4])
+
+
+def p_expression_new_map(p):
+    "expression : NEW MAP LBRACKET NAME RBRACKET type"
+    p[0] = node(p, 1, InterpreterBase.NEW_MAP_NODE, var_type=f"map[{p[4]}]{p[6]}")
 
 
 def p_arith_expression_binop(p):
@@ -198,7 +259,7 @@ def p_arith_expression_binop(p):
     | expression MINUS expression
     | expression MULTIPLY expression
     | expression DIVIDE expression"""
-    p[0] = Element(p[2], op1=p[1], op2=p[3])
+    p[0] = node(p, 2, p[2], op1=p[1], op2=p[3])
 
 
 def p_expression_group(p):
@@ -209,43 +270,49 @@ def p_expression_group(p):
 def p_expression_and_or(p):
     """expression : expression OR expression
     | expression AND expression"""
-    p[0] = Element(p[2], op1=p[1], op2=p[3])
+    p[0] = node(p, 2, p[2], op1=p[1], op2=p[3])
 
 
 def p_expression_number(p):
     "expression : NUMBER"
-    p[0] = Element(InterpreterBase.INT_NODE, val=p[1])
+    p[0] = node(p, 1, InterpreterBase.INT_NODE, val=p[1])
 
 
 def p_expression_bool(p):
     """expression : TRUE
     | FALSE"""
     bool_val = p[1] == InterpreterBase.TRUE_DEF
-    p[0] = Element(InterpreterBase.BOOL_NODE, val=bool_val)
+    p[0] = node(p, 1, InterpreterBase.BOOL_NODE, val=bool_val)
 
 
 def p_expression_nil(p):
     "expression : NIL"
-    p[0] = Element(InterpreterBase.NIL_NODE)
+    p[0] = node(p, 1, InterpreterBase.NIL_NODE)
 
 
 def p_expression_string(p):
     "expression : STRING"
-    p[0] = Element(InterpreterBase.STRING_NODE, val=p[1])
+    p[0] = node(p, 1, InterpreterBase.STRING_NODE, val=p[1])
 
 
 def p_expression_variable(p):
     "expression : variable_w_dot"
-    p[0] = Element(InterpreterBase.VAR_NODE, name=p[1])
+    p[0] = node(p, 1, InterpreterBase.VAR_NODE, name=p[1])
+
+
+def p_expression_index(p):
+    "expression : variable_w_dot LBRACKET expression RBRACKET"
+    array = node(p, 1, InterpreterBase.VAR_NODE, name=p[1])
+    p[0] = node(p, 2, InterpreterBase.INDEX_NODE, array=array, subscript=p[3])
 
 
 def p_func_call(p):
     """expression : NAME LPAREN args RPAREN
     | NAME LPAREN RPAREN"""
     if len(p) == 5:
-        p[0] = Element(InterpreterBase.FCALL_NODE, name=p[1], args=p[3])
+        p[0] = node(p, 1, InterpreterBase.FCALL_NODE, name=p[1], args=p[3])
     else:
-        p[0] = Element(InterpreterBase.FCALL_NODE, name=p[1], args=[])
+        p[0] = node(p, 1, InterpreterBase.FCALL_NODE, name=p[1], args=[])
 
 
 def p_expression_args(p):
@@ -261,14 +328,255 @@ def p_error(p):
         print("Syntax error at EOF")
 
 
-# exported function
-def parse_program(program):
-    reset_lineno()
-    ast = yacc.parse(program)
+# The parser is built from the frozen tables in parsetab.py the first time it is
+# needed. Unlike yacc.yacc(), this doesn't introspect the p_ docstrings, validate the
+# grammar, or try to rewrite parsetab.py and parser.out; run build_tables() after
+# changing the grammar to regenerate them
+_parser = None
+
+
+def get_parser():
+    global _parser
+    if _parser is None:
+        from ply import yacc
+        import parsetab
+
+        table = yacc.LRTable()
+        table.read_table(parsetab)
+        table.bind_callables(globals())
+        _parser = yacc.LRParser(table, p_error)
+    return _parser
+
+
+# exported function; first_line and node_ids let a piece of a larger source be parsed
+# with its own line numbers, and node ids that don't clash with the rest. version is
+# the interpreter version the program is for, which decides some keywords (see brewlex)
+def parse_program(program, first_line=1, node_ids=None, version=3):
+    global _node_ids
+    reset_lineno(first_line)
+    set_version(version)
+    _node_ids = itertools.count() if node_ids is None else node_ids
+    ast = get_parser().parse(program, lexer=get_lexer())
     if ast is None:
         raise SyntaxError("Syntax error")
     return ast
 
 
-# generate our parser
-yacc.yacc() # yacc.yacc(debug=True, debuglog=open("parse.log", "w"))
+# Lazy parsing: parse_program_lazily parses the structs and reads each function's
+# signature up front, and leaves the function bodies, found by scan_functions, unparsed
+# until something asks for one's statements (or its dict). Only a run's first call of a
+# function pays for parsing it, and functions never called are never parsed, so a
+# syntax error in a function body is only reported when it is first called;
+# finish_parsing parses what is left, reporting any. A source whose braces don't
+# balance, with a signature that isn't a plain one (a comment in it, say) or with
+# anything but whitespace between functions is parsed the usual way. Node ids are unique but, unlike parse_program's, depend on the order
+# functions are called in.
+_HEADER_TOKENS = re.compile(r"[A-Za-z_]\w*|\S")
+_NAME = re.compile(r"[A-Za-z_]\w*")
+
+
+class LazyFunction(Element):
+    __slots__ = ()
+
+    # the signature is there already
+    def get(self, key):
+        if key == "statements":
+            return self.dict.get(key)
+        return _DICT.__get__(self).get(key)
+
+    # the dict, with the body parsed; the node is a plain Element from then on
+    @property
+    def dict(self):
+        _DICT.__get__(self)["statements"].parse(self)
+        return _DICT.__get__(self)
+
+
+_DICT = Element.dict  # the slot LazyFunction.dict hides
+
+
+# What a LazyFunction's statements are until they are read: statements() reads them,
+# from the source here and from a file in artifact.py
+class LazyBody:
+    __slots__ = ("callbacks",)
+
+    def __init__(self):
+        self.callbacks = []
+
+    def parse(self, func_def):
+        _DICT.__get__(func_def)["statements"] = self.statements(func_def)
+        func_def.__class__ = Element
+        for callback in self.callbacks:
+            callback(func_def)
+
+
+# make func_def, which has everything but its statements, read them from body when asked
+def make_lazy(func_def, body):
+    func_def.dict["statements"] = body
+    func_def.__class__ = LazyFunction
+
+
+class _SourceBody(LazyBody):
+    __slots__ = ("source", "start", "end", "node_ids")
+
+    def __init__(self, source, start, end, node_ids):
+        super().__init__()
+        self.source = source
+        self.start = start
+        self.end = end
+        self.node_ids = node_ids
+
+    def statements(self, func_def):
+        ast = parse_program(self.source[self.start:self.end], func_def.line_num, self.node_ids)
+        return ast.get("functions")[0].get("statements")
+
+
+# call callback with func_def once its body has been parsed, which may be now
+def when_parsed(func_def, callback):
+    if type(func_def) is LazyFunction:
+        _DICT.__get__(func_def)["statements"].callbacks.append(callback)
+    else:
+        callback(func_def)
+
+
+def parse_program_lazily(program):
+    functions = scan_functions(program)
+    if not functions:
+        return parse_program(program)
+    # the rest of the source, with each function replaced by its newlines so that lines
+    # keep their numbers, and a function for the grammar to accept it
+    rest = []
+    signatures = []
+    position = 0
+    line = 1
+    for start, body_start, end in functions:
+        if position > 0 and program[position:start].strip():
+            return parse_program(program)
+        rest.append(program[position:start])
+        line += program.count("\n", position, start)
+        signature = _signature(program[start + len("func"):body_start], line)
+        if signature is None:
+            return parse_program(program)
+        signatures.append((line, signature))
+        newlines = program.count("\n", start, end)
+        rest.append("\n" * newlines)
+        line += newlines
+        position = end
+    if program[position:].strip():
+        return parse_program(program)
+    rest = "".join(rest)
+    if not rest.strip():
+        structs, imports = [], []
+        node_ids = itertools.count()
+    else:
+        rest_ast = parse_program(rest + "\nfunc main() { return; }")
+        structs, imports = rest_ast.get("structs"), rest_ast.get("imports")
+        node_ids = _node_ids
+
+    funcs = []
+    for (line, (name, args, return_type)), (start, _, end) in zip(signatures, functions):
+        formal_args = [_element(InterpreterBase.ARG_NODE, arg_line, node_ids, name=arg_name, var_type=arg_type)
+                       for arg_name, arg_type, arg_line in args]
+        func_def = _element(InterpreterBase.FUNC_NODE, line, node_ids, name=name, args=formal_args,
+                            return_type=return_type)
+        make_lazy(func_def, _SourceBody(program, start, end, node_ids))
+        funcs.append(func_def)
+    return Element(InterpreterBase.PROGRAM_NODE, structs=structs, functions=funcs, imports=imports)
+
+
+# parse every function body parse_program_lazily left unparsed
+def finish_parsing(ast):
+    for func_def in ast.get("functions"):
+        func_def.get("statements")
+
+
+def _element(elem_type, line, node_ids, **kwargs):
+    element = Element(elem_type, **kwargs)
+    element.line_num = line
+    element.node_id = next(node_ids)
+    return element
+
+
+# (name, [(arg name, type, line)], return type) from the text between `func` and the
+# body's `{`, with None for types left out, or None if it isn't a signature the grammar
+# accepts without comments
+def _signature(header, line):
+    if "\n" in header:
+        tokens = [(match.group(), line + header.count("\n", 0, match.start()))
+                  for match in _HEADER_TOKENS.finditer(header)]
+    else:
+        tokens = [(text, line) for text in _HEADER_TOKENS.findall(header)]
+    tokens.append((None, line))
+    position = 0
+
+    def take(expected=None):
+        nonlocal position
+        text, token_line = tokens[position]
+        if expected is None:
+            if text is None or not _NAME.fullmatch(text) or text in reserved_map:
+                raise ValueError
+        elif text != expected:
+            raise ValueError
+        position += 1
+        return text, token_line
+
+    def var_type():
+        if tokens[position][0] == "map":
+            take("map")
+            take("[")
+            key_type = take()[0]
+            take("]")
+            return f"map[{key_type}]{var_type()}"
+        type_name = take()[0]
+        if tokens[position][0] == "[":
+            take("[")
+            take("]")
+            return type_name + "[]"
+        return type_name
+
+    try:
+        name = take()[0]
+        take("(")
+        args = []
+        if tokens[position][0] != ")":
+            while True:
+                arg_name, arg_line = take()
+                arg_type = None
+                if tokens[position][0] == ":":
+                    take(":")
+                    arg_type = var_type()
+                args.append((arg_name, arg_type, arg_line))
+                if tokens[position][0] != ",":
+                    break
+                take(",")
+        take(")")
+        return_type = None
+        if tokens[position][0] == ":":
+            take(":")
+            return_type = var_type()
+        if tokens[position][0] is not None:
+            return None
+    except ValueError:
+        return None
+    return name, args, return_type
+
+
+# regenerate parsetab.py and the parser.out listing if the grammar above has changed
+def build_tables():
+    from ply import yacc
+
+    outputdir = os.path.dirname(os.path.abspath(__file__))
+    yacc.yacc(module=sys.modules[__name__], tabmodule="parsetab", outputdir=outputdir, debug=True)
+
+
+# True when parsetab.py was generated from the grammar in this file
+def tables_are_current():
+    from ply import yacc
+    import parsetab
+
+    grammar = yacc.ParserReflect(vars(sys.modules[__name__]))
+    grammar.get_all()
+    return parsetab._lr_signature == grammar.signature()
+
+
+if __name__ == "__main__":
+    build_tables()
@@ -0,0 +1,189 @@
+# Structured trace logging for the Brewin interpreters
+# Every interpreter version takes a Tracer, through its trace_output argument or
+# set_tracer(). A tracer has a level and a set of categories, and hands the records it
+# lets through to a sink: a FileSink writes them out as they happen, a RingSink keeps
+# the most recent ones in memory to look at after the run, or after it failed.
+#
+# The categories, and the level each one's records are written at:
+#   errors  ERROR  every error an interpreter reports
+#   calls   INFO   calls of user-defined functions
+#   env     DEBUG  assignments, and the names in scope when a lookup fails
+#   ops     DEBUG  binary operations, with their operands and result
+#   thunks  DEBUG  v4's lazy values, when they are made and when they are forced
+#
+# The interpreters test a flag per category that set_tracer() works out up front
+# (trace_ops, trace_calls, ...), written as `if __debug__ and self.trace_ops:`, so a
+# run without a tracer pays one attribute test per site and formats no messages. Under
+# python -O, __debug__ is a compile-time False and the tests are compiled out
+# altogether. Describing a value never forces a v4 thunk.
+#
+# usage: python brewtrace.py program.br [--version 1-4] [--input FILE] [--level LEVEL]
+#                            [--categories ops,calls,...] [--ring N] [-o FILE]
+
+import argparse
+import collections
+import sys
+from enum import IntEnum
+
+from rope import flatten
+
+
+class Level(IntEnum):
+    DEBUG = 10
+    INFO = 20
+    ERROR = 40
+
+
+CATEGORY_LEVELS = {
+    "errors": Level.ERROR,
+    "calls": Level.INFO,
+    "env": Level.DEBUG,
+    "ops": Level.DEBUG,
+    "thunks": Level.DEBUG,
+}
+CATEGORIES = tuple(CATEGORY_LEVELS)
+
+Record = collections.namedtuple("Record", ["seq", "category", "level", "line", "message"])
+
+
+def format_record(record):
+    line = record.line if record.line is not None else "?"
+    return f"{record.seq:>8} {record.level.name:<5} {record.category:<6} line {line}: {record.message}"
+
+
+class FileSink:
+    # file is a path, an open file, or None for whatever sys.stderr is when writing
+    def __init__(self, file=None):
+        self.owned = isinstance(file, str)
+        self.file = open(file, "w") if self.owned else file
+
+    def write(self, record):
+        print(format_record(record), file=self.file if self.file is not None else sys.stderr)
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+
+
+class RingSink:
+    def __init__(self, capacity=10000):
+        self.records = collections.deque(maxlen=capacity)
+        self.dropped = 0  # older records pushed out of the ring
+
+    def write(self, record):
+        if len(self.records) == self.records.maxlen:
+            self.dropped += 1
+        self.records.append(record)
+
+    def dump(self, file=sys.stderr):
+        if self.dropped:
+            print(f"... {self.dropped} earlier records dropped", file=file)
+        for record in self.records:
+            print(format_record(record), file=file)
+
+    def close(self):
+        pass
+
+
+class Tracer:
+    def __init__(self, sink=None, level=Level.DEBUG, categories=CATEGORIES):
+        unknown = set(categories) - set(CATEGORY_LEVELS)
+        if unknown:
+            raise ValueError(f"unknown trace categories: {', '.join(sorted(unknown))}")
+        self.sink = sink if sink is not None else FileSink()
+        self.level = Level(level)
+        self.categories = frozenset(categories)
+        self.seq = 0
+
+    def enabled(self, category):
+        return category in self.categories and CATEGORY_LEVELS[category] >= self.level
+
+    def emit(self, category, line, message):
+        self.seq += 1
+        self.sink.write(Record(self.seq, category, CATEGORY_LEVELS[category], line, message))
+
+    def close(self):
+        self.sink.close()
+
+
+# the tracer an interpreter's trace_output argument asks for: True traces everything
+# to stderr, and a Tracer is used as it is
+def tracer_for(trace_output):
+    if isinstance(trace_output, Tracer):
+        return trace_output
+    return Tracer() if trace_output else None
+
+
+# a short description of an interpreter value: a Value of v2-v4, a v4 LazyValue, or
+# the plain Python value v1 and v2 use
+def describe(value):
+    if hasattr(value, "iseval"):
+        if not value.iseval():
+            return "<thunk>"
+        value = value.cached_value
+    if hasattr(value, "type") and hasattr(value, "value"):
+        return f"{value.type()} {flatten(value.value())!r}"
+    return repr(flatten(value))
+
+
+def describe_call(func_name, args):
+    return f"{func_name}({', '.join(f'{name}={describe(value)}' for name, value in args.items())})"
+
+
+def main():
+    # imported here since the interpreters import this module through intbase; the
+    # tracer is built from the imported module's classes, which are the ones intbase
+    # checks for, rather than from those of this script's __main__ module
+    import brewtrace
+    import interpreterv1
+    import interpreterv2
+    import interpreterv3
+    import interpreterv4
+
+    interpreters = {1: interpreterv1.Interpreter, 2: interpreterv2.Interpreter,
+                    3: interpreterv3.Interpreter, 4: interpreterv4.Interpreter}
+    parser = argparse.ArgumentParser(description="Run a Brewin program and trace what the interpreter does")
+    parser.add_argument("program", help="source file to run")
+    parser.add_argument("--version", type=int, choices=sorted(interpreters), default=3)
+    parser.add_argument("--input", help="file whose lines are the program's input")
+    parser.add_argument("--level", choices=[level.name.lower() for level in Level], default="debug")
+    parser.add_argument("--categories", default=",".join(CATEGORIES), help="comma-separated categories to trace")
+    parser.add_argument("--ring", type=int, help="keep only the last N records and print them after the run")
+    parser.add_argument("-o", "--output", help="write the trace here instead of stderr")
+    args = parser.parse_args()
+
+    with open(args.program) as file:
+        program = file.read()
+    inp = None
+    if args.input is not None:
+        with open(args.input) as file:
+            inp = file.read().splitlines()
+    sink = brewtrace.RingSink(args.ring) if args.ring is not None else brewtrace.FileSink(args.output)
+    categories = [category for category in args.categories.split(",") if category]
+    unknown = set(categories) - set(brewtrace.CATEGORIES)
+    if unknown:
+        parser.error(f"unknown categories {', '.join(sorted(unknown))}; choose from {', '.join(brewtrace.CATEGORIES)}")
+    tracer = brewtrace.Tracer(sink, brewtrace.Level[args.level.upper()], categories)
+
+    interpreter = interpreters[args.version](inp=inp, trace_output=tracer)
+    error = None
+    try:
+        interpreter.run(program)
+    except Exception as e:
+        error = e
+    finally:
+        if args.ring is not None:
+            if args.output is not None:
+                with open(args.output, "w") as file:
+                    sink.dump(file)
+            else:
+                sink.dump()
+        tracer.close()
+    if error is not None:
+        print(error, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+# Long-running execution daemon for Brewin programs
+# Programs and their stdin arrive over a local Unix socket or TCP port using a simple
+# framed protocol: every message is a 4-byte big-endian length followed by a UTF-8 JSON
+# object. An asyncio accept loop hands each request to a pool of worker processes that
+# were forked after the parser and interpreters were imported, so no request pays the
+# import and parser set up cost.
+#
+# request:  {"id": any, "program": str, "stdin": [str] or str, "version": 1-4,
+#            "max_steps": int, "max_seconds": float, "max_memory_kb": int,  (limits optional,
+#            and only for versions 3 and 4; v1 and v2 can't enforce them)
+#            "trace_memory": bool}  (optional; traced runs are several times slower)
+# response: {"id": any, "output": [str], "error": str or None, "error_line": int or None,
+#            "message": str or None, "peak_kb": int or None (set by trace_memory),
+#            "timings": {"queue_ms", "run_ms", "total_ms"}}
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import time
+import tracemalloc
+
+import brewparse
+import interpreterv1
+import interpreterv2
+import interpreterv3
+import interpreterv4
+from pool import InterpreterPool
+
+INTERPRETERS = {
+    1: interpreterv1.Interpreter,
+    2: interpreterv2.Interpreter,
+    3: interpreterv3.Interpreter,
+    4: interpreterv4.Interpreter,
+}
+# each worker process reuses its interpreters from job to job
+POOLS = {version: InterpreterPool(cls, max_idle=1) for version, cls in INTERPRETERS.items()}
+DEFAULT_VERSION = 3
+HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+
+def encode_frame(message):
+    payload = json.dumps(message).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode_payload(payload):
+    return json.loads(payload.decode("utf-8"))
+
+
+# run one job inside a worker process and describe the outcome
+def execute(job):
+    stdin = job.get("stdin") or []
+    if isinstance(stdin, str):
+        stdin = stdin.splitlines()
+    version = job.get("version", DEFAULT_VERSION)
+    result = {"output": [], "error": None, "error_line": None, "message": None, "peak_kb": None}
+    if version not in INTERPRETERS:
+        result["error"] = "BAD_REQUEST"
+        result["message"] = f"Unknown interpreter version {version}"
+        return result, 0.0
+    limits = [job.get(name) for name in ("max_steps", "max_seconds", "max_memory_kb")]
+    if not INTERPRETERS[version].ENFORCES_LIMITS and any(limit is not None for limit in limits):
+        result["error"] = "BAD_REQUEST"
+        result["message"] = f"Interpreter version {version} doesn't enforce step, time or memory limits"
+        return result, 0.0
+
+    with POOLS[version].interpreter(stdin, max_steps=job.get("max_steps"), max_seconds=job.get("max_seconds"),
+                                    max_memory_kb=job.get("max_memory_kb")) as interpreter:
+        interpreter.interactive = False  # never the daemon's own stdin
+        return run_job(interpreter, job, result)
+
+
+def run_job(interpreter, job, result):
+    tracing = bool(job.get("trace_memory"))
+    if tracing:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        interpreter.run(job.get("program", ""))
+    except SyntaxError as e:
+        result["error"] = "SYNTAX_ERROR"
+        result["message"] = str(e)
+    except Exception as e:
+        error_type, error_line = interpreter.get_error_type_and_line()
+        result["error"] = error_type.name if error_type is not None else type(e).__name__
+        result["error_line"] = error_line
+        result["message"] = str(e)
+    run_ms = (time.perf_counter() - start) * 1000
+    if tracing:
+        result["peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    result["output"] = [str(line) for line in interpreter.get_output()]
+    return result, run_ms
+
+
+def worker_main(conn):
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        conn.send(execute(job))
+
+
+class Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.runs = 0
+
+    def stop(self):
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+
+
+class WorkerPool:
+    def __init__(self, size=os.cpu_count() or 1, timeout=10.0, max_runs=1000):
+        # fork so that workers start with every module above already imported
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self.size = size
+        self.timeout = timeout
+        self.max_runs = max_runs
+        self.idle = None
+
+    async def start(self):
+        # build the parser tables once so that every forked worker inherits them
+        brewparse.parse_program("func main() { return; }")
+        self.idle = asyncio.Queue()
+        for _ in range(self.size):
+            self.idle.put_nowait(Worker(self.context))
+
+    async def stop(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().stop()
+
+    async def run(self, job):
+        loop = asyncio.get_running_loop()
+        queued = time.perf_counter()
+        worker = await self.idle.get()
+        started = time.perf_counter()
+        result = None
+        run_ms = None
+        answered = False  # whether the worker sent back its result, and is free for another job
+        try:
+            worker.conn.send(job)
+            ready = loop.create_future()
+            fd = worker.conn.fileno()
+            loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+            try:
+                await asyncio.wait_for(ready, self.timeout)
+            except asyncio.TimeoutError:
+                result = {"output": [], "error": "TIMEOUT", "error_line": None, "peak_kb": None,
+                          "message": f"Program did not finish within {self.timeout} s"}
+            finally:
+                loop.remove_reader(fd)
+            if result is None:
+                result, run_ms = worker.conn.recv()
+                answered = True
+                worker.runs += 1
+        except (EOFError, OSError) as e:
+            result = {"output": [], "error": "WORKER_CRASH", "error_line": None, "peak_kb": None, "message": str(e)}
+        finally:
+            # a worker that didn't answer (it timed out or crashed, or the request was
+            # cancelled while it ran) is replaced, as is one that has run too often
+            if not answered or worker.runs >= self.max_runs:
+                worker.stop()
+                worker = Worker(self.context)
+            self.idle.put_nowait(worker)
+
+        finished = time.perf_counter()
+        result["timings"] = {
+            "queue_ms": (started - queued) * 1000,
+            "run_ms": run_ms,
+            "total_ms": (finished - queued) * 1000,
+        }
+        return result
+
+
+class Daemon:
+    def __init__(self, pool, path=None, host="127.0.0.1", port=None):
+        self.pool = pool
+        self.path = path
+        self.host = host
+        self.port = port
+
+    async def serve(self):
+        await self.pool.start()
+        if self.path is not None:
+            server = await asyncio.start_unix_server(self.__handle, path=self.path)
+        else:
+            server = await asyncio.start_server(self.__handle, host=self.host, port=self.port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.pool.stop()
+
+    async def __handle(self, reader, writer):
+        # requests on one connection may be pipelined; answers carry the request id
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                try:
+                    (size,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+                except asyncio.IncompleteReadError:
+                    break
+                if size > MAX_FRAME_SIZE:
+                    break
+                payload = await reader.readexactly(size)
+                task = asyncio.create_task(self.__answer(payload, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def __answer(self, payload, writer, lock):
+        try:
+            job = decode_payload(payload)
+            if not isinstance(job, dict):
+                raise ValueError("A request must be a JSON object")
+            result = await self.pool.run(job)
+            result["id"] = job.get("id")
+        except (ValueError, AttributeError) as e:
+            result = {"id": None, "output": [], "error": "BAD_REQUEST", "error_line": None,
+                      "peak_kb": None, "message": str(e), "timings": None}
+        async with lock:
+            writer.write(encode_frame(result))
+            await writer.drain()
+
+
+# small blocking client, handy for scripts and benchmarks
+def request(program, stdin=None, version=DEFAULT_VERSION, path=None, host="127.0.0.1", port=None):
+    if path is not None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+    else:
+        sock = socket.create_connection((host, port))
+    with sock:
+        sock.sendall(encode_frame({"id": 0, "program": program, "stdin": stdin or [], "version": version}))
+        (size,) = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+        return decode_payload(_recv_exactly(sock, size))
+
+
+def _recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("daemon closed the connection")
+        data += chunk
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Brewin programs from a warm worker pool")
+    parser.add_argument("--socket", help="path of the Unix socket to listen on")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8131)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=10.0, help="per request, in seconds")
+    parser.add_argument("--max-runs", type=int, default=1000, help="recycle a worker after this many runs")
+    args = parser.parse_args()
+
+    pool = WorkerPool(size=args.workers, timeout=args.timeout, max_runs=args.max_runs)
+    daemon = Daemon(pool, path=args.socket, host=args.host, port=args.port)
+    try:
+        asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# Differential testing of the Brewin interpreters
+# Runs each program on every interpreter version whose language it is written in, in the
+# daemon's pool of worker processes, and reports the programs on which those versions
+# disagree about the output or the type of error. Each version's run time and peak
+# traced memory are reported alongside, from two runs: a plain one for the time and a
+# traced one for the memory, since tracing slows a run down several times.
+#
+# usage: python difftest.py programs... [--input FILE] [--workers N] [--timeout S]
+#                           [--no-memory] [--json report.json]
+# A program's input is read from --input, or else from a file next to it with the same
+# name and the extension .in, if there is one.
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from brewparse import parse_program
+from daemon import WorkerPool
+from element import Element
+from intbase import InterpreterBase
+
+# what each version's language has beyond the expressions and statements of version 1
+V1_STATEMENTS = {InterpreterBase.VAR_DEF_NODE, "=", InterpreterBase.FCALL_NODE}
+V1_EXPRESSIONS = {InterpreterBase.VAR_NODE, InterpreterBase.INT_NODE, InterpreterBase.STRING_NODE, "+", "-",
+                  InterpreterBase.FCALL_NODE}
+EXCEPTION_NODES = {InterpreterBase.TRY_NODE, InterpreterBase.CATCH_NODE, InterpreterBase.RAISE_NODE}
+CONTAINER_NODES = {InterpreterBase.NEW_ARRAY_NODE, InterpreterBase.INDEX_NODE, InterpreterBase.INDEX_ASSIGN_NODE,
+                   InterpreterBase.NEW_MAP_NODE}
+
+
+# the node kinds a program uses, and whether it writes types, leaves them out, or both
+def features(ast):
+    kinds = set()
+    typed = untyped = dotted = False
+    pending = [ast]
+    while pending:
+        node = pending.pop()
+        kinds.add(node.elem_type)
+        if node.elem_type in (InterpreterBase.FUNC_NODE, InterpreterBase.ARG_NODE, InterpreterBase.VAR_DEF_NODE):
+            key = "return_type" if node.elem_type == InterpreterBase.FUNC_NODE else "var_type"
+            if node.get(key) is None:
+                untyped = True
+            else:
+                typed = True
+        if node.elem_type in (InterpreterBase.VAR_NODE, "=") and "." in node.get("name"):
+            dotted = True
+        for value in node.dict.values():
+            if isinstance(value, Element):
+                pending.append(value)
+            elif isinstance(value, list):
+                pending.extend(item for item in value if isinstance(item, Element))
+    return kinds, typed, untyped, dotted
+
+
+# the versions whose language a program is written in
+def versions_for(ast):
+    kinds, typed, untyped, dotted = features(ast)
+    structs = bool(ast.get("structs")) or InterpreterBase.NEW_NODE in kinds or dotted
+    exceptions = bool(kinds & EXCEPTION_NODES)
+    containers = bool(kinds & CONTAINER_NODES)  # only v3 has arrays and maps
+    versions = []
+    functions = ast.get("functions")
+    only_main = len(functions) == 1 and functions[0].get("name") == "main" and not functions[0].get("args")
+    if only_main and not typed and not structs and kinds <= V1_STATEMENTS | V1_EXPRESSIONS | {
+        InterpreterBase.PROGRAM_NODE, InterpreterBase.FUNC_NODE
+    }:
+        versions.append(1)
+    if not typed and not structs and not exceptions and not containers:
+        versions.append(2)
+    if not untyped and not exceptions:
+        versions.append(3)
+    if not typed and not structs and not containers:
+        versions.append(4)
+    return versions
+
+
+def read_input(path, input_path=None):
+    if input_path is None:
+        candidate = os.path.splitext(path)[0] + ".in"
+        input_path = candidate if os.path.exists(candidate) else None
+    if input_path is None:
+        return []
+    with open(input_path) as file:
+        return file.read().splitlines()
+
+
+# the parts of a result two versions have to agree on
+def outcome(result):
+    return result["output"], result["error"]
+
+
+def describe_difference(left, right):
+    if left["error"] != right["error"]:
+        return f"error {left['error']} vs {right['error']}"
+    for line, (a, b) in enumerate(zip(left["output"], right["output"]), start=1):
+        if a != b:
+            return f"output line {line}: {a!r} vs {b!r}"
+    return f"{len(left['output'])} vs {len(right['output'])} lines of output"
+
+
+async def check_program(pool, path, program, stdin, trace_memory):
+    report = {"program": path, "versions": [], "results": {}, "divergences": []}
+    try:
+        versions = versions_for(parse_program(program))
+    except SyntaxError as e:
+        # map and import are only keywords in v3 (see brewlex), so the others may still parse it
+        try:
+            versions = [version for version in versions_for(parse_program(program, version=4)) if version != 3]
+        except SyntaxError:
+            report["error"] = f"SYNTAX_ERROR: {e}"
+            return report
+    report["versions"] = versions
+
+    jobs = [{"program": program, "stdin": stdin, "version": version} for version in versions]
+    if trace_memory:
+        jobs += [dict(job, trace_memory=True) for job in jobs]
+    runs = await asyncio.gather(*(pool.run(job) for job in jobs))
+    for version, result in zip(versions, runs):
+        report["results"][version] = {
+            "output": result["output"],
+            "error": result["error"],
+            "error_line": result["error_line"],
+            "message": result["message"],
+            "run_ms": result["timings"]["run_ms"],
+            "peak_kb": None,
+        }
+    for version, result in zip(versions, runs[len(versions):]):
+        report["results"][version]["peak_kb"] = result["peak_kb"]
+
+    # every version is compared with the oldest one that accepts the program
+    for version in versions[1:]:
+        left, right = report["results"][versions[0]], report["results"][version]
+        if outcome(left) != outcome(right):
+            report["divergences"].append({
+                "versions": [versions[0], version],
+                "difference": describe_difference(left, right),
+            })
+    return report
+
+
+async def run_suite(cases, workers, timeout, trace_memory):
+    pool = WorkerPool(size=workers, timeout=timeout)
+    await pool.start()
+    try:
+        return await asyncio.gather(
+            *(check_program(pool, path, program, stdin, trace_memory) for path, program, stdin in cases)
+        )
+    finally:
+        await pool.stop()
+
+
+def print_report(reports, file=sys.stdout):
+    for report in reports:
+        status = "DIVERGES" if report["divergences"] else "agrees"
+        if "error" in report:
+            status = report["error"]
+        elif not report["versions"]:
+            status = "no version accepts it"
+        print(f"== {report['program']}: {status}", file=file)
+        for version, result in report["results"].items():
+            run_ms = f"{result['run_ms']:.1f} ms" if result["run_ms"] is not None else "-"
+            peak = f"{result['peak_kb']} KB" if result["peak_kb"] is not None else "-"
+            error = result["error"] or "ok"
+            print(f"  v{version}  {error:<14} {run_ms:>10} {peak:>10}  {len(result['output'])} lines", file=file)
+        for divergence in report["divergences"]:
+            left, right = divergence["versions"]
+            print(f"  v{left} and v{right} differ: {divergence['difference']}", file=file)
+    divergent = sum(1 for report in reports if report["divergences"])
+    print(f"{len(reports)} programs, {divergent} divergent", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Brewin programs on every interpreter version that accepts them")
+    parser.add_argument("programs", nargs="+", help="source files to check")
+    parser.add_argument("--input", help="file whose lines are every program's input")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=10.0, help="per run, in seconds")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced runs that measure memory")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    cases = []
+    for path in args.programs:
+        with open(path) as file:
+            cases.append((path, file.read(), read_input(path, args.input)))
+    reports = asyncio.run(run_suite(cases, args.workers, args.timeout, not args.no_memory))
+    print_report(reports)
+    if args.json is not None:
+        with open(args.json, "w") as file:
+            json.dump(reports, file, indent=2)
+    return 1 if any(report["divergences"] for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
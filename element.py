@@ -1,6 +1,13 @@
 class Element:
+    # slots keep nodes small; line_num is the source line and node_id numbers the
+    # nodes of one parse from 0, both None for nodes the parser didn't make (e.g. the
+    # program node)
+    __slots__ = ("elem_type", "dict", "line_num", "node_id")
+
     def __init__(self, elem_type, **kwargs):
         self.elem_type = elem_type
+        self.line_num = None
+        self.node_id = None
         self.dict = {}
         for key, value in kwargs.items():
             self.dict[key] = value
@@ -0,0 +1,437 @@
+# Green threads for v3 programs
+# A GreenInterpreter runs a program as a generator instead of a call: it yields when
+# the program asks for input that hasn't arrived yet, and, once its time slice is used
+# up, at a loop back-edge or a function call. A Scheduler multiplexes any number of
+# such sessions on one OS thread, so that a session waiting for input costs its heap
+# and a few suspended frames rather than a thread or a process.
+#
+#   scheduler = Scheduler(quantum=1000, policy="fair")
+#   session = scheduler.spawn(program)
+#   scheduler.run()             # runs every session until it ends or waits for input
+#   session.feed("42")          # makes it runnable again
+#   scheduler.run()
+#   session.output(), session.error
+#
+# Only statements and expressions that contain a loop, or a call to anything but the
+# builtins that can't wait (print(), len()), run as generators; everything else goes
+# to the tree walker's own methods, which also decide every type check, coercion and
+# error, so a program behaves as it does under run(). Time slices are counted in
+# back-edges and calls. Coverage and the JIT are off in green sessions: both would run
+# parts of the program out of the scheduler's sight.
+#
+# usage: python green.py program.br [--sessions N] [--input FILE] [--quantum N]
+#                        [--policy round_robin|fair]
+
+import argparse
+import collections
+import copy
+import heapq
+import sys
+import time
+from enum import Enum
+
+from brewparse import parse_program
+from host import HostFunction, HostFunctions
+from intbase import InterpreterBase, ErrorType
+from interpreterv3 import ExecStatus, Interpreter
+from type_valuev2 import Type, Value, get_printable
+
+
+# what a session's generator yields to the scheduler
+class Yield(Enum):
+    PREEMPTED = 1  # its time slice is used up
+    WAITING = 2  # it needs input that hasn't been fed yet
+
+
+class State(Enum):
+    READY = 1
+    WAITING = 2
+    DONE = 3
+    FAILED = 4
+
+
+# whether running node may yield: it has a loop, or a call to anything but print(),
+# len() or checkpoint() (or one of those of something that may yield). Map builtins
+# count as calls, since the program may define functions of the same names. Worked out
+# once per node
+def suspends(node):
+    result = node.dict.get("suspends")
+    if result is None:
+        result = node.dict["suspends"] = _suspends(node)
+    return result
+
+
+def _suspends(node):
+    kind = node.elem_type
+    if kind == InterpreterBase.FOR_NODE:
+        return True
+    if kind == InterpreterBase.FCALL_NODE:
+        if node.get("name") not in ("print", "len", "checkpoint"):
+            return True
+        return any(suspends(arg) for arg in node.get("args"))
+    if kind == InterpreterBase.IF_NODE:
+        statements = node.get("statements") + (node.get("else_statements") or [])
+        return suspends(node.get("condition")) or any(suspends(statement) for statement in statements)
+    if kind == InterpreterBase.FUNC_NODE:
+        return any(suspends(statement) for statement in node.get("statements"))
+    children = [node.get(key) for key in ("expression", "op1", "op2", "array", "subscript", "size")]
+    return any(suspends(child) for child in children if child is not None)
+
+
+class GreenInterpreter(Interpreter):
+    def __init__(self, inp=None):
+        super().__init__(console_output=False, inp=inp if inp is not None else [])
+
+    def reset(self):
+        super().reset()
+        self.jit_threshold = None
+        self.slice_left = 0  # back-edges and calls left in the current time slice
+        self.input_closed = False  # no more input will come; inputi()/inputs() read None
+
+    # never block on the keyboard: input only comes from what was fed
+    def get_input(self):
+        if self.input_cursor < len(self.inp):
+            cur_input = self.inp[self.input_cursor]
+            self.input_cursor += 1
+            return cur_input
+        return None
+
+    # a generator that runs the parsed program, yielding a Yield whenever it stops
+    def start(self, ast):
+        super().reset_limits()
+        self.current_line = None
+        self.load(ast)
+        try:
+            yield from self.__call("main", [])
+        except RecursionError:
+            super().error(ErrorType.BUDGET_ERROR, "Call depth budget exhausted")
+
+    def __tick(self):
+        self.slice_left -= 1
+        return self.slice_left <= 0
+
+    def __run_statements(self, statements, default_return, bare):
+        if not bare:
+            self.env.push_block()
+        for statement in statements:
+            if suspends(statement):
+                status, return_val = yield from self.__run_statement(statement, default_return)
+            else:
+                status, return_val = self.execute(statement, default_return)
+            if status == ExecStatus.RETURN:
+                if not bare:
+                    self.env.pop_block()
+                return (status, return_val)
+        if not bare:
+            self.env.pop_block()
+        return (ExecStatus.CONTINUE, default_return)
+
+    # statement may yield; the ones that can't are run by execute()
+    def __run_statement(self, statement, default_return):
+        self.steps_left -= 1
+        if self.steps_left < 0:
+            super().check_limits()
+        self.current_line = statement.line_num
+        kind = statement.elem_type
+        if kind == InterpreterBase.FCALL_NODE:
+            yield from self.__call(statement.get("name"), statement.get("args"))
+        elif kind == "=":
+            self.assign(statement.get("name"), (yield from self.__eval_expr(statement.get("expression"))))
+        elif kind == InterpreterBase.INDEX_ASSIGN_NODE:
+            array_obj = yield from self.__value(statement.get("array"))
+            index_obj = yield from self.__value(statement.get("subscript"))
+            self.set_element(array_obj, index_obj, (yield from self.__value(statement.get("expression"))))
+        elif kind == InterpreterBase.RETURN_NODE:
+            if default_return is None:
+                super().error(ErrorType.TYPE_ERROR, "Return type is undefined")
+            if default_return == Type.VOID:
+                super().error(ErrorType.TYPE_ERROR, "Void function cannot return a value")
+            value_obj = copy.copy((yield from self.__eval_expr(statement.get("expression"))))
+            return (ExecStatus.RETURN, self.return_value(default_return, value_obj))
+        elif kind == InterpreterBase.IF_NODE:
+            return (yield from self.__do_if(statement, default_return))
+        elif kind == InterpreterBase.FOR_NODE:
+            return (yield from self.__do_for(statement, default_return))
+        return (ExecStatus.CONTINUE, None)
+
+    def __do_if(self, if_ast, default_return):
+        result = self.condition((yield from self.__value(if_ast.get("condition"))), "if")
+        if result.value():
+            return (yield from self.__run_statements(if_ast.get("statements"), default_return, if_ast.get("bare")))
+        else_statements = if_ast.get("else_statements")
+        if else_statements is not None:
+            return (yield from self.__run_statements(else_statements, default_return, if_ast.get("else_bare")))
+        return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
+
+    # the generic loop; the tree walker's counting loops charge the same steps
+    def __do_for(self, for_ast, default_return):
+        init_ast = for_ast.get("init")
+        update_ast = for_ast.get("update")
+        if init_ast:
+            yield from self.__run_any(init_ast)
+        while True:
+            run_for = self.condition((yield from self.__value(for_ast.get("condition"))), "for")
+            if not run_for.value():
+                return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
+            status, return_val = yield from self.__run_statements(
+                for_ast.get("statements"), default_return, for_ast.get("bare"))
+            if status == ExecStatus.RETURN:
+                return status, return_val
+            if update_ast:
+                yield from self.__run_any(update_ast)
+            if self.check_clock:  # loop back-edge
+                super().check_limits()
+            if self.__tick():
+                yield Yield.PREEMPTED
+
+    def __run_any(self, statement):
+        if suspends(statement):
+            yield from self.__run_statement(statement, Interpreter.NIL_VALUE)
+        else:
+            self.execute(statement, Interpreter.NIL_VALUE)
+
+    def __call(self, func_name, actual_args):
+        self.steps_left -= 1
+        if self.steps_left < 0 or self.check_clock:
+            super().check_limits()
+
+        if func_name == "print":
+            output = []
+            for arg in actual_args:
+                self.append_printable(output, (yield from self.__value(arg)))
+            try:
+                super().output("".join(output))
+            except TypeError as e:
+                super().error(ErrorType.TYPE_ERROR, f"Error in printing: {e}")
+            return Value(Type.VOID)
+        if func_name == "inputi" or func_name == "inputs":
+            return (yield from self.__call_input(func_name, actual_args))
+        if func_name == "checkpoint" and not actual_args:
+            return Value(Type.VOID)
+        if func_name == "len" and len(actual_args) == 1:
+            return self.length((yield from self.__value(actual_args[0])))
+        if self.is_map_builtin(func_name, len(actual_args)):
+            args = []
+            for arg in actual_args:
+                args.append((yield from self.__value(arg)))
+            return self.map_builtin(func_name, args)
+
+        func_ast = self.lookup_function(func_name, len(actual_args))
+        if type(func_ast) is HostFunction:
+            values = []
+            for arg in actual_args:
+                values.append((yield from self.__value(arg)))
+            return self.call_host(func_ast, values)
+        args = {}
+        for formal_ast, actual_ast in zip(func_ast.get("args"), actual_args):
+            result = copy.copy((yield from self.__value(actual_ast)))
+            args[formal_ast.get("name")] = self.check_arg(func_name, formal_ast, result)
+        if self.__tick():
+            yield Yield.PREEMPTED
+        if not suspends(func_ast):
+            return self.invoke(func_ast, args)
+
+        return_type = func_ast.get("return_type")
+        self.env.push_func()
+        for arg_name, value in args.items():
+            self.env.create(arg_name, value)
+        default_return = self.default_return(return_type)
+        call_line = self.current_line
+        _, return_val = yield from self.__run_statements(func_ast.get("statements"), default_return, func_ast.get("bare"))
+        self.env.pop_func()
+        self.current_line = call_line
+        return self.check_return(return_type, return_val, default_return)
+
+    # the prompt goes out before waiting, so that whoever feeds the session sees it
+    def __call_input(self, name, args):
+        if len(args) > 1:
+            super().error(ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter")
+        if args:
+            super().output(get_printable((yield from self.__value(args[0]))))
+        while self.input_cursor >= len(self.inp) and not self.input_closed:
+            yield Yield.WAITING
+        return self.read_input(name)
+
+    def __value(self, expr_ast):
+        if suspends(expr_ast):
+            return (yield from self.__eval_expr(expr_ast))
+        return self.evaluate(expr_ast)
+
+    # expr_ast may yield: it is a call, or an operation on one
+    def __eval_expr(self, expr_ast):
+        self.steps_left -= 1
+        if self.steps_left < 0:
+            super().check_limits()
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.FCALL_NODE:
+            result = yield from self.__call(expr_ast.get("name"), expr_ast.get("args"))
+            if result.type() == Type.VOID:
+                super().error(ErrorType.TYPE_ERROR, "Cannot use function with void return type in an expression")
+            return result
+        if kind in Interpreter.BIN_OPS:
+            left_value_obj = yield from self.__value(expr_ast.get("op1"))
+            right_value_obj = yield from self.__value(expr_ast.get("op2"))
+            return self.binary_op(kind, left_value_obj, right_value_obj)
+        if kind == InterpreterBase.INDEX_NODE:
+            array_obj = yield from self.__value(expr_ast.get("array"))
+            return self.get_element(array_obj, (yield from self.__value(expr_ast.get("subscript"))))
+        if kind == InterpreterBase.NEW_ARRAY_NODE:
+            return self.new_array(expr_ast.get("var_type"), (yield from self.__value(expr_ast.get("size"))))
+        return self.unary_op(kind, (yield from self.__value(expr_ast.get("op1"))))
+
+
+class Session:
+    def __init__(self, scheduler, ast, name, share):
+        self.scheduler = scheduler
+        self.name = name
+        self.share = share  # its weight under the fair policy
+        self.interpreter = GreenInterpreter()
+        self.interpreter.host_functions = scheduler.host_functions
+        self.task = self.interpreter.start(ast)
+        self.state = State.READY
+        self.vtime = 0.0  # slices used, divided by share
+        self.slices = 0
+        self.error = None
+
+    # deliver a line of input, waking the session if it was waiting for it
+    def feed(self, line):
+        self.interpreter.inp.append(line)
+        self.scheduler.wake(self)
+
+    # no more input: inputi() and inputs() read None from here on
+    def close(self):
+        self.interpreter.input_closed = True
+        self.scheduler.wake(self)
+
+    def output(self):
+        return self.interpreter.get_output()
+
+    def error_type_and_line(self):
+        return self.interpreter.get_error_type_and_line()
+
+
+# round_robin runs the ready sessions in turn, each for one quantum; fair runs the one
+# with the least slices used per unit of share, so a session with share 2 gets twice
+# the slices of one with share 1 while both are ready
+class Scheduler:
+    POLICIES = ("round_robin", "fair")
+
+    def __init__(self, quantum=1000, policy="round_robin"):
+        if policy not in Scheduler.POLICIES:
+            raise ValueError(f"unknown policy {policy}; choose from {', '.join(Scheduler.POLICIES)}")
+        self.quantum = quantum
+        self.policy = policy
+        self.ready = collections.deque() if policy == "round_robin" else []
+        self.sessions = []
+        self.asts = {}  # parsed programs by source, shared by the sessions running them
+        self.clock = 0.0  # the vtime of the last session to run
+        self.sequence = 0  # orders sessions with equal vtime in the fair queue
+        self.slices = 0
+        self.host_functions = HostFunctions()  # what every session's programs may call
+
+    def spawn(self, program, name=None, share=1, inputs=(), max_steps=None, max_seconds=None, max_memory_kb=None):
+        ast = self.asts.get(program)
+        if ast is None:
+            ast = self.asts[program] = parse_program(program)
+        session = Session(self, ast, name if name is not None else len(self.sessions), share)
+        session.interpreter.inp.extend(inputs)
+        session.interpreter.set_limits(max_steps, max_seconds, max_memory_kb)
+        session.vtime = self.clock
+        self.sessions.append(session)
+        self.__enqueue(session)
+        return session
+
+    def wake(self, session):
+        if session.state == State.WAITING:
+            session.state = State.READY
+            # it doesn't get to catch up on the slices it spent waiting
+            session.vtime = max(session.vtime, self.clock)
+            self.__enqueue(session)
+
+    def __enqueue(self, session):
+        if self.policy == "round_robin":
+            self.ready.append(session)
+        else:
+            self.sequence += 1
+            heapq.heappush(self.ready, (session.vtime, self.sequence, session))
+
+    def __next(self):
+        if self.policy == "round_robin":
+            return self.ready.popleft()
+        return heapq.heappop(self.ready)[2]
+
+    # run ready sessions until all have ended or wait for input, or for at most
+    # max_slices slices; returns the number of slices run
+    def run(self, max_slices=None):
+        count = 0
+        while self.ready and (max_slices is None or count < max_slices):
+            self.__resume(self.__next())
+            count += 1
+        return count
+
+    def __resume(self, session):
+        interpreter = session.interpreter
+        interpreter.slice_left = self.quantum
+        self.clock = session.vtime
+        self.slices += 1
+        session.slices += 1
+        try:
+            signal = next(session.task)
+        except StopIteration:
+            session.state = State.DONE
+        except Exception as e:
+            session.state = State.FAILED
+            session.error = e
+        else:
+            used = max(self.quantum - interpreter.slice_left, 1)
+            session.vtime += used / session.share
+            if signal == Yield.WAITING:
+                session.state = State.WAITING
+            else:
+                self.__enqueue(session)
+
+    def counts(self):
+        return collections.Counter(session.state.name for session in self.sessions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many copies of a v3 program as green threads")
+    parser.add_argument("program", help="source file to run")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--input", help="file whose lines are fed to every session, one per round")
+    parser.add_argument("--quantum", type=int, default=1000, help="back-edges and calls per time slice")
+    parser.add_argument("--policy", choices=Scheduler.POLICIES, default="round_robin")
+    args = parser.parse_args()
+
+    with open(args.program) as file:
+        program = file.read()
+    lines = []
+    if args.input is not None:
+        with open(args.input) as file:
+            lines = file.read().splitlines()
+
+    scheduler = Scheduler(args.quantum, args.policy)
+    start = time.perf_counter()
+    sessions = [scheduler.spawn(program) for _ in range(args.sessions)]
+    scheduler.run()
+    for line in lines:
+        for session in sessions:
+            session.feed(line)
+        scheduler.run()
+    for session in sessions:
+        session.close()
+    scheduler.run()
+    elapsed = time.perf_counter() - start
+
+    first = sessions[0]
+    for line in first.output():
+        print(line)
+    if first.error is not None:
+        print(first.error, file=sys.stderr)
+    counts = ", ".join(f"{count} {state.lower()}" for state, count in sorted(scheduler.counts().items()))
+    print(f"{args.sessions} sessions ({counts}), {scheduler.slices} slices in {elapsed:.2f} s", file=sys.stderr)
+    return 1 if first.error is not None else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+# Heap and allocation profiler for Brewin programs
+# Counts what a v3 or v4 run allocates (struct objects, arrays, maps, Values and v4's
+# LazyValue thunks) by type and by allocation site, the line of the statement that
+# made it, and takes snapshots of what is still live: each one walks the heap from the
+# environment's frames and reports live objects by type and by site, their sizes, and
+# the bindings that retain the most.
+#
+# Nothing is counted, and nothing costs anything, until a profiler is attached. Like
+# lineprof, it shadows methods on the one interpreter instance it profiles (new_object,
+# new_array and new_map); Values and thunks are made in too many places for that, so
+# their classes' __init__ is wrapped while a profiler is attached, and Values made by
+# other instances meanwhile are counted as well. Struct objects, arrays, maps and
+# thunks are tagged with their allocation site, so snapshots can file them by it.
+#
+# A snapshot is taken as main's body ends (or when the run does, if it raised an
+# error) and whenever snapshot() is called, e.g. from a host function: the command
+# line registers one called heapdump() for v3 programs. Sizes are shallow sizes from
+# sys.getsizeof, of every object or, with sample=k, of every k-th object of each type,
+# scaled up by the counts. An object reachable from several bindings is retained by the
+# first one the walk reaches it from: bindings in frames, innermost frame first, and
+# then the bindings captured by thunks, which are only walked after every frame.
+#
+# usage: python heapprof.py program.br [--version 3|4] [--input file] [--top N] [--sample K]
+
+import argparse
+import sys
+from collections import Counter
+
+import env_v2
+import env_v4
+import interpreterv3
+import interpreterv4
+import type_valuev2
+import type_valuev4
+from rope import Rope
+
+INTERPRETERS = {
+    3: interpreterv3.Interpreter,
+    4: interpreterv4.Interpreter,
+}
+DEFAULT_VERSION = 3
+VALUE_CLASSES = (type_valuev2.Value, type_valuev4.Value)
+HEAP_OBJECTS = (type_valuev2.UserObject, type_valuev2.ArrayObject, type_valuev2.MapObject, type_valuev4.LazyValue)
+ENVIRONMENTS = (env_v2.EnvironmentManager, env_v4.EnvironmentManager)
+
+
+class HeapProfiler:
+    def __init__(self, interpreter, sample=1):
+        self.interpreter = interpreter
+        self.sample = sample
+        self.allocations = Counter()  # (kind, type, line) -> objects allocated there
+        self.snapshots = []
+        self.patched = []  # (class, attribute, original) to restore on detach
+
+    # tag obj as allocated at the current line, and count it
+    def allocated(self, kind, type_name, obj):
+        site = (kind, type_name, self.interpreter.current_line)
+        self.allocations[site] += 1
+        obj.alloc_site = site
+
+    def attach(self):
+        interpreter = self.interpreter
+        if hasattr(interpreter, "jit_threshold"):
+            interpreter.jit_threshold = None  # compiled functions keep ints and bools unboxed
+            interpreter.inline_max_nodes = None  # inlined variables would be filed under their callers
+        allocated = self.allocated
+        allocations = self.allocations
+
+        # instance attributes shadow the class's methods, as in lineprof
+        for name, kind in (("new_object", "struct"), ("new_array", "array"), ("new_map", "map")):
+            method = getattr(interpreter, name, None)
+            if method is not None:
+                setattr(interpreter, name, self.__counted(method, kind))
+
+        def counted_value(init):
+            def __init__(value, *args):
+                init(value, *args)
+                allocations[("value", value.t, interpreter.current_line)] += 1
+            return __init__
+
+        def counted_thunk(init):
+            def __init__(thunk, *args):
+                init(thunk, *args)
+                allocated("thunk", "thunk", thunk)
+            return __init__
+
+        # main's variables are in its frame's second block, unless its body is bare
+        def exit_snapshot(pop):
+            def wrapper(env):
+                if env is interpreter.env and len(env.environment) == 1:
+                    bare = interpreter.func_name_to_ast["main"][0].get("bare")
+                    if len(env.environment[0]) == (1 if bare else 2):
+                        self.snapshot("exit")
+                pop(env)
+            return wrapper
+
+        for cls in VALUE_CLASSES:
+            self.__patch(cls, "__init__", counted_value)
+        self.__patch(type_valuev4.LazyValue, "__init__", counted_thunk)
+        for cls in ENVIRONMENTS:
+            self.__patch(cls, "pop_block", exit_snapshot)
+            self.__patch(cls, "pop_func", exit_snapshot)
+
+    def detach(self):
+        for name in ("new_object", "new_array", "new_map"):
+            self.interpreter.__dict__.pop(name, None)
+        for cls, name, original in reversed(self.patched):
+            setattr(cls, name, original)
+        self.patched = []
+
+    def __counted(self, method, kind):
+        allocated = self.allocated
+
+        def counted(type_name, *args):
+            result = method(type_name, *args)
+            allocated(kind, result.t, result.v)
+            return result
+
+        return counted
+
+    def __patch(self, cls, name, wrap):
+        original = cls.__dict__[name]
+        self.patched.append((cls, name, original))
+        setattr(cls, name, wrap(original))
+
+    # Walk everything reachable from the interpreter's frames, and file it by type, by
+    # allocation site and by the binding that retains it
+    def snapshot(self, label=None):
+        env = self.interpreter.env
+        frames = env.environment if env is not None else []
+        seen = set()
+        counts = Counter()  # (kind, type) -> live objects
+        sites = Counter()  # allocation site -> live objects
+        measured = {}  # (kind, type) -> [objects measured, their bytes]
+        retained = []  # (binding, Counter of (kind, type) -> objects)
+        thunks = []
+
+        def walk(roots, follow_captures):
+            found = Counter()
+            pending = list(roots)
+            while pending:
+                obj = pending.pop()
+                if id(obj) in seen or isinstance(obj, (type_valuev2.ConstantValue, type_valuev4.ConstantValue)):
+                    continue
+                seen.add(id(obj))
+                key = _kind(obj)
+                if key is None:
+                    continue
+                found[key] += 1
+                counts[key] += 1
+                site = getattr(obj, "alloc_site", None)
+                if site is not None:
+                    sites[site] += 1
+                if (counts[key] - 1) % self.sample == 0:
+                    total = measured.setdefault(key, [0, 0])
+                    total[0] += 1
+                    total[1] += _shallow_size(obj)
+                if isinstance(obj, type_valuev4.LazyValue):
+                    thunks.append(obj)
+                    if follow_captures:
+                        pending.extend(_captured(obj).values())
+                pending.extend(_children(obj))
+            return found
+
+        # innermost frame first, since that is where a program is usually working
+        for depth in range(len(frames) - 1, -1, -1):
+            for block in frames[depth]:
+                for name, binding in block.items():
+                    retained.append((f"frame {depth} {name}", walk([binding], False)))
+        walked = 0
+        while walked < len(thunks):
+            thunk = thunks[walked]
+            walked += 1
+            line = getattr(thunk, "alloc_site", (None, None, None))[2]
+            for name, binding in _captured(thunk).items():
+                retained.append((f"thunk (line {line}) {name}", walk([binding], True)))
+
+        mean = {key: total[1] / total[0] for key, total in measured.items()}
+        retainers = []
+        for binding, found in retained:
+            if found:
+                size = sum(count * mean[key] for key, count in found.items())
+                retainers.append((binding, sum(found.values()), size))
+        retainers.sort(key=lambda retainer: retainer[2], reverse=True)
+        result = {
+            "label": label,
+            "line": self.interpreter.current_line,
+            "types": {key: (count, count * mean[key]) for key, count in counts.items()},
+            "sites": dict(sites),
+            "retainers": retainers,
+        }
+        self.snapshots.append(result)
+        return result
+
+    def report(self, top=10, file=sys.stdout):
+        print("allocations", file=file)
+        print(f"{'kind':<8} {'type':<20} {'line':>6} {'allocated':>10} {'live':>8}", file=file)
+        last = self.snapshots[-1] if self.snapshots else None
+        for site, count in sorted(self.allocations.items(), key=lambda item: item[1], reverse=True)[:top * 2]:
+            kind, type_name, line = site
+            live = last["sites"].get(site, "") if last is not None and kind != "value" else ""
+            print(f"{kind:<8} {type_name:<20} {line if line is not None else '?':>6} {count:>10} {live:>8}",
+                  file=file)
+        for snapshot in self.snapshots:
+            label = snapshot["label"] or "on demand"
+            line = snapshot["line"] if snapshot["line"] is not None else "?"
+            print(f"\nheap at {label} (line {line})", file=file)
+            print(f"{'kind':<8} {'type':<20} {'live':>8} {'bytes':>10}", file=file)
+            for (kind, type_name), (count, size) in sorted(snapshot["types"].items(), key=lambda item: -item[1][1]):
+                print(f"{kind:<8} {type_name:<20} {count:>8} {size:>10.0f}", file=file)
+            print("top retainers", file=file)
+            for binding, count, size in snapshot["retainers"][:top]:
+                print(f"  {binding:<40} {count:>8} objects {size:>10.0f} bytes", file=file)
+
+
+# the (kind, type) a heap object is counted under, or None for anything else
+def _kind(obj):
+    if isinstance(obj, VALUE_CLASSES):
+        return "value", obj.t
+    if isinstance(obj, type_valuev2.UserObject):
+        return "struct", obj.name
+    if isinstance(obj, type_valuev2.ArrayObject):
+        return "array", type_valuev2.array_type(obj.elem_type)
+    if isinstance(obj, type_valuev2.MapObject):
+        return "map", type_valuev2.map_type(obj.key_type, obj.value_type)
+    if isinstance(obj, type_valuev4.LazyValue):
+        return "thunk", "thunk"
+    return None
+
+
+# what obj holds on to, thunk captures aside
+def _children(obj):
+    if isinstance(obj, VALUE_CLASSES):
+        return [obj.v] if isinstance(obj.v, VALUE_CLASSES + HEAP_OBJECTS) else []
+    if isinstance(obj, type_valuev2.UserObject):
+        return list(obj.v.values())
+    if isinstance(obj, type_valuev2.ArrayObject):
+        return obj.items if isinstance(obj.items, list) else []
+    if isinstance(obj, type_valuev2.MapObject):
+        return list(obj.items.values())
+    if isinstance(obj, type_valuev4.LazyValue) and obj.evaluated:
+        return [obj.cached_value]
+    return []
+
+
+# the bindings a thunk's closure captured: the dicts among its defaults and free variables
+def _captured(thunk):
+    func = thunk.expr_func
+    captured = {}
+    cells = [cell.cell_contents for cell in func.__closure__ or ()]
+    for item in list(func.__defaults__ or ()) + cells:
+        if isinstance(item, dict):
+            captured.update(item)
+    return captured
+
+
+def _shallow_size(obj):
+    size = sys.getsizeof(obj) + sys.getsizeof(getattr(obj, "__dict__", None) or {})
+    if isinstance(obj, VALUE_CLASSES) and isinstance(obj.v, (str, Rope)):
+        size += sys.getsizeof(obj.v)
+    elif isinstance(obj, type_valuev2.UserObject):
+        size += sys.getsizeof(obj.v)
+    elif isinstance(obj, (type_valuev2.ArrayObject, type_valuev2.MapObject)):
+        size += sys.getsizeof(obj.items)
+    elif isinstance(obj, type_valuev4.LazyValue):
+        size += sys.getsizeof(obj.expr_func) + sum(sys.getsizeof(item) for item in obj.expr_func.__defaults__ or ())
+    return size
+
+
+# run a program under the profiler and return it along with the error raised, if any
+def profile(program, version=DEFAULT_VERSION, inp=None, console_output=True, sample=1):
+    interpreter = INTERPRETERS[version](console_output=console_output, inp=inp)
+    profiler = HeapProfiler(interpreter, sample)
+    if hasattr(interpreter, "register_function"):
+        interpreter.register_function("heapdump", [], "void", lambda: profiler.snapshot())
+    profiler.attach()
+    error = None
+    try:
+        interpreter.run(program)
+    except Exception as e:
+        error = e
+    finally:
+        profiler.detach()
+    if not any(snapshot["label"] == "exit" for snapshot in profiler.snapshots):
+        profiler.snapshot("exit")  # main didn't return, so its frames are still there
+    return profiler, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the objects a Brewin program allocates and retains")
+    parser.add_argument("program", help="source file to run")
+    parser.add_argument("--version", type=int, choices=sorted(INTERPRETERS), default=DEFAULT_VERSION)
+    parser.add_argument("--input", help="file whose lines are the program's input")
+    parser.add_argument("--top", type=int, default=10, help="retainers to list per snapshot")
+    parser.add_argument("--sample", type=int, default=1, help="measure the size of one object in this many")
+    args = parser.parse_args()
+
+    with open(args.program) as file:
+        source = file.read()
+    inp = None
+    if args.input is not None:
+        with open(args.input) as file:
+            inp = file.read().splitlines()
+
+    profiler, error = profile(source, args.version, inp, sample=args.sample)
+    if error is not None:
+        print(error, file=sys.stderr)
+    profiler.report(args.top, file=sys.stderr)
+    return 1 if error is not None else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# Host functions: Python callables that v3 programs call like their own functions
+# A HostFunctions registry maps a Brewin name and arity to a Python callable, with the
+# parameter and return types it declares in v3's syntax:
+#
+#   interpreter.register_function("dot", ["int[]", "int[]"], "int", lambda a, b: ...)
+#
+# Calls resolve where calls of user-defined functions do (Interpreter.lookup_function),
+# after the program's own functions, so a program defining a function of the same name
+# and arity calls that instead. Arguments are checked and coerced as for any call, and
+# what the callable returns is checked against the declared return type.
+#
+# Arguments are passed without copying where their storage allows it:
+#   int, bool, string   a Python int, bool or str
+#   a struct            its Value, or None for nil
+#   T[]                 the array's storage, or None for nil: an array('q') of ints (a
+#                       list if a value has outgrown 64 bits), a bytearray of 0s and 1s
+#                       for bools, or a list of strs or of struct Values
+#   map[K]V             the map's dict, with unboxed values for primitive V
+# so a callable can wrap an int or bool array in numpy.frombuffer() without a copy, and
+# changes it makes to an array or map are seen by the program. Returns may be any of
+# the types above; an int[] may also be returned as anything array('q') accepts, with
+# buffers of 64-bit ints copied in one go.
+#
+# An exception raised by the callable is a FAULT_ERROR in the program. Snapshots don't
+# hold host functions, so an interpreter loading one needs the same registry.
+
+import operator
+import re
+from array import array
+
+from brewlex import reserved_map
+from intbase import InterpreterBase
+from element import Element
+from rope import flatten
+from type_valuev2 import (MAP_KEY_TYPES, ArrayObject, MapObject, Type, Value, array_type, element_type, map_type,
+                          map_types)
+
+PRIM_TYPES = (Type.INT, Type.BOOL, Type.STRING)
+_TRUTH = bytes([0] + [1] * 255)  # translates any nonzero byte to a true bool element
+# names the interpreters resolve before looking for a function
+RESERVED_NAMES = frozenset({"print", "inputi", "inputs", "checkpoint", "len", "get", "put", "contains",
+                            "delete", "keys"})
+
+
+class HostFunction:
+    __slots__ = ("name", "param_types", "return_type", "func", "formals")
+
+    def __init__(self, name, param_types, return_type, func):
+        self.name = name
+        self.param_types = tuple(param_types)
+        self.return_type = return_type
+        self.func = func
+        # what Interpreter.check_arg checks the arguments against
+        self.formals = [Element(InterpreterBase.ARG_NODE, name=f"#{index + 1}", var_type=param_type)
+                        for index, param_type in enumerate(self.param_types)]
+
+
+class HostFunctions:
+    def __init__(self):
+        self.functions = {}  # name -> {arity: HostFunction}
+
+    def register(self, name, param_types, return_type, func):
+        if name in RESERVED_NAMES:
+            raise ValueError(f"{name} is a builtin")
+        for param_type in param_types:
+            if not _declarable(param_type):
+                raise ValueError(f"Invalid type {param_type} in parameters of host function {name}")
+        if not _returnable(return_type):
+            raise ValueError(f"Host functions can't return {return_type}")
+        self.functions.setdefault(name, {})[len(param_types)] = HostFunction(name, param_types, return_type, func)
+
+    def lookup(self, name, num_params):
+        candidates = self.functions.get(name)
+        return candidates.get(num_params) if candidates is not None else None
+
+
+# The types load accepts in a function signature: primitives, arrays of them or of
+# structs, maps from ints or strings to any of these, and struct names. One registry
+# serves many programs, so a struct name is only checked to be a name here; whether
+# the program defines it is checked when the function is called (Interpreter.call_host)
+def _declarable(t):
+    if not isinstance(t, str):
+        return False
+    key_value = map_types(t)
+    if key_value is not None:
+        return key_value[0] in MAP_KEY_TYPES and _declarable(key_value[1])
+    t = element_type(t) or t
+    return t in PRIM_TYPES or (_NAME.fullmatch(t) is not None and t != Type.VOID and t not in reserved_map)
+
+
+_NAME = re.compile(r"[A-Za-z_]\w*")  # as brewlex.t_NAME matches them
+
+
+# primitives, arrays of them, maps to them, and structs
+def _returnable(t):
+    if t == Type.VOID or (element_type(t) or t) in PRIM_TYPES:
+        return True
+    key_value = map_types(t)
+    if key_value is not None:
+        return key_value[1] in PRIM_TYPES
+    return element_type(t) is None  # a struct, checked when it is returned
+
+
+# the Python value passed for a checked argument
+def unbox(value):
+    payload = value.v
+    if type(payload) is Value:  # the payload of a declared but unassigned variable
+        payload = payload.v
+    if type(payload) is ArrayObject:
+        if payload.elem_type == Type.STRING:
+            _flatten_all(payload.items, range(len(payload.items)))
+        return payload.items
+    if type(payload) is MapObject:
+        if payload.value_type == Type.STRING:
+            _flatten_all(payload.items, list(payload.items))
+        return payload.items
+    if value.t in PRIM_TYPES:
+        return flatten(payload)
+    return value if payload is not None else None
+
+
+# join the ropes among strings, in place, so that the callable only sees strs
+def _flatten_all(items, keys):
+    for key in keys:
+        if type(items[key]) is not str:
+            items[key] = flatten(items[key])
+
+
+# The Value for what host returned, or a message saying why it doesn't fit its return
+# type. Structs are passed through, for the interpreter to check
+def box(host, result):
+    t = host.return_type
+    if t == Type.VOID:
+        return Value(Type.VOID), None
+    if t == Type.INT:
+        if type(result) is bool:
+            return None, "bool"
+        try:
+            return Value(Type.INT, operator.index(result)), None
+        except TypeError:
+            return None, type(result).__name__
+    if t == Type.BOOL:
+        if type(result) is bool:
+            return Value(Type.BOOL, result), None
+        try:
+            return Value(Type.BOOL, operator.index(result) != 0), None  # ints coerce, as on any return
+        except TypeError:
+            return None, type(result).__name__
+    if t == Type.STRING:
+        if type(result) is str:
+            return Value(Type.STRING, result), None
+        return None, type(result).__name__
+    if result is None:
+        return Value(t, None), None
+    elem_type = element_type(t)
+    if elem_type is not None:
+        return _box_array(t, elem_type, result)
+    key_value = map_types(t)
+    if key_value is not None:
+        return _box_map(t, key_value, result)
+    return result, None
+
+
+def _box_array(t, elem_type, result):
+    if type(result) is ArrayObject:
+        if result.elem_type != elem_type:
+            return None, array_type(result.elem_type)
+        return Value(t, result), None
+    items = None
+    if elem_type == Type.INT:
+        items = _int_items(result)
+    elif elem_type == Type.BOOL:
+        items = _bool_items(result)
+    elif isinstance(result, (list, tuple)) and all(type(item) is str for item in result):
+        items = list(result)
+    if items is None:
+        return None, type(result).__name__
+    array_obj = ArrayObject(elem_type, 0)
+    array_obj.items = items
+    return Value(t, array_obj), None
+
+
+# result as the storage of an int array: an array('q') is kept as it is, and other
+# buffers of 64-bit ints are copied whole
+def _int_items(result):
+    if type(result) is array and result.typecode == "q":
+        return result
+    view = _view(result)
+    if view is not None and view.itemsize == 8 and view.format.lstrip("@=<") in ("q", "l"):
+        items = array("q")
+        items.frombytes(view.cast("B"))
+        return items
+    items = _ints(result)
+    if items is None:
+        return None
+    try:
+        return array("q", items)
+    except OverflowError:
+        return items
+
+
+# result as the storage of a bool array; ints are coerced, as they are when stored
+def _bool_items(result):
+    view = _view(result)
+    if view is not None and view.itemsize == 1 and view.format in ("?", "b", "B"):
+        return bytearray(view).translate(_TRUTH)
+    items = _ints(result, bools=True)
+    return bytearray(item != 0 for item in items) if items is not None else None
+
+
+# a one-dimensional, contiguous view of result's buffer, if it has one
+def _view(result):
+    try:
+        view = memoryview(result)
+    except TypeError:
+        return None
+    return view if view.ndim == 1 and view.c_contiguous else None
+
+
+# the items of result as Python ints, or None if one isn't an int (or a bool, if allowed)
+def _ints(result, bools=False):
+    items = []
+    try:
+        for item in result:
+            if type(item) is bool and not bools:
+                return None
+            items.append(operator.index(item))
+    except TypeError:
+        return None
+    return items
+
+
+def _box_map(t, key_value, result):
+    if type(result) is MapObject:
+        if (result.key_type, result.value_type) != key_value:
+            return None, map_type(result.key_type, result.value_type)
+        return Value(t, result), None
+    if not isinstance(result, dict):
+        return None, type(result).__name__
+    key_type, value_type = key_value
+    python_types = {Type.INT: int, Type.BOOL: bool, Type.STRING: str}
+    for key, value in result.items():
+        if type(key) is not python_types[key_type] or type(value) is not python_types[value_type]:
+            return None, f"dict with a {type(key).__name__} key and a {type(value).__name__} value"
+    map_obj = MapObject(key_type, value_type)
+    map_obj.items = result
+    return Value(t, map_obj), None
@@ -0,0 +1,198 @@
+# Inlining calls of small functions (v3)
+# A call of a user-defined function costs the interpreter a name lookup, the builtin
+# checks before it, a copy of each argument, a function frame and a few Python calls
+# besides running the body. The Inliner rewrites a function's body, the first time the
+# function is invoked, so that each call of a small function in it is an inline node
+# holding the callee's body instead: running one evaluates and checks the arguments as
+# the call would (Interpreter.check_arg, so ints still become bools and nil a nil of
+# the parameter's type), runs the body in a block of the caller's frame, and checks
+# what it returns as the call would (Interpreter.check_return, defaults included). A
+# return anywhere in the body ends the inline node the way it would end the call.
+#
+# The callee's parameters and variables are renamed in its copy, x to x@f/1 for f
+# taking one parameter, so that none of the caller's variables can be seen from it
+# through the shared frame, and one it doesn't define is still not found. Errors raised
+# in the copy name its variables as they are in the source (see Interpreter.__inline).
+#
+# A callee is inlined if its body, with the calls it inlines in turn, is at most
+# max_nodes nodes of the kinds v3 runs. A call that would expand a function inside its
+# own expansion is left a call, and so are all calls of a function found calling itself
+# that way; a function that is only recursive through a callee too big to inline may be
+# expanded one level, which runs the same. Builtins, and host functions, are never
+# inlined.
+#
+# The interpreter only inlines with the JIT off (jit_threshold None): compiled code is
+# faster still, and a call inlined into its caller would never count towards compiling
+# the callee. Coverage and tracing turn it off too, as they do the JIT. Rewritten bodies
+# are kept here rather than in the tree, so that the JIT, coverage and the tracer see
+# the program as it was written.
+
+from element import Element
+from intbase import InterpreterBase
+
+# the statements and expressions Interpreter.__run_statement and __eval_expr run
+STATEMENTS = frozenset({InterpreterBase.FCALL_NODE, "=", InterpreterBase.INDEX_ASSIGN_NODE,
+                        InterpreterBase.VAR_DEF_NODE, InterpreterBase.RETURN_NODE, InterpreterBase.IF_NODE,
+                        InterpreterBase.FOR_NODE})
+EXPRESSIONS = frozenset({InterpreterBase.NIL_NODE, InterpreterBase.INT_NODE, InterpreterBase.STRING_NODE,
+                         InterpreterBase.BOOL_NODE, InterpreterBase.VAR_NODE, InterpreterBase.FCALL_NODE,
+                         "+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&",
+                         InterpreterBase.INDEX_NODE, InterpreterBase.NEG_NODE, InterpreterBase.NOT_NODE,
+                         InterpreterBase.NEW_NODE, InterpreterBase.NEW_ARRAY_NODE, InterpreterBase.NEW_MAP_NODE})
+# the nodes that name a variable in "name"
+NAMING = frozenset({InterpreterBase.VAR_NODE, "=", InterpreterBase.VAR_DEF_NODE})
+
+
+# whether a call of name with num_args arguments is a builtin's, whatever the program defines
+def is_builtin(name, num_args):
+    return (name in ("print", "inputi", "inputs") or (name == "checkpoint" and num_args == 0)
+            or (name == "len" and num_args == 1))
+
+
+class Inliner:
+    def __init__(self, interpreter, max_nodes):
+        self.interpreter = interpreter  # whose function table calls resolve in
+        self.max_nodes = max_nodes
+        self.bodies = {}  # func_ast -> its statements with calls inlined
+        self.expansions = {}  # func_ast -> (its renamed body, size), or None if not inlined
+        self.rewriting = []  # the functions being rewritten, callers first
+        self.recursive = set()
+
+    # func_ast's statements, with the calls in them inlined
+    def statements(self, func_ast):
+        body = self.bodies.get(func_ast)
+        if body is None:
+            self.rewriting.append(func_ast)
+            try:
+                body = [self.__rewrite(statement) for statement in func_ast.get("statements")]
+            finally:
+                self.rewriting.pop()
+            self.bodies[func_ast] = body
+        return body
+
+    # node, or a copy of it with the calls below it inlined
+    def __rewrite(self, node):
+        changed = {}
+        for key, value in node.dict.items():
+            if isinstance(value, Element):
+                new_value = self.__rewrite(value)
+                if new_value is not value:
+                    changed[key] = new_value
+            elif isinstance(value, list):
+                new_value = [self.__rewrite(item) if isinstance(item, Element) else item for item in value]
+                if any(new is not old for new, old in zip(new_value, value)):
+                    changed[key] = new_value
+        if node.elem_type == InterpreterBase.FCALL_NODE:
+            args = changed.get("args", node.get("args"))
+            callee = self.__callee(node.get("name"), len(args))
+            expansion = self.__expansion(callee) if callee is not None else None
+            if expansion is not None:
+                return self.__inline_node(node, callee, args, expansion)
+        if not changed:
+            return node
+        return _copy(node, {**node.dict, **changed})
+
+    # the program function a call runs, or None if it runs something else
+    def __callee(self, name, num_args):
+        if is_builtin(name, num_args):
+            return None
+        return self.interpreter.func_name_to_ast.get(name, {}).get(num_args)
+
+    # (the body to put in place of a call of func_ast, its size), or None to keep the call
+    def __expansion(self, func_ast):
+        if func_ast in self.rewriting:
+            # everything from func_ast's rewrite on is part of a cycle through it
+            self.recursive.update(self.rewriting[self.rewriting.index(func_ast):])
+            return None
+        if func_ast in self.expansions:
+            return self.expansions[func_ast]
+        expansion = None
+        if _size(func_ast.get("statements"), self.max_nodes) is not None:
+            body = self.statements(func_ast)
+            size = _size(body, self.max_nodes)
+            if size is not None and func_ast not in self.recursive:
+                suffix = _suffix(func_ast)
+                expansion = ([_renamed(statement, suffix) for statement in body], size)
+        self.expansions[func_ast] = expansion
+        return expansion
+
+    def __inline_node(self, call, callee, args, expansion):
+        formals = callee.get("args")
+        suffix = _suffix(callee)
+        statements, size = expansion
+        inline = Element(InterpreterBase.INLINE_NODE, name=call.get("name"), args=args, formals=formals,
+                         params=[formal.get("name") + suffix for formal in formals],
+                         return_type=callee.get("return_type"), statements=statements, bare=callee.get("bare"),
+                         suffix=suffix, size=size)
+        inline.line_num = call.line_num
+        inline.node_id = call.node_id
+        return inline
+
+
+# what the variables of func_ast are renamed with in its inlined copies
+def _suffix(func_ast):
+    return f"@{func_ast.get('name')}/{len(func_ast.get('args'))}"
+
+
+def _copy(node, fields):
+    new = Element(node.elem_type, **fields)
+    new.line_num = node.line_num
+    new.node_id = node.node_id
+    return new
+
+
+# a copy of node with each variable x renamed x + suffix; the bodies of the calls
+# inlined into it are another function's, and already renamed
+def _renamed(node, suffix):
+    if node.elem_type == InterpreterBase.INLINE_NODE:
+        return _copy(node, {**node.dict, "args": [_renamed(arg, suffix) for arg in node.get("args")]})
+    fields = {}
+    for key, value in node.dict.items():
+        if isinstance(value, Element):
+            value = _renamed(value, suffix)
+        elif isinstance(value, list):
+            value = [_renamed(item, suffix) if isinstance(item, Element) else item for item in value]
+        fields[key] = value
+    if node.elem_type in NAMING:
+        # a field access renames the struct's variable: p.x is p@f/1.x
+        base, dot, fields_part = fields["name"].partition(".")
+        fields["name"] = base + suffix + dot + fields_part
+    elif node.elem_type == InterpreterBase.FOR_NODE:
+        fields["counting"] = None  # found again for the new names when the loop first runs
+    return _copy(node, fields)
+
+
+# The number of nodes in statements, counting those of the bodies inlined into them, or
+# None if that is more than max_nodes or they include a node v3 doesn't run
+def _size(statements, max_nodes):
+    size = 0
+    pending = [(statement, STATEMENTS) for statement in statements]
+    while pending:
+        node, kinds = pending.pop()
+        size += 1
+        if node.elem_type == InterpreterBase.INLINE_NODE:
+            size += node.get("size")
+            pending.extend((arg, EXPRESSIONS) for arg in node.get("args"))
+        elif node.elem_type not in kinds:
+            return None
+        else:
+            pending.extend(_children(node))
+        if size > max_nodes:
+            return None
+    return size
+
+
+# the statements and expressions below node, each with the kinds it may be
+def _children(node):
+    for key, value in node.dict.items():
+        if key in ("statements", "else_statements"):
+            for statement in value or ():
+                yield statement, STATEMENTS
+        elif key in ("init", "update"):
+            if value is not None:
+                yield value, STATEMENTS
+        elif key == "args":
+            for arg in value:
+                yield arg, EXPRESSIONS
+        elif isinstance(value, Element):
+            yield value, EXPRESSIONS
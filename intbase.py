@@ -1,11 +1,21 @@
 # Base class for our interpreter
+import sys
+import time
 from enum import Enum
 
+import brewtrace
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
 
 class ErrorType(Enum):
     TYPE_ERROR = 1
     NAME_ERROR = 2  # if a variable or function name can't be found
     FAULT_ERROR = 3  # used if an object reference is null and used to make a call
+    BUDGET_ERROR = 4  # the run used up its step, wall-clock or memory budget
     # Add others here
 
 
@@ -29,6 +39,12 @@ class InterpreterBase:
     VAR_DEF_NODE = "vardef"
     FIELD_DEF_NODE = "fielddef"
     NEW_NODE = "new"
+    NEW_ARRAY_NODE = "new[]"
+    INDEX_NODE = "[]"
+    INDEX_ASSIGN_NODE = "[]="
+    NEW_MAP_NODE = "new map"
+    IMPORT_NODE = "import"
+    INLINE_NODE = "inline"  # made by inline.py, not the parser
     TRY_NODE = "try"
     CATCH_NODE = "catch"
     RAISE_NODE = "raise"
@@ -38,36 +54,108 @@ class InterpreterBase:
     FALSE_DEF = "false"
     NIL_DEF = "nil"
     VOID_DEF = "void"
-    
+
+    # coverage flags, or-ed into a node's byte of the coverage bytearray (see brewcov.py)
+    COVERED = 1  # the statement ran, the function was called or the catch handler ran
+    BRANCH_TAKEN = 2  # an if's condition was true, or a for loop's body ran
+    BRANCH_NOT_TAKEN = 4  # an if's condition was false, or a for loop's condition ended it
+
+    # the memory ceiling is read from the OS, so only look at it every this many checks
+    MEMORY_CHECK_INTERVAL = 256
+    # whether the interpreter counts steps and checks the clock and memory; those that
+    # don't refuse limits rather than run unbounded
+    ENFORCES_LIMITS = False
+
     # methods
-    def __init__(self, console_output=True, inp=None):
+    def __init__(self, console_output=True, inp=None, trace_output=False):
         self.console_output = console_output
         self.inp = inp  # if not none, then read input from passed-in list
+        # with no input list, read input from the keyboard; runs serving requests turn
+        # this off, so that a program reading input when given none reads None instead
+        self.interactive = True
+        self.max_steps = None
+        self.max_seconds = None
+        self.max_memory_kb = None
+        self.set_tracer(brewtrace.tracer_for(trace_output))
         self.reset()
 
-    # Call to reset I/O for another run of the program
+    # Send trace records to tracer, or stop tracing when it is None. The flags are
+    # what the interpreters test before building a record (see brewtrace.py)
+    def set_tracer(self, tracer):
+        self.tracer = tracer
+        self.trace_errors = tracer is not None and tracer.enabled("errors")
+        self.trace_calls = tracer is not None and tracer.enabled("calls")
+        self.trace_env = tracer is not None and tracer.enabled("env")
+        self.trace_ops = tracer is not None and tracer.enabled("ops")
+        self.trace_thunks = tracer is not None and tracer.enabled("thunks")
+
+    # Call to reset I/O, and the rest of a run's state, for another run of the program.
+    # Interpreters extend it with their own per-run state, which lets pool.py hand a
+    # used instance out again as good as new; __init__ calls it to create that state
     def reset(self):
         self.output_log = []
         self.input_cursor = 0
         self.error_type = None
         self.error_line = None
+        self.current_line = None  # line of the statement being run, kept by the interpreters
+        self.reset_limits()
+
+    # Bound the next runs. Interpreters decrement steps_left for every statement,
+    # expression and call they execute, which is all an unlimited run pays for.
+    # The clock and memory are only read at loop back-edges and call entries,
+    # and only when check_clock says a limit for them is set
+    def set_limits(self, max_steps=None, max_seconds=None, max_memory_kb=None):
+        if not self.ENFORCES_LIMITS and (max_steps, max_seconds, max_memory_kb) != (None, None, None):
+            raise ValueError(f"{type(self).__module__} doesn't enforce step, time or memory limits")
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.max_memory_kb = max_memory_kb
+        self.reset_limits()
+
+    def reset_limits(self):
+        self.steps_left = self.max_steps if self.max_steps is not None else sys.maxsize
+        self.check_clock = self.max_seconds is not None or self.max_memory_kb is not None
+        self.deadline = None  # armed by the first check of the run
+        self.memory_checks = 0
+
+    def check_limits(self):
+        if self.steps_left < 0:
+            self.error(ErrorType.BUDGET_ERROR, f"Step budget of {self.max_steps} exhausted")
+        if self.max_seconds is not None:
+            now = time.monotonic()
+            if self.deadline is None:
+                self.deadline = now + self.max_seconds
+            elif now > self.deadline:
+                self.error(ErrorType.BUDGET_ERROR, f"Time budget of {self.max_seconds} s exhausted")
+        if self.max_memory_kb is not None:
+            self.memory_checks += 1
+            if self.memory_checks % InterpreterBase.MEMORY_CHECK_INTERVAL == 1:
+                used = memory_usage_kb()
+                if used is not None and used > self.max_memory_kb:
+                    self.error(
+                        ErrorType.BUDGET_ERROR,
+                        f"Memory budget of {self.max_memory_kb} KB exhausted ({used} KB in use)",
+                    )
 
     # Students must implement this in their derived class
     def run(self, program):
         pass
 
     def get_input(self):
-        if not self.inp:
+        if not self.inp and self.interactive:
             return input()  # Get input from keyboard if not input list provided
 
-        if self.input_cursor < len(self.inp):
+        if self.inp and self.input_cursor < len(self.inp):
             cur_input = self.inp[self.input_cursor]
             self.input_cursor += 1
             return cur_input
         return None
 
     # students must call this for any errors that they run into
+    # without a line_num, the error is reported on the line of the current statement
     def error(self, error_type, description=None, line_num=None):
+        if line_num is None:
+            line_num = self.current_line
         # log the error before we throw
         self.error_line = line_num
         self.error_type = error_type
@@ -76,6 +164,8 @@ class InterpreterBase:
             description = ": " + description
         else:
             description = ""
+        if __debug__ and self.trace_errors:
+            self.tracer.emit("errors", line_num, f"{error_type}{description}")
         if not line_num:
             raise Exception(f"{error_type}{description}")
         raise Exception(f"{error_type} on line {line_num}{description}")
@@ -90,3 +180,20 @@ class InterpreterBase:
 
     def get_error_type_and_line(self):
         return self.error_type, self.error_line
+
+
+PAGE_SIZE_KB = (resource.getpagesize() // 1024) if resource is not None else 4
+
+
+# resident memory of this process in KB, or None if the platform can't tell us
+def memory_usage_kb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE_KB
+    except (OSError, IndexError, ValueError):
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is the peak rather than the current size; it is in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
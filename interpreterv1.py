@@ -4,6 +4,7 @@
 # The code distinguishes among variable definitions, assignments, and function calls, processing each type accordingly
 # The evaluation mechanism addresses variables, constants, binary operations, and function calls, while ensuring accurate error handling
 
+import brewtrace
 from intbase import InterpreterBase, ErrorType
 from brewparse import parse_program
 
@@ -11,12 +12,15 @@ from brewparse import parse_program
 class Interpreter(InterpreterBase):
 
     def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+        super().__init__(console_output, inp, trace_output)
+
+    def reset(self):
+        super().reset()
         self.variables = {}  #Dictionary to store variable names and values 
 
     def run(self, program):
         #This is the main method to start executing the program
-        ast = parse_program(program) # Parse the program into an AST
+        ast = parse_program(program, version=1) # Parse the program into an AST
 
         
         main_func = self.get_main_func(ast)# Retrieve the main function from the AST
@@ -52,6 +56,7 @@ class Interpreter(InterpreterBase):
     #Loop through each statement to process it
     
     def run_statement(self, statement_node):
+        self.current_line = statement_node.line_num
         type = statement_node.elem_type
 
         if type =="vardef": # For variable definition
@@ -99,6 +104,8 @@ class Interpreter(InterpreterBase):
 
         # Evaluate the right-hand side expression and assign the value
         value = self.evaluate_expression(expr_node)
+        if __debug__ and self.trace_env:
+            self.tracer.emit("env", self.current_line, f"{var_name} = {brewtrace.describe(value)}")
         
         self.variables[var_name] = value
     
@@ -1,5 +1,6 @@
 # Anushka Nayak (605977416)
 
+import brewtrace
 from intbase import InterpreterBase, ErrorType
 from brewparse import parse_program
 class Return(Exception):
@@ -10,7 +11,10 @@ class Return(Exception):
 class Interpreter(InterpreterBase): # change here for scoping
 
     def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+        super().__init__(console_output, inp, trace_output)
+
+    def reset(self):
+        super().reset()
 # To implement lexical scoping, we will be using stack of stack of dictionaries
 # Each scope stack will have its own dictionary to hold variable names and values
         self.scopes = []  
@@ -20,7 +24,7 @@ class Interpreter(InterpreterBase): # change here for scoping
    
     def run(self, program):
         #This is the main method to start executing the program
-        ast = parse_program(program) # Parse the program into an AST
+        ast = parse_program(program, version=2) # Parse the program into an AST
         # print("parsed the program into AST:", ast)
         self.define_functions(ast)  #Define all functions in the program
         main_func = self.get_main_func(ast)#Retrieve the main function from the AST
@@ -74,6 +78,7 @@ class Interpreter(InterpreterBase): # change here for scoping
     #Loop through each statement to process it
    
     def run_statement(self, statement_node):
+        self.current_line = statement_node.line_num
         type = statement_node.elem_type
         if type =="vardef": # For variable definition
             self.do_definition(statement_node)
@@ -110,6 +115,8 @@ class Interpreter(InterpreterBase): # change here for scoping
     def do_assignment(self, statement_node):
         var_name = statement_node.dict.get("name")
         value = self.evaluate_expression(statement_node.dict.get("expression"))
+        if __debug__ and self.trace_env:
+            self.tracer.emit("env", self.current_line, f"{var_name} = {brewtrace.describe(value)}")
         for scope in reversed(self.scopes):
             if var_name in scope:
                 scope[var_name] = value
@@ -281,8 +288,11 @@ class Interpreter(InterpreterBase): # change here for scoping
             value = self.evaluate_expression(arg)
             param_name = func_def.dict.get('args', [])[i].dict.get('name')
             self.scopes[-1][param_name] = value
+        if __debug__ and self.trace_calls:
+            self.tracer.emit("calls", self.current_line, brewtrace.describe_call(func_name, self.scopes[-1]))
 
         return_value = None
+        call_line = self.current_line
         try:
             for statement in func_def.dict.get('statements', []):
                 result = self.run_statement(statement)
@@ -294,6 +304,7 @@ class Interpreter(InterpreterBase): # change here for scoping
             return_value = ret.value
         finally:
             self.scopes.pop()
+        self.current_line = call_line
         return return_value if return_value is not None else None
     
     def handle_print(self, args):
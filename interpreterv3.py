@@ -1,12 +1,23 @@
 # document that we won't have a return inside the init/update of a for loop
 
 import copy
+import operator
 from enum import Enum
-
-from brewparse import parse_program
+from types import MappingProxyType
+
+import artifact
+import brewtrace
+import host
+import inline
+import jit
+import modules
+import snapshot
+from brewparse import parse_program, parse_program_lazily, when_parsed
 from env_v2 import EnvironmentManager
 from intbase import InterpreterBase, ErrorType
-from type_valuev2 import Type, Value, create_value, get_printable, UserObject, create_user_object, create_val
+from rope import concat, flatten
+from type_valuev2 import (Type, ConstantValue, Value, get_printable, UserObject, create_user_object, create_val,
+                          ArrayObject, MapObject, array_type, element_type, known_type, map_types)
 #FOR STRUCTS
 #new class in new type file for user objects. this class has type and value. the value is a dict to hold fields 
 #have a check of exsisting user objects. because student can call person. user defined func goes through all the structs and calls create user
@@ -19,36 +30,214 @@ class ExecStatus(Enum):
 # Main interpreter class
 class Interpreter(InterpreterBase):
     # constants
-    NIL_VALUE = create_value(InterpreterBase.NIL_DEF)
-    TRUE_VALUE = create_value(InterpreterBase.TRUE_DEF)
-    BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
-    PRIM_TYPES = {"int", "bool", "string"} 
-    VALID_FUNCTION_RETURN_TYPES = {"int", "string", "bool", "void"}
+    NIL_VALUE = ConstantValue(Type.NIL, None)
+    TRUE_VALUE = ConstantValue(Type.BOOL, True)
+    BIN_OPS = frozenset({"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"})
+    PRIM_TYPES = frozenset({"int", "bool", "string"})
+    VALID_FUNCTION_RETURN_TYPES = frozenset({"int", "string", "bool", "void"})
+    # conditions a counting loop may test its variable with, and whether to use them
+    COUNTING_COMPARE = MappingProxyType({"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge})
+    COUNTING_LOOPS = True
+    ENFORCES_LIMITS = True
+    # whether blocks that declare no variables run without a scope of their own
+    ELIDE_SCOPES = True
+    # calls after which a function is compiled to Python (see jit.py); None interprets everything
+    JIT_THRESHOLD = 50
+    # whether run parses a function's body only when it is first called (see
+    # parse_program_lazily); a syntax error in a body is then only reported by that call
+    LAZY_PARSING = False
+    # calls of functions whose bodies, with what they inline, are at most this many nodes
+    # run the bodies in place (see inline.py); None inlines nothing
+    INLINE_MAX_NODES = 40
+    # map builtins and their arities; a function the program defines with the same name
+    # and arity is called instead
+    MAP_BUILTINS = MappingProxyType({"get": 2, "put": 3, "contains": 2, "delete": 2, "keys": 1})
 
 
     # methods
     def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+        super().__init__(console_output, inp, trace_output)
         self.trace_output = trace_output
+        self.op_to_lambda = Interpreter.OP_TO_LAMBDA
+        # Python functions programs may call (see host.py); kept across resets, and may
+        # be shared with other instances
+        self.host_functions = host.HostFunctions()
+
+    # let programs call func as name, with the given parameter and return types
+    def register_function(self, name, param_types, return_type, func):
+        self.host_functions.register(name, param_types, return_type, func)
+
+    def reset(self):
+        super().reset()
+        self.jit_threshold = Interpreter.JIT_THRESHOLD
+        self.inline_max_nodes = Interpreter.INLINE_MAX_NODES
+        self.__clear_program()
+        self.pending_statements = []  # what is left of main after a checkpoint
+        self.coverage = None  # a bytearray of flags indexed by node_id, to collect coverage
+
+    # the struct and function tables, scopes and compiled functions of the last program;
+    # each run starts without them, so running a second program (or the same one again)
+    # doesn't find its structs already defined
+    def __clear_program(self):
         self.default_user_types = {}
         self.valid_user_types_names= []
         self.user_types_fields= {}
-        self.__setup_ops()
-        
+        self.func_name_to_ast = {}
+        self.env = EnvironmentManager()
+        self.jit = None  # a jit.Compiler, made by the first call that could use one
+        self.inliner = None  # an inline.Inliner, made by the first call that could use one
         #print("DEBUG: Initialized default_user_types")
 
     # run a program that's provided in a string
     # usese the provided Parser found in brewparse.py to parse the program
     # into an abstract syntax tree (ast)
     def run(self, program):
-        ast = parse_program(program)
-        
+        super().reset_limits()
+        self.current_line = None
+        ast = parse_program_lazily(program) if Interpreter.LAZY_PARSING else parse_program(program)
+        if ast.get("imports"):
+            ast = modules.Linker(self).link(ast)
+        self.load(ast)
+        self.__run_main()
+
+    # run the program whose main module is the file at path, importing modules as
+    # modules.py describes, with their parsed forms cached in cache_dir if it is given
+    def run_file(self, path, cache_dir=None):
+        super().reset_limits()
+        self.current_line = None
+        self.load(modules.Linker(self, cache_dir).link_file(path))
+        self.__run_main()
+
+    # run a program compiled ahead of time with artifact.compile, reading the nodes of
+    # each function as it is first called
+    def run_artifact(self, path):
+        super().reset_limits()
+        self.current_line = None
+        artifact.load(self, path)
+        self.__run_main()
+
+    def __run_main(self):
+        try:
+            self.__call_func_aux("main", [])
+        except RecursionError:
+            super().error(ErrorType.BUDGET_ERROR, "Call depth budget exhausted")
+
+    # replace the last program's tables with those of a parsed program
+    def load(self, ast):
+        self.__clear_program()
         # Set up user-defined types (structs) from AST
         self.__set_up_user_defined_types(ast)
         self.__set_up_function_table(ast)
+
+    # The methods from here to __setup_ops that aren't private are also what other ways
+    # of running a program (jit.py, green.py) build on, so that they share its semantics
+    def evaluate(self, expr_ast):
+        return self.__eval_expr(expr_ast)
+
+    def execute(self, statement, default_return):
+        return self.__run_statement(statement, default_return)
+
+    def lookup_function(self, name, num_params):
+        return self.__get_func_by_name(name, num_params)
+
+    # The session methods let a caller (e.g. the repl) keep one interpreter warm.
+    # The global scope is a single function frame that outlives every input, and
+    # new definitions are merged into the existing struct and function tables
+    def start_session(self):
+        self.func_name_to_ast = {}
         self.env = EnvironmentManager()
-        self.__call_func_aux("main", [])
-    
+        self.env.push_func()
+        self.jit = None
+        self.inliner = None
+
+    # compiled code assumes the signatures of the functions it calls, and inlined calls
+    # the bodies, so a new definition starts the JIT and the inliner over
+    def define(self, ast):
+        self.__set_up_user_defined_types(ast)
+        for func_def in ast.get("functions"):
+            self.__add_function(func_def)
+        self.jit = None
+        self.inliner = None
+
+    # run statements directly in the global scope so that their variables persist
+    def exec_statements(self, statements):
+        try:
+            for statement in statements:
+                status, return_val = self.__run_statement(statement, Interpreter.NIL_VALUE)
+                if status == ExecStatus.RETURN:
+                    return return_val
+            return None
+        except Exception:
+            self.__recover_session()
+            raise
+
+    def eval_expression(self, expr_ast):
+        try:
+            self.current_line = expr_ast.line_num
+            # a bare call may be void at the top level, so skip __eval_expr's void check
+            if expr_ast.elem_type == InterpreterBase.FCALL_NODE:
+                return self.__call_func(expr_ast)
+            return self.__eval_expr(expr_ast)
+        except Exception:
+            self.__recover_session()
+            raise
+
+    # Checkpoints: run_to_checkpoint() runs main's top-level statements up to the first
+    # `checkpoint();` and saves the state there (see snapshot.py); load_snapshot() on a
+    # new interpreter followed by resume() carries on from the statement after it.
+    # Sessions can be saved and loaded the same way between inputs
+    def run_to_checkpoint(self, program, file):
+        super().reset_limits()
+        ast = parse_program(program)
+        self.__clear_program()
+        # main's variables live in the global frame, as they do in a session
+        self.start_session()
+        self.__set_up_user_defined_types(ast)
+        self.__set_up_function_table(ast)
+        statements = self.__get_func_by_name("main", 0).get("statements")
+        for index, statement in enumerate(statements):
+            if self.__is_checkpoint(statement):
+                self.pending_statements = statements[index + 1:]
+                self.save_snapshot(file)
+                return True
+            if self.__run_main_statement(statement) == ExecStatus.RETURN:
+                return False
+        return False
+
+    def resume(self):
+        super().reset_limits()
+        statements, self.pending_statements = self.pending_statements, []
+        for statement in statements:
+            if self.__run_main_statement(statement) == ExecStatus.RETURN:
+                return
+
+    def save_snapshot(self, file):
+        snapshot.save(self, file)
+
+    def load_snapshot(self, file):
+        snapshot.load(self, file)
+        self.jit = None
+        self.inliner = None
+
+    def __is_checkpoint(self, statement):
+        return (
+            statement.elem_type == InterpreterBase.FCALL_NODE
+            and statement.get("name") == "checkpoint"
+            and not statement.get("args")
+        )
+
+    def __run_main_statement(self, statement):
+        try:
+            status, _ = self.__run_statement(statement, Value(Type.VOID))
+        except RecursionError:
+            super().error(ErrorType.BUDGET_ERROR, "Call depth budget exhausted")
+        return status
+
+    # an error can leave function frames and blocks pushed; drop back to the global scope
+    def __recover_session(self):
+        del self.env.environment[1:]
+        del self.env.environment[0][1:]
+
     def __set_up_user_defined_types(self, ast):
         
         # Check if there are any structs defined in the AST
@@ -87,29 +276,108 @@ class Interpreter(InterpreterBase):
         # validate the parameter types and return type for each function before execution
         self.func_name_to_ast = {}
         for func_def in ast.get("functions"):
-            func_name = func_def.get("name")
-            num_params = len(func_def.get("args"))
-            # Store parameter and return types for type checking
-            param_types = [arg.get("var_type") for arg in func_def.get("args")]
-            return_type = func_def.get("return_type")
-            
-            for param_type in param_types:
-                # Check if the parameter type is a valid primitive type or a defined user-defined type
-                if param_type not in [Type.INT, Type.BOOL, Type.STRING] and param_type not in self.default_user_types:
-                    super().error(ErrorType.TYPE_ERROR, f"Invalid type {param_type} in parameters")
-
-            # Check if the return type is a valid primitive type or a defined user-defined type
-            if return_type not in [Type.INT, Type.BOOL, Type.STRING, Type.VOID] and return_type not in self.default_user_types:
-                super().error(ErrorType.TYPE_ERROR, f"Invalid return type {return_type} for function {func_name}")
-            
-            if func_name not in self.func_name_to_ast:
-                self.func_name_to_ast[func_name] = {}
-            self.func_name_to_ast[func_name][num_params] = func_def
-            
+            self.__add_function(func_def)
+
+    def __add_function(self, func_def):
+        func_name = func_def.get("name")
+        num_params = len(func_def.get("args"))
+        # Store parameter and return types for type checking
+        param_types = [arg.get("var_type") for arg in func_def.get("args")]
+        return_type = func_def.get("return_type")
+
+        for param_type in param_types:
+            # Check if the parameter type is a valid primitive type or a defined user-defined type
+            if not known_type(param_type, self.default_user_types):
+                super().error(ErrorType.TYPE_ERROR, f"Invalid type {param_type} in parameters")
+
+        # Check if the return type is a valid primitive type or a defined user-defined type
+        if return_type != Type.VOID and not known_type(return_type, self.default_user_types):
+            super().error(ErrorType.TYPE_ERROR, f"Invalid return type {return_type} for function {func_name}")
+
+        when_parsed(func_def, self.__annotate)
+
+        if func_name not in self.func_name_to_ast:
+            self.func_name_to_ast[func_name] = {}
+        self.func_name_to_ast[func_name][num_params] = func_def
+
+    # every node below statements, statements included
+    def __walk(self, statements):
+        pending = list(statements)
+        while pending:
+            node = pending.pop()
+            yield node
+            for child in node.dict.values():
+                if isinstance(child, list):
+                    pending.extend(c for c in child if hasattr(c, "elem_type"))
+                elif hasattr(child, "elem_type"):
+                    pending.append(child)
+
+    def __annotate(self, func_def):
+        func_def.dict["bare"] = self.__is_bare(func_def.get("statements"))
+        for node in self.__walk(func_def.get("statements")):
+            if node.elem_type == InterpreterBase.FOR_NODE:
+                node.dict["counting"] = self.__find_counting_loop(node)
+                node.dict["bare"] = self.__is_bare(node.get("statements"))
+            elif node.elem_type == InterpreterBase.IF_NODE:
+                node.dict["bare"] = self.__is_bare(node.get("statements"))
+                node.dict["else_bare"] = self.__is_bare(node.get("else_statements"))
+
+    # A bare block declares no variables of its own, so nothing would ever be put in a
+    # scope for it: it can run in the enclosing block's scope, with the same lookups and
+    # the same duplicate-definition checks, and skip creating one
+    def __is_bare(self, statements):
+        if not Interpreter.ELIDE_SCOPES or statements is None:
+            return False
+        return all(statement.elem_type != InterpreterBase.VAR_DEF_NODE for statement in statements)
+
+    # A counting loop is `for (i = a; i < b; i = i + c)` (or <=, >, >=, i - c) where b is a
+    # literal or a variable, c is a literal, and the body assigns neither i nor b.
+    # Returns (i, comparison, b's node, step), or False for any other loop
+    def __find_counting_loop(self, for_ast):
+        init_ast = for_ast.get("init")
+        cond_ast = for_ast.get("condition")
+        update_ast = for_ast.get("update")
+        if init_ast is None or cond_ast is None or update_ast is None:
+            return False
+        var_name = init_ast.get("name")
+        if init_ast.elem_type != "=" or "." in var_name:
+            return False
+
+        if cond_ast.elem_type not in Interpreter.COUNTING_COMPARE:
+            return False
+        counter_ast, bound_ast = cond_ast.get("op1"), cond_ast.get("op2")
+        if counter_ast.elem_type != InterpreterBase.VAR_NODE or counter_ast.get("name") != var_name:
+            return False
+        if bound_ast.elem_type == InterpreterBase.VAR_NODE:
+            if "." in bound_ast.get("name") or bound_ast.get("name") == var_name:
+                return False
+        elif bound_ast.elem_type != InterpreterBase.INT_NODE:
+            return False
+
+        step_ast = update_ast.get("expression")
+        if update_ast.elem_type != "=" or update_ast.get("name") != var_name or step_ast.elem_type not in ("+", "-"):
+            return False
+        counter_ast, amount_ast = step_ast.get("op1"), step_ast.get("op2")
+        if counter_ast.elem_type != InterpreterBase.VAR_NODE or counter_ast.get("name") != var_name:
+            return False
+        if amount_ast.elem_type != InterpreterBase.INT_NODE:
+            return False
+        step = amount_ast.get("val") if step_ast.elem_type == "+" else -amount_ast.get("val")
+
+        for node in self.__walk(for_ast.get("statements")):
+            if node.elem_type == "=" and node.get("name") in (var_name, bound_ast.get("name")):
+                return False
+        return (var_name, cond_ast.elem_type, bound_ast, step)
+
+    # the program's function name with num_params parameters, or else the host function
     def __get_func_by_name(self, name, num_params):
-        if name not in self.func_name_to_ast:
+        candidate_funcs = self.func_name_to_ast.get(name)
+        if candidate_funcs is None or num_params not in candidate_funcs:
+            host_function = self.host_functions.lookup(name, num_params)
+            if host_function is not None:
+                return host_function
+        if candidate_funcs is None:
             super().error(ErrorType.NAME_ERROR, f"Function {name} not found")
-        candidate_funcs = self.func_name_to_ast[name]
         if num_params not in candidate_funcs:
             super().error(
                 ErrorType.NAME_ERROR,
@@ -117,34 +385,48 @@ class Interpreter(InterpreterBase):
             )
         return candidate_funcs[num_params]
 
-    def __run_statements(self, statements, default_return =None):
-        self.env.push_block()
+    # bare is set for blocks marked bare by __annotate (see __is_bare)
+    def __run_statements(self, statements, default_return =None, bare=False):
+        if not bare:
+            self.env.push_block()
         for statement in statements:
             # if self.trace_output:
             #     print(statement, default_return)
             status, return_val = self.__run_statement(statement, default_return)
             if status == ExecStatus.RETURN:
-                self.env.pop_block()
+                if not bare:
+                    self.env.pop_block()
                 return (status, return_val)
 
-        self.env.pop_block()
+        if not bare:
+            self.env.pop_block()
         return (ExecStatus.CONTINUE, default_return)
 
     def __run_statement(self, statement, default_return):
+        self.steps_left -= 1
+        if self.steps_left < 0:
+            super().check_limits()
+        self.current_line = statement.line_num
+        if self.coverage is not None:
+            self.coverage[statement.node_id] |= InterpreterBase.COVERED
         status = ExecStatus.CONTINUE
         return_val = None
         if statement.elem_type == InterpreterBase.FCALL_NODE:
             self.__call_func(statement)
+        elif statement.elem_type == InterpreterBase.INLINE_NODE:
+            self.__inline(statement)
         elif statement.elem_type == "=":
             self.__assign(statement)
+        elif statement.elem_type == InterpreterBase.INDEX_ASSIGN_NODE:
+            self.__assign_element(statement)
         elif statement.elem_type == InterpreterBase.VAR_DEF_NODE:
             self.__var_def(statement)
         elif statement.elem_type == InterpreterBase.RETURN_NODE:
             status, return_val = self.__do_return(statement, default_return)
         elif statement.elem_type == Interpreter.IF_NODE:
-            status, return_val = self.__do_if(statement)
+            status, return_val = self.__do_if(statement, default_return)
         elif statement.elem_type == Interpreter.FOR_NODE:
-            status, return_val = self.__do_for(statement)
+            status, return_val = self.__do_for(statement, default_return)
 
         return (status, return_val)
     
@@ -159,16 +441,29 @@ class Interpreter(InterpreterBase):
         #actual  arg tpes must match the expected formal arg type
         #  return type of the function must align with the specified return type
         # handle coercion when passing parameters
-        
+        self.steps_left -= 1
+        if self.steps_left < 0 or self.check_clock:
+            super().check_limits()
+
         if func_name == "print":
            self.__call_print(actual_args)
            return Value(Type.VOID)
         if func_name == "inputi" or func_name == "inputs":
             return self.__call_input(func_name, actual_args)
+        if func_name == "checkpoint" and not actual_args:
+            return Value(Type.VOID)  # only meaningful to run_to_checkpoint()
+        if func_name == "len" and len(actual_args) == 1:
+            return self.length(self.__eval_expr(actual_args[0]))
+        if self.is_map_builtin(func_name, len(actual_args)):
+            return self.map_builtin(func_name, [self.__eval_expr(arg) for arg in actual_args])
 
         func_ast = self.__get_func_by_name(func_name, len(actual_args))
+        if type(func_ast) is host.HostFunction:
+            return self.call_host(func_ast, [self.__eval_expr(arg) for arg in actual_args])
         formal_args = func_ast.get("args")
         return_type = func_ast.get("return_type")
+        if self.coverage is not None:
+            self.coverage[func_ast.node_id] |= InterpreterBase.COVERED
         
         #print(f"Invoking function '{func_name}' with return type '{return_type}'")  # Debug
         
@@ -181,41 +476,133 @@ class Interpreter(InterpreterBase):
         # first evaluate all of the actual parameters and associate them with the formal parameter names
         args = {}
         for formal_ast, actual_ast in zip(formal_args, actual_args):
-            result = copy.copy(self.__eval_expr(actual_ast))
-            arg_name = formal_ast.get("name")
-            arg_type = formal_ast.get("var_type")
-            # Coerce if passing an int to a bool parameter
-            
-            if arg_type == Type.BOOL and result.type() == Type.INT:
-                #print("in call func aux before param coerce to bool")
-                result = self.__coerce_to_bool(result)
-            
-            # # Validate argument type
-            # if result.type() != arg_type:
-            #     if result.type() not in self.default_user_types or result.type() != arg_type:
-            #         super().error(
-            #             ErrorType.TYPE_ERROR,
-            #             f"Type mismatch for argument {arg_name} in function {func_name}",
-            #         )
-            if result.type() != arg_type:
-                # Allow `nil` for user-defined struct types
-                if result.type() == Type.NIL and arg_type in self.default_user_types:
-                    # Preserve the type signature for the `nil` value
-                    result = Value(arg_type, None)
-                else:
-                    super().error(
-                        ErrorType.TYPE_ERROR,
-                        f"Type mismatch for argument {arg_name} in function {func_name}: "
-                        f"expected {arg_type}, got {result.type()}",
-                    )
-
-            args[arg_name] = result
+            args[formal_ast.get("name")] = self.check_arg(func_name, formal_ast, copy.copy(self.__eval_expr(actual_ast)))
+        if __debug__ and self.trace_calls:
+            self.tracer.emit("calls", self.current_line, brewtrace.describe_call(func_name, args))
+        return self.invoke(func_ast, args)
+
+    # the value a parameter gets from the argument result
+    def check_arg(self, func_name, formal_ast, result):
+        arg_name = formal_ast.get("name")
+        arg_type = formal_ast.get("var_type")
+        # Coerce if passing an int to a bool parameter
+        
+        if arg_type == Type.BOOL and result.type() == Type.INT:
+            #print("in call func aux before param coerce to bool")
+            result = self.__coerce_to_bool(result)
+        
+        # # Validate argument type
+        # if result.type() != arg_type:
+        #     if result.type() not in self.default_user_types or result.type() != arg_type:
+        #         super().error(
+        #             ErrorType.TYPE_ERROR,
+        #             f"Type mismatch for argument {arg_name} in function {func_name}",
+        #         )
+        if result.type() != arg_type:
+            # Allow `nil` for user-defined struct types
+            if result.type() == Type.NIL and self.__is_reference(arg_type):
+                # Preserve the type signature for the `nil` value
+                result = Value(arg_type, None)
+            else:
+                super().error(
+                    ErrorType.TYPE_ERROR,
+                    f"Type mismatch for argument {arg_name} in function {func_name}: "
+                    f"expected {arg_type}, got {result.type()}",
+                )
+        return result
+
+    # call a host function on the values of its arguments
+    def call_host(self, host_function, values):
+        name = host_function.name
+        for param_type in host_function.param_types:
+            # a registration mistake, not the program's, so not a Brewin error
+            if not known_type(param_type, self.default_user_types):
+                raise ValueError(f"Host function {name} takes {param_type}, a type this program doesn't define")
+        args = {}
+        for formal_ast, value in zip(host_function.formals, values):
+            args[formal_ast.get("name")] = self.check_arg(name, formal_ast, value)
+        if __debug__ and self.trace_calls:
+            self.tracer.emit("calls", self.current_line, brewtrace.describe_call(name, args))
+        try:
+            result = host_function.func(*[host.unbox(value) for value in args.values()])
+        except Exception as e:
+            super().error(ErrorType.FAULT_ERROR, f"Host function {name} failed: {e!r}")
+        return_type = host_function.return_type
+        value_obj, wrong = host.box(host_function, result)
+        # structs are passed back as they are, so this is where they are checked
+        if wrong is None and (not isinstance(value_obj, Value) or value_obj.type() != return_type):
+            wrong = value_obj.type() if isinstance(value_obj, Value) else type(value_obj).__name__
+        if wrong is not None:
+            super().error(ErrorType.TYPE_ERROR, f"Host function {name} returned {wrong}, not {return_type}")
+        return value_obj
+
+    # Run a user-defined function on arguments already checked against its signature.
+    # Once a function has been called jit_threshold times it runs as compiled Python,
+    # unless coverage or tracing need to see every statement. With the JIT off, it runs
+    # with the calls of small functions in it inlined instead, under the same conditions
+    def invoke(self, func_ast, args):
+        statements = func_ast.get("statements")
+        if self.coverage is None and self.tracer is None:
+            if self.jit_threshold is not None:
+                if self.jit is None:
+                    self.jit = jit.Compiler(self)
+                compiled = self.jit.entry(func_ast, self.jit_threshold)
+                if compiled is not None:
+                    return compiled(*args.values())
+            elif self.inline_max_nodes is not None:
+                if self.inliner is None:
+                    self.inliner = inline.Inliner(self, self.inline_max_nodes)
+                statements = self.inliner.statements(func_ast)
+        return_type = func_ast.get("return_type")
 
         # then create the new activation record 
         self.env.push_func()
         # and add the formal arguments to the activation record
         for arg_name, value in args.items():
             self.env.create(arg_name, value)
+        default_return = self.default_return(return_type)
+
+        # Execute function body
+        call_line = self.current_line
+        _, return_val = self.__run_statements(statements, default_return, func_ast.get("bare"))
+        self.env.pop_func()
+        self.current_line = call_line
+        return self.check_return(return_type, return_val, default_return)
+
+    # Run an inline node (see inline.py) as the call it replaced: the same steps, checks
+    # and coercions, with the callee's renamed body run in a block of this frame. Values
+    # are never changed once made (assigning one replaces it), so the arguments are
+    # passed without the copy a call makes. An error in the body names the callee's
+    # variables without their suffix
+    def __inline(self, inline_ast):
+        self.steps_left -= 1
+        if self.steps_left < 0 or self.check_clock:
+            super().check_limits()
+        func_name = inline_ast.get("name")
+        args = {}
+        for formal_ast, param, actual_ast in zip(inline_ast.get("formals"), inline_ast.get("params"),
+                                                 inline_ast.get("args")):
+            args[param] = self.check_arg(func_name, formal_ast, self.__eval_expr(actual_ast))
+        return_type = inline_ast.get("return_type")
+
+        self.env.push_block()
+        for param, value in args.items():
+            self.env.create(param, value)
+        default_return = self.default_return(return_type)
+
+        call_line = self.current_line
+        try:
+            _, return_val = self.__run_statements(inline_ast.get("statements"), default_return, inline_ast.get("bare"))
+        except Exception as e:
+            if type(e) is not Exception:  # e.g. a RecursionError, reported by whatever catches it
+                raise
+            raise Exception(str(e).replace(inline_ast.get("suffix"), "")) from None
+        self.env.pop_block()
+        self.current_line = call_line
+        return self.check_return(return_type, return_val, default_return)
+
+    # what a function returning return_type returns if it doesn't say
+    def default_return(self, return_type):
         # Set up a default return value
         #default_return = None #fix this now
         if return_type == Type.VOID:
@@ -226,16 +613,16 @@ class Interpreter(InterpreterBase):
             default_return = Value(Type.STRING, "")  # Default value for string
         elif return_type == Type.BOOL:
             default_return = Value(Type.BOOL, False)  # Default value for bool
-        elif return_type in self.default_user_types:
-        # Struct types return nil by default
+        elif self.__is_reference(return_type):
+        # Struct and array types return nil by default
             default_return = Value(Type.NIL, return_type)
         else:
             # Raise an error for unsupported return types
             super().error(ErrorType.TYPE_ERROR, f"Unsupported return type: {return_type}")
+        return default_return
 
-        # Execute function body
-        _, return_val = self.__run_statements(func_ast.get("statements"), default_return)
-        self.env.pop_func()
+    # what a call returns, given what its body returned (None if nothing)
+    def check_return(self, return_type, return_val, default_return):
         #print(f"Function '{func_name}' is a void function with return type '{return_type}'")
         #print(f"Return value: {return_val} (type: {return_val.type() if return_val is not None else 'None'})")
             
@@ -250,8 +637,8 @@ class Interpreter(InterpreterBase):
         
         if return_val.type() != return_type:
             # Allow nil as a valid return value for user-defined structs
-            if return_val.type() == Type.NIL and return_type in self.default_user_types:
-                return return_val  # No error, nil is valid for struct types
+            if return_val.type() == Type.NIL and self.__is_reference(return_type):
+                return return_val  # No error, nil is valid for struct and array types
             else:
                 super().error(
                     ErrorType.TYPE_ERROR,
@@ -302,49 +689,60 @@ class Interpreter(InterpreterBase):
         output = []
         
         for arg in args:
-            result = self.__eval_expr(arg)
-            
-            # Handle void values: cannot be printed
-            if result.type() == Type.VOID:
-                super().error(ErrorType.TYPE_ERROR, "Cannot print void value.")
-            if result.type() == Type.STRING and result.value() is None:
-                output.append("")
-
-            # Handle user-defined structures or nil values
-            if result.type() in self.default_user_types and result.value() is None:  # Uninitialized
-                output.append("nil")
-            elif result.type() == Type.NIL:
-                output.append("nil")
-            elif result.type() in self.default_user_types:
-                #error if attempting to print the entire structure
-                super().error(
-                    ErrorType.TYPE_ERROR,
-                    f"Cannot print entire user-defined structure of type {result.type()}. Access specific fields instead."
-                )
-            else:
-                # printable representation for primitive types
-                printable_result = get_printable(result)
-                if printable_result is None:
-                    super().error(ErrorType.TYPE_ERROR, "Cannot print non-printable value.")
-                else:
-                    output.append(str(printable_result))  # Ensure conversion to string
+            self.append_printable(output, self.__eval_expr(arg))
         # Join all outputs with a space and send to the output stream
         try:
             super().output("".join(output))
         except TypeError as e:
             super().error(ErrorType.TYPE_ERROR, f"Error in printing: {e}")
 
+    # add what print() shows for a value to output
+    def append_printable(self, output, result):
+        # Handle void values: cannot be printed
+        if result.type() == Type.VOID:
+            super().error(ErrorType.TYPE_ERROR, "Cannot print void value.")
+        if result.type() == Type.STRING and result.value() is None:
+            output.append("")
+
+        # Handle user-defined structures or nil values
+        if self.__is_reference(result.type()) and result.value() is None:  # Uninitialized
+            output.append("nil")
+        elif result.type() == Type.NIL:
+            output.append("nil")
+        elif result.type() in self.default_user_types:
+            #error if attempting to print the entire structure
+            super().error(
+                ErrorType.TYPE_ERROR,
+                f"Cannot print entire user-defined structure of type {result.type()}. Access specific fields instead."
+            )
+        elif element_type(result.type()) is not None:
+            super().error(ErrorType.TYPE_ERROR, f"Cannot print an array of type {result.type()}. Index it instead.")
+        elif map_types(result.type()) is not None:
+            super().error(ErrorType.TYPE_ERROR, f"Cannot print a map of type {result.type()}. Use get() instead.")
+        else:
+            # printable representation for primitive types
+            printable_result = get_printable(result)
+            if printable_result is None:
+                super().error(ErrorType.TYPE_ERROR, "Cannot print non-printable value.")
+            else:
+                output.append(str(printable_result))  # Ensure conversion to string
+
 
 
     def __call_input(self, name, args):
+        prompt = None
         if args is not None and len(args) == 1:
-            result = self.__eval_expr(args[0])
-            super().output(get_printable(result))
+            prompt = self.__eval_expr(args[0])
         elif args is not None and len(args) > 1:
             super().error(
                 ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter"
             )
-        inp = super().get_input()
+        return self.read_input(name, prompt)
+
+    def read_input(self, name, prompt=None):
+        if prompt is not None:
+            super().output(get_printable(prompt))
+        inp = self.get_input()
         if name == "inputi":
             return Value(Type.INT, int(inp))
         if name == "inputs":
@@ -352,79 +750,14 @@ class Interpreter(InterpreterBase):
 
     # Modify __assign to handle int to bool coercion by checking the current type via EnvironmentManager
     def __assign(self, assign_ast):
-        var_name = assign_ast.get("name")
-        value_obj = self.__eval_expr(assign_ast.get("expression"))
+        self.assign(assign_ast.get("name"), self.__eval_expr(assign_ast.get("expression")))
 
-        if "." in var_name:
-            fields = var_name.split(".")
-            obj = self.env.get(fields[0])  # Get the base object
-
-            # Handle base object nil or missing errors
-            if obj is None:
-                super().error(ErrorType.NAME_ERROR, f"Variable '{fields[0]}' not found")
-            if obj.type() not in self.user_types_fields:
-                super().error(
-                    ErrorType.TYPE_ERROR,
-                    f"Cannot access fields of a non-struct type '{obj.type()}'"
-                )
-            if obj.type() == Type.NIL:
-                super().error(ErrorType.FAULT_ERROR, f"Variable '{fields[0]}' is nil")
-
-            # Extract the UserObject from the Value
-            obj = obj.value() #THIS OBJECT SH
-
-            fields.pop(0)  # Remove the base object from the field chain
-            while len(fields) > 0:
-                field = fields.pop(0)
-                # Validate object before accessing its fields
-                if obj is None :
-                #if obj is None    or obj.name is None
-                    super().error(ErrorType.FAULT_ERROR, f"Field chain leads to nil or uninitialized object")
-
-                if field not in self.user_types_fields[obj.name]: #this is causing error
-                    super().error(ErrorType.NAME_ERROR, f"Field '{field}' not found in struct '{obj.name}'")
-                
-                field_type = self.user_types_fields[obj.name][field]
-
-                if len(fields) == 0:  # If this is the last field
-                    if field_type in self.PRIM_TYPES:
-                        # Handle type coercion for primitive types
-                        if field_type == Type.BOOL and value_obj.type() == Type.INT:
-                            value_obj = self.__coerce_to_bool(value_obj)
-                        if field_type != value_obj.type():
-                            super().error(
-                                ErrorType.TYPE_ERROR,
-                                f"Type mismatch: cannot assign {value_obj.type()} to {field_type} in field '{field}'"
-                            )
-                    elif field_type in self.user_types_fields:  # Handle nested user-defined struct types
-                        if value_obj.type() != field_type and value_obj.type() != Type.NIL:
-                            super().error(
-                                ErrorType.TYPE_ERROR,
-                                f"Type mismatch: cannot assign {value_obj.type()} to {field_type} in field '{field}'"
-                            )
-                        if value_obj.type() == Type.NIL:
-                            obj.set_val(field, Value(Type.NIL, None), self.valid_user_types_names)
-                            return
-
-                    else:
-                        super().error(
-                            ErrorType.TYPE_ERROR,
-                            f"Unknown field type '{field_type}' in struct '{obj.name}'"
-                        )
-
-                    # Assign the value to the field using set_val
-                    if not obj.set_val(field, value_obj, self.valid_user_types_names):
-                        super().error(ErrorType.NAME_ERROR, f"Failed to assign value to field '{field}'")
-                    return
-
-                #Move to the next nested object
-                obj = obj.get_val(field)
-                if obj is None or obj.type() == Type.NIL:
-                    super().error(ErrorType.FAULT_ERROR, f"Field '{field}' is nil or uninitialized")
-
-                #Extract the UserObject from the nested Value
-                obj = obj.value()
+    def assign(self, var_name, value_obj):
+        if __debug__ and self.trace_env:
+            self.tracer.emit("env", self.current_line, f"{var_name} = {brewtrace.describe(value_obj)}")
 
+        if "." in var_name:
+            self.set_field(var_name, self.env.get(var_name.split(".")[0]), value_obj)
         else:
             # iff no dot operator, handle simple variable assignment
             current_value_obj = self.env.get(var_name)
@@ -444,7 +777,86 @@ class Interpreter(InterpreterBase):
                         ErrorType.TYPE_ERROR,
                         f"Type mismatch: cannot assign {value_obj.type()} to {current_value_obj.type()} in '{var_name}'",
                     )
+            # array and map variables keep their type, nil included
+            elif self.__is_container(current_value_obj.type()):
+                if value_obj.type() == Type.NIL:
+                    value_obj = Value(current_value_obj.type(), None)
+                elif current_value_obj.type() != value_obj.type():
+                    super().error(
+                        ErrorType.TYPE_ERROR,
+                        f"Type mismatch: cannot assign {value_obj.type()} to {current_value_obj.type()} in '{var_name}'",
+                    )
             self.env.set(var_name, value_obj)
+
+    # assign value_obj to the field var_name (e.g. "a.b.c") of the struct obj names
+    def set_field(self, var_name, obj, value_obj):
+        fields = var_name.split(".")
+
+        # Handle base object nil or missing errors
+        if obj is None:
+            super().error(ErrorType.NAME_ERROR, f"Variable '{fields[0]}' not found")
+        if obj.type() not in self.user_types_fields:
+            super().error(
+                ErrorType.TYPE_ERROR,
+                f"Cannot access fields of a non-struct type '{obj.type()}'"
+            )
+        if obj.type() == Type.NIL:
+            super().error(ErrorType.FAULT_ERROR, f"Variable '{fields[0]}' is nil")
+
+        # Extract the UserObject from the Value
+        obj = obj.value() #THIS OBJECT SH
+
+        fields.pop(0)  # Remove the base object from the field chain
+        while len(fields) > 0:
+            field = fields.pop(0)
+            # Validate object before accessing its fields
+            if obj is None :
+            #if obj is None    or obj.name is None
+                super().error(ErrorType.FAULT_ERROR, f"Field chain leads to nil or uninitialized object")
+
+            if field not in self.user_types_fields[obj.name]: #this is causing error
+                super().error(ErrorType.NAME_ERROR, f"Field '{field}' not found in struct '{obj.name}'")
+            
+            field_type = self.user_types_fields[obj.name][field]
+
+            if len(fields) == 0:  # If this is the last field
+                if field_type in self.PRIM_TYPES:
+                    # Handle type coercion for primitive types
+                    if field_type == Type.BOOL and value_obj.type() == Type.INT:
+                        value_obj = self.__coerce_to_bool(value_obj)
+                    if field_type != value_obj.type():
+                        super().error(
+                            ErrorType.TYPE_ERROR,
+                            f"Type mismatch: cannot assign {value_obj.type()} to {field_type} in field '{field}'"
+                        )
+                elif self.__is_reference(field_type):  # Handle nested user-defined struct, array and map types
+                    if value_obj.type() != field_type and value_obj.type() != Type.NIL:
+                        super().error(
+                            ErrorType.TYPE_ERROR,
+                            f"Type mismatch: cannot assign {value_obj.type()} to {field_type} in field '{field}'"
+                        )
+                    if value_obj.type() == Type.NIL:
+                        obj.set_val(field, Value(Type.NIL, None), self.valid_user_types_names)
+                        return
+
+                else:
+                    super().error(
+                        ErrorType.TYPE_ERROR,
+                        f"Unknown field type '{field_type}' in struct '{obj.name}'"
+                    )
+
+                # Assign the value to the field using set_val
+                if not obj.set_val(field, value_obj, self.valid_user_types_names):
+                    super().error(ErrorType.NAME_ERROR, f"Failed to assign value to field '{field}'")
+                return
+
+            #Move to the next nested object
+            obj = obj.get_val(field)
+            if obj is None or obj.type() == Type.NIL:
+                super().error(ErrorType.FAULT_ERROR, f"Field '{field}' is nil or uninitialized")
+
+            #Extract the UserObject from the nested Value
+            obj = obj.value()
     
     
     def __var_def(self, var_ast):
@@ -453,7 +865,7 @@ class Interpreter(InterpreterBase):
         var_type = var_ast.get("var_type")
 
         # Check if the variable type is valid
-        if var_type not in [Type.INT, Type.BOOL, Type.STRING] and var_type not in self.default_user_types:
+        if not known_type(var_type, self.default_user_types):
             super().error(ErrorType.TYPE_ERROR, f"Invalid type {var_type} for variable {var_name}")
         
         # Set default value based on type
@@ -466,6 +878,9 @@ class Interpreter(InterpreterBase):
             )
 
     def __eval_expr(self, expr_ast):
+        self.steps_left -= 1
+        if self.steps_left < 0:
+            super().check_limits()
         if expr_ast.elem_type == InterpreterBase.NIL_NODE:
             return Interpreter.NIL_VALUE
         if expr_ast.elem_type == InterpreterBase.INT_NODE:
@@ -479,48 +894,7 @@ class Interpreter(InterpreterBase):
             var_name = expr_ast.get("name")
             # Handle dotted variable names 
             if "." in var_name:
-                fields = var_name.split(".")
-                obj = self.env.get(fields[0])  #Get the base object
-                #print(obj)
-
-                # Handle base object nil or missing errors
-                if obj is None: # TO DO
-                    super().error(ErrorType.NAME_ERROR, f"Variable '{fields[0]}' not found")
-                if obj.type() == Type.NIL or obj.value() is None : #FIX THIS URGENT
-                    super().error(ErrorType.FAULT_ERROR, f"Variable '{fields[0]}' is nil")
-
-                # Check if the base object is a primitive type
-                if obj.type() in self.PRIM_TYPES:
-                    super().error(
-                        ErrorType.TYPE_ERROR,
-                        f"Cannot access fields on a primitive type '{obj.type()}'"
-                    )
-                # Extract the UserObject from the Value
-                obj = obj.value()
-
-                fields.pop(0)  # Remove the base object from the field chain
-                while len(fields) > 0:
-                    field = fields.pop(0)
-                    
-                    
-                    if field not in self.user_types_fields[obj.name]:
-                        super().error(ErrorType.NAME_ERROR, f"Field '{field}' not found in struct '{obj.name}'")
-
-                    #Get the value of the current field
-                    obj = obj.get_val(field)
-                    if obj is None:
-                        super().error(ErrorType.NAME_ERROR, f"Field '{field}' not found")
-                    if obj.type() == Type.NIL and len(fields) > 0:
-                        super().error(ErrorType.FAULT_ERROR, f"Field '{field}' is nil or uninitialized")
-
-                    # If there are more fields, ensure the value is a UserObject
-                    if len(fields) > 0:
-                        if not isinstance(obj.value(), UserObject):
-                            super().error(ErrorType.NAME_ERROR, f"Field '{field}' is not a struct type")
-                        obj = obj.value()  # Move to the next UserObject
-
-                #Return the resolved field value
-                return obj
+                return self.get_field(var_name, self.env.get(var_name.split(".")[0]))
 
             # Handle simple variable access
             val = self.env.get(var_name)
@@ -535,50 +909,221 @@ class Interpreter(InterpreterBase):
             if result.type() == Type.VOID:
                 super().error(ErrorType.TYPE_ERROR, "Cannot use function with void return type in an expression")
             return result
+        if expr_ast.elem_type == InterpreterBase.INLINE_NODE:
+            result = self.__inline(expr_ast)
+            if result.type() == Type.VOID:
+                super().error(ErrorType.TYPE_ERROR, "Cannot use function with void return type in an expression")
+            return result
         if expr_ast.elem_type in Interpreter.BIN_OPS:
             return self.__eval_op(expr_ast)
-        if expr_ast.elem_type == Interpreter.NEG_NODE:
-            return self.__eval_unary(expr_ast, Type.INT, lambda x: -1 * x)
-        if expr_ast.elem_type == Interpreter.NOT_NODE:
-            return self.__eval_unary(expr_ast, Type.BOOL, lambda x: not x)
+        if expr_ast.elem_type == InterpreterBase.INDEX_NODE:
+            array_obj = self.__eval_expr(expr_ast.get("array"))
+            return self.get_element(array_obj, self.__eval_expr(expr_ast.get("subscript")))
+        if expr_ast.elem_type in (Interpreter.NEG_NODE, Interpreter.NOT_NODE):
+            return self.unary_op(expr_ast.elem_type, self.__eval_expr(expr_ast.get("op1")))
         
         if expr_ast.elem_type == "new":  # New struct instance
-            struct_name = expr_ast.dict.get("var_type")  # Access the structure type from the 'var_type' key
-            if struct_name not in self.user_types_fields:
-                super().error(ErrorType.TYPE_ERROR, f"Undefined struct type {struct_name}")
+            return self.new_object(expr_ast.dict.get("var_type"))  # Access the structure type from the 'var_type' key
+        if expr_ast.elem_type == InterpreterBase.NEW_ARRAY_NODE:
+            return self.new_array(expr_ast.get("var_type"), self.__eval_expr(expr_ast.get("size")))
+        if expr_ast.elem_type == InterpreterBase.NEW_MAP_NODE:
+            return self.new_map(expr_ast.get("var_type"))
+
+    # the value of the field var_name (e.g. "a.b.c") of the struct obj names
+    def get_field(self, var_name, obj):
+        fields = var_name.split(".")
+
+        # Handle base object nil or missing errors
+        if obj is None: # TO DO
+            super().error(ErrorType.NAME_ERROR, f"Variable '{fields[0]}' not found")
+        if obj.type() == Type.NIL or obj.value() is None : #FIX THIS URGENT
+            super().error(ErrorType.FAULT_ERROR, f"Variable '{fields[0]}' is nil")
+
+        # Check if the base object is a primitive type
+        if obj.type() in self.PRIM_TYPES:
+            super().error(
+                ErrorType.TYPE_ERROR,
+                f"Cannot access fields on a primitive type '{obj.type()}'"
+            )
+        # Extract the UserObject from the Value
+        obj = obj.value()
+
+        fields.pop(0)  # Remove the base object from the field chain
+        while len(fields) > 0:
+            field = fields.pop(0)
+                    
+                    
+            if field not in self.user_types_fields[obj.name]:
+                super().error(ErrorType.NAME_ERROR, f"Field '{field}' not found in struct '{obj.name}'")
+
+            #Get the value of the current field
+            obj = obj.get_val(field)
+            if obj is None:
+                super().error(ErrorType.NAME_ERROR, f"Field '{field}' not found")
+            if obj.type() == Type.NIL and len(fields) > 0:
+                super().error(ErrorType.FAULT_ERROR, f"Field '{field}' is nil or uninitialized")
+
+            # If there are more fields, ensure the value is a UserObject
+            if len(fields) > 0:
+                if not isinstance(obj.value(), UserObject):
+                    super().error(ErrorType.NAME_ERROR, f"Field '{field}' is not a struct type")
+                obj = obj.value()  # Move to the next UserObject
+
+        #Return the resolved field value
+        return obj
+
+    # a new instance of the struct type struct_name, its struct fields nil
+    def new_object(self, struct_name):
+        if struct_name not in self.user_types_fields:
+            super().error(ErrorType.TYPE_ERROR, f"Undefined struct type {struct_name}")
             
-            # Transform self.user_types_fields[struct_name] into the expected list format
-            fields = [{"name": field_name, "var_type": field_type} 
-                    for field_name, field_type in self.user_types_fields[struct_name].items()]
-            new_instance = create_user_object(struct_name, fields, self.valid_user_types_names)
+        # Transform self.user_types_fields[struct_name] into the expected list format
+        fields = [{"name": field_name, "var_type": field_type} 
+                for field_name, field_type in self.user_types_fields[struct_name].items()]
+        new_instance = create_user_object(struct_name, fields, self.valid_user_types_names)
             
-            if not new_instance:
-                super().error(ErrorType.TYPE_ERROR, f"Failed to create instance of struct type {struct_name}")
-            # Return the instance wrapped in a Value object
+        if not new_instance:
+            super().error(ErrorType.TYPE_ERROR, f"Failed to create instance of struct type {struct_name}")
+        # Return the instance wrapped in a Value object
             
-            # Initialize fields to `nil` for self-referencing structs
-            for field in fields:
-                field_name = field["name"]
-                field_type = field["var_type"]
-                if field_type in self.user_types_fields:
-                    new_instance.set_val(field_name, Value(Type.NIL, None), self.valid_user_types_names)
+        # Initialize fields to `nil` for self-referencing structs
+        for field in fields:
+            field_name = field["name"]
+            field_type = field["var_type"]
+            if field_type in self.user_types_fields:
+                new_instance.set_val(field_name, Value(Type.NIL, None), self.valid_user_types_names)
             
-            return Value(struct_name, new_instance)
+        return Value(struct_name, new_instance)
+
+    # Arrays: `new T[n]` makes n elements of T's default value (nil for structs).
+    # Indexes are ints from 0 to len(a) - 1; anything else is a FAULT_ERROR, as is
+    # indexing a nil array
+    def new_array(self, elem_type, size_obj):
+        if elem_type not in self.PRIM_TYPES and elem_type not in self.default_user_types:
+            super().error(ErrorType.TYPE_ERROR, f"Invalid array element type {elem_type}")
+        if size_obj.type() != Type.INT:
+            super().error(ErrorType.TYPE_ERROR, f"Array size must be an int, not {size_obj.type()}")
+        if size_obj.value() < 0:
+            super().error(ErrorType.FAULT_ERROR, f"Negative array size {size_obj.value()}")
+        return Value(array_type(elem_type), ArrayObject(elem_type, size_obj.value()))
+
+    def get_element(self, array_obj, index_obj):
+        array = self.__array_of(array_obj)
+        return array.get(self.__check_index(array, index_obj))
+
+    def set_element(self, array_obj, index_obj, value_obj):
+        array = self.__array_of(array_obj)
+        index = self.__check_index(array, index_obj)
+        array.set(index, self.__element_value(array.elem_type, value_obj, "an array of"))
+
+    # len() of an array or a map
+    def length(self, obj):
+        if map_types(obj.type()) is not None:
+            return Value(Type.INT, len(self.__map_of(obj)))
+        return Value(Type.INT, len(self.__array_of(obj)))
+
+    # Maps: `new map[K]V` makes an empty map from int or string keys K to V values.
+    # get(m, k), put(m, k, v), contains(m, k), delete(m, k) and keys(m) are builtins
+    # unless the program defines a function with the same name and arity; get of a
+    # missing key is a FAULT_ERROR, as is using a nil map. delete returns whether the key
+    # was there, and keys returns an array of the keys in the order they were first put
+    def new_map(self, var_type):
+        if not known_type(var_type, self.default_user_types):
+            super().error(ErrorType.TYPE_ERROR, f"Invalid map type {var_type}")
+        return Value(var_type, MapObject(*map_types(var_type)))
+
+    def is_map_builtin(self, func_name, num_args):
+        return Interpreter.MAP_BUILTINS.get(func_name) == num_args and num_args not in self.func_name_to_ast.get(func_name, ())
+
+    def map_builtin(self, func_name, args):
+        hash_map = self.__map_of(args[0])
+        if func_name == "keys":
+            return Value(array_type(hash_map.key_type), hash_map.keys())
+        key = self.__check_key(hash_map, args[1])
+        if func_name == "get":
+            value_obj = hash_map.get(key)
+            if value_obj is None:
+                super().error(ErrorType.FAULT_ERROR, f"Key {key} not found in map")
+            return value_obj
+        if func_name == "put":
+            hash_map.put(key, self.__element_value(hash_map.value_type, args[2], "a map of"))
+            return Value(Type.VOID)
+        if func_name == "contains":
+            return Value(Type.BOOL, key in hash_map.items)
+        return Value(Type.BOOL, hash_map.items.pop(key, MapObject) is not MapObject)
+
+    def __assign_element(self, assign_ast):
+        array_obj = self.__eval_expr(assign_ast.get("array"))
+        index_obj = self.__eval_expr(assign_ast.get("subscript"))
+        self.set_element(array_obj, index_obj, self.__eval_expr(assign_ast.get("expression")))
+
+    def __array_of(self, array_obj):
+        if type(array_obj.value()) is ArrayObject:
+            return array_obj.value()
+        if array_obj.type() == Type.NIL or (element_type(array_obj.type()) is not None and array_obj.value() is None):
+            super().error(ErrorType.FAULT_ERROR, "Array is nil")
+        if element_type(array_obj.type()) is None:
+            super().error(ErrorType.TYPE_ERROR, f"Cannot index a value of type {array_obj.type()}")
+        return array_obj.value()
+
+    def __map_of(self, map_obj):
+        if type(map_obj.value()) is MapObject:
+            return map_obj.value()
+        if map_obj.type() == Type.NIL or (map_types(map_obj.type()) is not None and map_obj.value() is None):
+            super().error(ErrorType.FAULT_ERROR, "Map is nil")
+        super().error(ErrorType.TYPE_ERROR, f"Expected a map, not a value of type {map_obj.type()}")
+
+    # the dict key for key_obj; string keys may be ropes, which are joined
+    def __check_key(self, hash_map, key_obj):
+        if key_obj.type() != hash_map.key_type:
+            super().error(ErrorType.TYPE_ERROR, f"Map key must be a {hash_map.key_type}, not {key_obj.type()}")
+        return flatten(key_obj.value())
+
+    # value_obj as stored in a container of elem_type elements, coerced or made a typed nil
+    def __element_value(self, elem_type, value_obj, container):
+        if elem_type == Type.BOOL and value_obj.type() == Type.INT:
+            return self.__coerce_to_bool(value_obj)
+        if value_obj.type() == elem_type:
+            return value_obj
+        if value_obj.type() == Type.NIL and elem_type in self.default_user_types:
+            return Interpreter.NIL_VALUE
+        if value_obj.type() == Type.NIL and self.__is_container(elem_type):
+            return Value(elem_type, None)
+        super().error(
+            ErrorType.TYPE_ERROR,
+            f"Type mismatch: cannot store {value_obj.type()} in {container} {elem_type}",
+        )
+
+    def __check_index(self, array, index_obj):
+        index = index_obj.value()
+        if index_obj.type() != Type.INT:
+            super().error(ErrorType.TYPE_ERROR, f"Array index must be an int, not {index_obj.type()}")
+        if not 0 <= index < len(array.items):
+            super().error(ErrorType.FAULT_ERROR, f"Index {index} out of bounds for array of length {len(array)}")
+        return index
+
+    # struct, array and map values are references, and may be nil
+    def __is_reference(self, t):
+        return t in self.default_user_types or self.__is_container(t)
 
+    def __is_container(self, t):
+        return element_type(t) is not None or map_types(t) is not None
 
     def __eval_op(self, arith_ast):
         left_value_obj = self.__eval_expr(arith_ast.get("op1"))
         right_value_obj = self.__eval_expr(arith_ast.get("op2"))
-        operator = arith_ast.elem_type
+        return self.binary_op(arith_ast.elem_type, left_value_obj, right_value_obj)
+
+    def binary_op(self, operator, left_value_obj, right_value_obj):
 #WHEN TYPE IS IN THE USER DEFINED TYPE AND THE VALUE IS NONE AND THE OTHER OPERATOR TYPE IS NIL IT SHOULD ALLOW == AND =!
         # Check if any operand is of type 'void'
         if left_value_obj.type() == Type.VOID or right_value_obj.type() == Type.VOID:
             super().error(ErrorType.TYPE_ERROR, "Cannot perform operations on 'void' type")
 
         
-        #print(f"DEBUG: Evaluating operation {arith_ast.elem_type} with types {left_value_obj.type()} and {right_value_obj.type()}")
+        #print(f"DEBUG: Evaluating operation {operator} with types {left_value_obj.type()} and {right_value_obj.type()}")
         # Coerce both operands to boolean if the operation is logical (&& or ||)
-        if arith_ast.elem_type in {"&&", "||"}:
+        if operator in {"&&", "||"}:
             left_value_obj = self.__coerce_to_bool(left_value_obj)
             right_value_obj = self.__coerce_to_bool(right_value_obj)
         
@@ -586,24 +1131,24 @@ class Interpreter(InterpreterBase):
         if operator in {"==", "!="}:
             # Handle int-to-bool coercion
 
-            # Struct csomparisons
-            if left_value_obj.type() in self.default_user_types.keys() or right_value_obj.type() in self.default_user_types.keys():
+            # Struct csomparisons, and array ones, which compare references the same way
+            if self.__is_reference(left_value_obj.type()) or self.__is_reference(right_value_obj.type()):
                 # Handle nil and struct comparison
                 if left_value_obj.type() == Type.NIL or right_value_obj.type() == Type.NIL:
                     if left_value_obj.type() == right_value_obj.type():
                         return Value(Type.BOOL, operator == "==")
-                    if left_value_obj.type() == Type.NIL and right_value_obj.type() in self.default_user_types.keys() and right_value_obj.value() is None:
+                    if left_value_obj.type() == Type.NIL and self.__is_reference(right_value_obj.type()) and right_value_obj.value() is None:
                         return Value(Type.BOOL, operator == "==")
-                    elif right_value_obj.type() == Type.NIL and left_value_obj.type() in self.default_user_types.keys() and left_value_obj.value() is None:
+                    elif right_value_obj.type() == Type.NIL and self.__is_reference(left_value_obj.type()) and left_value_obj.value() is None:
                         return Value(Type.BOOL, operator == "==")
                     else:
                         return Value(Type.BOOL, operator == "!=")
                 
                 #handle uninitialized structs
                 if left_value_obj.value() is None and right_value_obj.value() is None:
-                    return Value(Type.BOOL, arith_ast.elem_type == "==")  # Both are uninitialized, so they are "=="
+                    return Value(Type.BOOL, operator == "==")  # Both are uninitialized, so they are "=="
                 if left_value_obj.value() is None or right_value_obj.value() is None:
-                    return Value(Type.BOOL, arith_ast.elem_type == "!=")  # One is uninitialized, the other is not
+                    return Value(Type.BOOL, operator == "!=")  # One is uninitialized, the other is not
                 
 
                 # Both are structs: ensure they are of the same type
@@ -624,25 +1169,33 @@ class Interpreter(InterpreterBase):
                 
 
         if not self.__compatible_types(
-            arith_ast.elem_type, left_value_obj, right_value_obj
+            operator, left_value_obj, right_value_obj
         ):
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible types for {arith_ast.elem_type} operation",
+                f"Incompatible types for {operator} operation",
             )
-        if arith_ast.elem_type not in self.op_to_lambda[left_value_obj.type()]:
+        if operator not in self.op_to_lambda.get(left_value_obj.type(), ()):
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible operator {arith_ast.elem_type} for type {left_value_obj.type()}",
+                f"Incompatible operator {operator} for type {left_value_obj.type()}",
             )
-        #f = self.op_to_lambda[left_value_obj.type()][arith_ast.elem_type]
-        f = self.op_to_lambda[left_value_obj.type()].get(arith_ast.elem_type)
+        #f = self.op_to_lambda[left_value_obj.type()][operator]
+        f = self.op_to_lambda[left_value_obj.type()].get(operator)
         if f is None:
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible operator {arith_ast.elem_type} for type {left_value_obj.type()}",
+                f"Incompatible operator {operator} for type {left_value_obj.type()}",
+            )
+        result = f(left_value_obj, right_value_obj)
+        if __debug__ and self.trace_ops:
+            self.tracer.emit(
+                "ops",
+                self.current_line,
+                f"{brewtrace.describe(left_value_obj)} {operator} {brewtrace.describe(right_value_obj)}"
+                f" -> {brewtrace.describe(result)}",
             )
-        return f(left_value_obj, right_value_obj)
+        return result
     
 
     def __compatible_types(self, oper, obj1, obj2):
@@ -651,124 +1204,126 @@ class Interpreter(InterpreterBase):
             return True
         return obj1.type() == obj2.type()
 
-    def __eval_unary(self, arith_ast, t, f):
-        value_obj = self.__eval_expr(arith_ast.get("op1"))
+    def unary_op(self, operator, value_obj):
+        if operator == Interpreter.NEG_NODE:
+            t, f = Type.INT, lambda x: -1 * x
+        else:
+            t, f = Type.BOOL, lambda x: not x
         # Coerce int to bool for NOT operation
-        if arith_ast.elem_type == Interpreter.NOT_NODE and value_obj.type() == Type.INT:
+        if operator == Interpreter.NOT_NODE and value_obj.type() == Type.INT:
             value_obj = self.__coerce_to_bool(value_obj)
         
         if value_obj.type() != t:
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible type for {arith_ast.elem_type} operation",
+                f"Incompatible type for {operator} operation",
             )
         return Value(t, f(value_obj.value()))
 
-    def __setup_ops(self):
-        self.op_to_lambda = {}
+    @staticmethod
+    def __setup_ops():
+        op_to_lambda = {}
         # set up operations on integers
-        self.op_to_lambda[Type.INT] = {}
-        self.op_to_lambda[Type.INT]["+"] = lambda x, y: Value(
+        op_to_lambda[Type.INT] = {}
+        op_to_lambda[Type.INT]["+"] = lambda x, y: Value(
             x.type(), x.value() + y.value()
         )
-        self.op_to_lambda[Type.INT]["-"] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["-"] = lambda x, y: Value(
             x.type(), x.value() - y.value()
         )
-        self.op_to_lambda[Type.INT]["*"] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["*"] = lambda x, y: Value(
             x.type(), x.value() * y.value()
         )
-        self.op_to_lambda[Type.INT]["/"] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["/"] = lambda x, y: Value(
             x.type(), x.value() // y.value()
         )
-        self.op_to_lambda[Type.INT]["=="] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["=="] = lambda x, y: Value(
             Type.BOOL, x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.INT]["!="] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["!="] = lambda x, y: Value(
             Type.BOOL, x.type() != y.type() or x.value() != y.value()
         )
-        self.op_to_lambda[Type.INT]["<"] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["<"] = lambda x, y: Value(
             Type.BOOL, x.value() < y.value()
         )
-        self.op_to_lambda[Type.INT]["<="] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["<="] = lambda x, y: Value(
             Type.BOOL, x.value() <= y.value()
         )
-        self.op_to_lambda[Type.INT][">"] = lambda x, y: Value(
+        op_to_lambda[Type.INT][">"] = lambda x, y: Value(
             Type.BOOL, x.value() > y.value()
         )
-        self.op_to_lambda[Type.INT][">="] = lambda x, y: Value(
+        op_to_lambda[Type.INT][">="] = lambda x, y: Value(
             Type.BOOL, x.value() >= y.value()
         )
         #  set up operations on strings
-        self.op_to_lambda[Type.STRING] = {}
-        self.op_to_lambda[Type.STRING]["+"] = lambda x, y: Value(
-            x.type(), x.value() + y.value()
+        op_to_lambda[Type.STRING] = {}
+        # + builds ropes so that concatenating in a loop stays linear
+        op_to_lambda[Type.STRING]["+"] = lambda x, y: Value(
+            x.type(), concat(x.value(), y.value())
         )
-        self.op_to_lambda[Type.STRING]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
+        op_to_lambda[Type.STRING]["=="] = lambda x, y: Value(
+            Type.BOOL, flatten(x.value()) == flatten(y.value())
         )
-        self.op_to_lambda[Type.STRING]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
+        op_to_lambda[Type.STRING]["!="] = lambda x, y: Value(
+            Type.BOOL, flatten(x.value()) != flatten(y.value())
         )
         #  set up operations on bools
-        self.op_to_lambda[Type.BOOL] = {}
-        self.op_to_lambda[Type.BOOL]["&&"] = lambda x, y: Value(
+        op_to_lambda[Type.BOOL] = {}
+        op_to_lambda[Type.BOOL]["&&"] = lambda x, y: Value(
             x.type(), x.value() and y.value()
         )
-        self.op_to_lambda[Type.BOOL]["||"] = lambda x, y: Value(
+        op_to_lambda[Type.BOOL]["||"] = lambda x, y: Value(
             x.type(), x.value() or y.value()
         )
-        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: Value(
+        op_to_lambda[Type.BOOL]["=="] = lambda x, y: Value(
             Type.BOOL, x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: Value(
+        op_to_lambda[Type.BOOL]["!="] = lambda x, y: Value(
             Type.BOOL, x.type() != y.type() or x.value() != y.value()
         )
 
         #  set up operations on nil
-        self.op_to_lambda[Type.NIL] = {}
-        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: Value(
+        op_to_lambda[Type.NIL] = {}
+        op_to_lambda[Type.NIL]["=="] = lambda x, y: Value(
             Type.BOOL, x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: Value(
+        op_to_lambda[Type.NIL]["!="] = lambda x, y: Value(
             Type.BOOL, x.type() != y.type() or x.value() != y.value()
         )
         
         # Handle struct types (comparison by reference)
-        self.op_to_lambda[Type.STRUCT] = {}
-        self.op_to_lambda[Type.STRUCT]["=="] = lambda x, y: Value(
+        op_to_lambda[Type.STRUCT] = {}
+        op_to_lambda[Type.STRUCT]["=="] = lambda x, y: Value(
             Type.BOOL, x.value() == y.value()
         )
-        self.op_to_lambda[Type.STRUCT]["!="] = lambda x, y: Value(
+        op_to_lambda[Type.STRUCT]["!="] = lambda x, y: Value(
             Type.BOOL, x.value() != y.value()
         )
+        return MappingProxyType({t: MappingProxyType(ops) for t, ops in op_to_lambda.items()})
 
+    # built once, with the class; every instance shares it, and nothing can change it
+    OP_TO_LAMBDA = __setup_ops()
 
-    def __do_if(self, if_ast):
+    def __do_if(self, if_ast, default_return=None):
         #print("in if block")
         cond_ast = if_ast.get("condition")
-        result = self.__eval_expr(cond_ast)
-        # Coerce if condition is int
-        result = self.__coerce_to_bool(result)
-        #print("type:", result.type(), "value:", result.value())
-
-        if result.type() != Type.BOOL:
-            super().error(
-                ErrorType.TYPE_ERROR,
-                "Incompatible type for if condition",
-            )
+        result = self.condition(self.__eval_expr(cond_ast), "if")
+        if self.coverage is not None:
+            taken = InterpreterBase.BRANCH_TAKEN if result.value() else InterpreterBase.BRANCH_NOT_TAKEN
+            self.coverage[if_ast.node_id] |= taken
         if result.value():
             statements = if_ast.get("statements")
-            status, return_val = self.__run_statements(statements)
+            status, return_val = self.__run_statements(statements, default_return, if_ast.get("bare"))
             return (status, return_val)
         else:
             else_statements = if_ast.get("else_statements")
             if else_statements is not None:
-                status, return_val = self.__run_statements(else_statements)
+                status, return_val = self.__run_statements(else_statements, default_return, if_ast.get("else_bare"))
                 return (status, return_val)
 
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
-    def __do_for(self, for_ast):
+    def __do_for(self, for_ast, default_return=None):
         init_ast = for_ast.get("init") 
         cond_ast = for_ast.get("condition")
         update_ast = for_ast.get("update") 
@@ -776,27 +1331,105 @@ class Interpreter(InterpreterBase):
         if init_ast:
             #print(f"Initializing for-loop: {init_ast}")
             self.__run_statement(init_ast, Interpreter.NIL_VALUE)  # TO DO CHECK HOW JENNIFER INITIALIZES IT HERE
+        if Interpreter.COUNTING_LOOPS:
+            counting = for_ast.get("counting")
+            if counting is None:  # not seen at load time, e.g. a loop typed at the repl
+                counting = for_ast.dict["counting"] = self.__find_counting_loop(for_ast)
+            if counting:
+                result = self.__do_counting_for(for_ast, counting, default_return)
+                if result is not None:
+                    return result
         run_for = Interpreter.TRUE_VALUE
         while run_for.value():
-            run_for = self.__eval_expr(cond_ast)  # check for-loop condition
-            run_for = self.__coerce_to_bool(run_for)  # Coerce if condition is int
-            #print(f"Loop condition evaluated to: {run_for.value()}")
-            if run_for.type() != Type.BOOL:
-                super().error(
-                    ErrorType.TYPE_ERROR,
-                    "Incompatible type for for condition",
-                )
+            run_for = self.condition(self.__eval_expr(cond_ast), "for")  # check for-loop condition
+            if self.coverage is not None:
+                taken = InterpreterBase.BRANCH_TAKEN if run_for.value() else InterpreterBase.BRANCH_NOT_TAKEN
+                self.coverage[for_ast.node_id] |= taken
             if run_for.value():
                 statements = for_ast.get("statements")
-                status, return_val = self.__run_statements(statements)
+                status, return_val = self.__run_statements(statements, default_return, for_ast.get("bare"))
                 if status == ExecStatus.RETURN:
                     return status, return_val
                 if update_ast:
                     self.__run_statement(update_ast, Interpreter.NIL_VALUE)
+                if self.check_clock:  # loop back-edge
+                    super().check_limits()
                 #self.__run_statement(update_ast,None)  # update counter variable
 
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
+    # the bool an if or for (kind) statement's condition result stands for
+    def condition(self, result, kind):
+        result = self.__coerce_to_bool(result)  # Coerce if condition is int
+        if result.type() != Type.BOOL:
+            super().error(
+                ErrorType.TYPE_ERROR,
+                f"Incompatible type for {kind} condition",
+            )
+        return result
+
+    # Runs a counting loop on a Python int, writing each value of the variable straight
+    # into its scope. The body runs in one block that is emptied between iterations (or
+    # in the enclosing block if it is bare), and the step budget is charged what the
+    # generic condition (3 steps) and update (4) would cost. Returns None, having run
+    # nothing, if the variable or bound isn't a plain int, so that the generic loop
+    # reports the usual error
+    def __do_counting_for(self, for_ast, counting, default_return):
+        var_name, comparison, bound_ast, step = counting
+        scope = None
+        for block in reversed(self.env.environment[-1]):
+            if var_name in block:
+                scope = block
+                break
+        if bound_ast.elem_type == InterpreterBase.VAR_NODE:
+            bound = self.env.get(bound_ast.get("name"))
+        else:
+            bound = Value(Type.INT, bound_ast.get("val"))
+        if scope is None or bound is None:
+            return None
+        counter = scope[var_name]
+        if counter.type() != Type.INT or type(counter.value()) is not int:
+            return None
+        if bound.type() != Type.INT or type(bound.value()) is not int:
+            return None
+
+        compare = Interpreter.COUNTING_COMPARE[comparison]
+        i = counter.value()
+        bound = bound.value()
+        statements = for_ast.get("statements")
+        bare = for_ast.get("bare")
+        if not bare:
+            self.env.push_block()
+            body_scope = self.env.environment[-1][-1]
+        if self.coverage is not None and compare(i, bound):
+            self.coverage[for_ast.node_id] |= InterpreterBase.BRANCH_TAKEN
+        while True:
+            self.steps_left -= 3
+            if self.steps_left < 0:
+                super().check_limits()
+            if not compare(i, bound):
+                if self.coverage is not None:
+                    self.coverage[for_ast.node_id] |= InterpreterBase.BRANCH_NOT_TAKEN
+                break
+            for statement in statements:
+                status, return_val = self.__run_statement(statement, default_return)
+                if status == ExecStatus.RETURN:
+                    if not bare:
+                        self.env.pop_block()
+                    return (status, return_val)
+            if not bare:
+                body_scope.clear()
+            self.steps_left -= 4
+            if self.steps_left < 0:
+                super().check_limits()
+            i += step
+            scope[var_name] = Value(Type.INT, i)
+            if self.check_clock:  # loop back-edge
+                super().check_limits()
+        if not bare:
+            self.env.pop_block()
+        return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
+
     def __do_return(self, return_ast, default_type):
         #TO DO COULD BE SOURCE OF ERROR FOR DEFAULT_TYPE IS NONE
         expr_ast = return_ast.get("expression")
@@ -820,7 +1453,10 @@ class Interpreter(InterpreterBase):
                 return (ExecStatus.RETURN, None)
             return (ExecStatus.RETURN, default_type)
         
-        value_obj = copy.copy(self.__eval_expr(expr_ast))
+        return (ExecStatus.RETURN, self.return_value(default_type, copy.copy(self.__eval_expr(expr_ast))))
+
+    # what `return value_obj;` returns from a function whose default return is default_type
+    def return_value(self, default_type, value_obj):
         # Coerce if function return type is bool and return value is int
         if default_type == Type.VOID:
             func_return_type = Type.VOID  # Explicitly set the function return type to void
@@ -834,9 +1470,9 @@ class Interpreter(InterpreterBase):
         
         if default_type.type() == Type.NIL:
             # Allow `nil` for user-defined struct types
-            if default_type.value() in self.user_types_fields and value_obj.type() == Type.NIL:
+            if self.__is_reference(default_type.value()) and value_obj.type() == Type.NIL:
                 # Ensure the returned `nil` matches the expected struct type
-                return (ExecStatus.RETURN, value_obj)
+                return value_obj
             elif default_type.value() != value_obj.type():
                 super().error(ErrorType.TYPE_ERROR, "Return type mismatch")
 
@@ -858,7 +1494,7 @@ class Interpreter(InterpreterBase):
                     f"Return type mismatch: expected {default_type.type()}, but got {value_obj.type()}"
                 )
 
-        return (ExecStatus.RETURN, value_obj)
+        return value_obj
     
     # Helper function to coerce an integer to a boolean
     def __coerce_to_bool(self, value):
@@ -1,13 +1,16 @@
 
 # document that we won't have a return inside the init/update of a for loop
 
-import copy
 from enum import Enum
+from types import MappingProxyType
 
+import brewtrace
 from brewparse import parse_program
+from element import Element
 from env_v4 import EnvironmentManager
 from intbase import InterpreterBase, ErrorType
-from type_valuev4 import Type, LazyValue, Value, create_value, get_printable
+from rope import concat, flatten
+from type_valuev4 import Type, ConstantValue, LazyValue, Value, get_printable
 
 
 class ExecStatus(Enum):
@@ -18,15 +21,32 @@ class ExecStatus(Enum):
 # Main interpreter class
 class Interpreter(InterpreterBase):
     # constants
-    NIL_VALUE = create_value(InterpreterBase.NIL_DEF)
-    TRUE_VALUE = create_value(InterpreterBase.TRUE_DEF)
-    BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+    NIL_VALUE = ConstantValue(Type.NIL, None)
+    TRUE_VALUE = ConstantValue(Type.BOOL, True)
+    BIN_OPS = frozenset({"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"})
+    ENFORCES_LIMITS = True
+    # whether blocks that declare no variables run without a scope of their own
+    ELIDE_SCOPES = True
+    # the statement lists of each kind of node, and the key marking each one bare
+    BLOCK_KEYS = MappingProxyType({
+        InterpreterBase.FUNC_NODE: (("statements", "bare"),),
+        InterpreterBase.IF_NODE: (("statements", "bare"), ("else_statements", "else_bare")),
+        InterpreterBase.FOR_NODE: (("statements", "bare"),),
+        InterpreterBase.TRY_NODE: (("statements", "bare"),),
+        InterpreterBase.CATCH_NODE: (("statements", "bare"),),
+    })
 
     # methods
     def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+        super().__init__(console_output, inp, trace_output)
         self.trace_output = trace_output
-        self.__setup_ops()
+        self.op_to_lambda = Interpreter.OP_TO_LAMBDA
+
+    def reset(self):
+        super().reset()
+        self.func_name_to_ast = {}
+        self.env = EnvironmentManager()
+        self.coverage = None  # a bytearray of flags indexed by node_id, to collect coverage
 
     # run a program that's provided in a string
     # usese the provided Parser found in brewparse.py to parse the program
@@ -34,25 +54,33 @@ class Interpreter(InterpreterBase):
     def run(self, program):
    
         try:
+            super().reset_limits()
+            self.current_line = None
             # Parse the program and set up the environment
-            ast = parse_program(program)
+            ast = parse_program(program, version=4)
             self.__set_up_function_table(ast)
             self.env = EnvironmentManager()
-            captured_env = self.env.copy()
-            self.__call_func_aux("main", [], captured_env)
+            self.__call_func_aux("main", [], self.env)
 
+        except RecursionError:
+            super().error(ErrorType.BUDGET_ERROR, "Call depth budget exhausted")
         except Exception as e:
             # Extract the error message and type
-            message = e.args[0]
-            type_full = message.split('.')
-            
+            message = str(e)
+            type_full = message.split('.', 1)
+
             # Handle specific error types
             if len(type_full) > 1:
-                type_error, type_msg = type_full[1].split(':')
-                if type_error in ["TYPE_ERROR", "NAME_ERROR", "FAULT_ERROR"]:
-                    super().error(ErrorType[type_error], type_msg[1:])
-            else:
-                super().error(ErrorType.FAULT_ERROR, f"Uncaught exception: {str(e)}")
+                type_error, _, type_msg = type_full[1].partition(':')
+                type_error = type_error.split(" on line ", 1)[0]
+                if type_error in ["TYPE_ERROR", "NAME_ERROR", "FAULT_ERROR", "BUDGET_ERROR"]:
+                    # it was traced when it was first raised
+                    tracing, self.trace_errors = self.trace_errors, False
+                    try:
+                        super().error(ErrorType[type_error], type_msg[1:], self.error_line)
+                    finally:
+                        self.trace_errors = tracing
+            super().error(ErrorType.FAULT_ERROR, f"Uncaught exception: {message}")
 
     
     def __set_up_function_table(self, ast):
@@ -63,6 +91,23 @@ class Interpreter(InterpreterBase):
             if func_name not in self.func_name_to_ast:
                 self.func_name_to_ast[func_name] = {}
             self.func_name_to_ast[func_name][num_params] = func_def
+            self.__annotate_blocks(func_def)
+
+    # set the bare keys of BLOCK_KEYS on every block of func_def (see Interpreter.__is_bare in v3)
+    def __annotate_blocks(self, func_def):
+        pending = [func_def]
+        while pending:
+            node = pending.pop()
+            for statements_key, bare_key in Interpreter.BLOCK_KEYS.get(node.elem_type, ()):
+                statements = node.get(statements_key)
+                node.dict[bare_key] = Interpreter.ELIDE_SCOPES and statements is not None and all(
+                    statement.elem_type != InterpreterBase.VAR_DEF_NODE for statement in statements
+                )
+            for child in node.dict.values():
+                if isinstance(child, list):
+                    pending.extend(c for c in child if isinstance(c, Element))
+                elif isinstance(child, Element):
+                    pending.append(child)
 
     def __get_func_by_name(self, name, num_params):
         if name not in self.func_name_to_ast:
@@ -75,24 +120,30 @@ class Interpreter(InterpreterBase):
             )
         return candidate_funcs[num_params]
 
-    def __run_statements(self, statements,captured_env=None):
-        if captured_env is None:
-            captured_env = self.env.copy()
-        self.env.push_block()
+    # bare is set for blocks marked bare by __annotate_blocks
+    def __run_statements(self, statements, bare=False):
+        if not bare:
+            self.env.push_block()
         for statement in statements:
             # if self.trace_output:
             #     print(statement)
-            status, return_val = self.__run_statement(statement, captured_env)
+            status, return_val = self.__run_statement(statement)
             if status == ExecStatus.RETURN:
-                self.env.pop_block()
+                if not bare:
+                    self.env.pop_block()
                 return (status, return_val)
 
-        self.env.pop_block()
+        if not bare:
+            self.env.pop_block()
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
-    def __run_statement(self, statement,captured_env):
-        if captured_env is None:
-            captured_env = self.env.copy()
+    def __run_statement(self, statement):
+        self.steps_left -= 1
+        if self.steps_left < 0:
+            super().check_limits()
+        self.current_line = statement.line_num
+        if self.coverage is not None:
+            self.coverage[statement.node_id] |= InterpreterBase.COVERED
         status = ExecStatus.CONTINUE
         return_val = None
         # Handle try catch block
@@ -103,7 +154,7 @@ class Interpreter(InterpreterBase):
         #     raise Exception("Catch nodes are not standalone statements")  
         elif statement.elem_type == InterpreterBase.FCALL_NODE:
             if statement.elem_type == InterpreterBase.FCALL_NODE:
-                func_result = self.__call_func(statement, captured_env)
+                func_result = self.__call_func(statement, self.env)
                 # Force evaluation for side effects (e.g., `print`) but ignore the return value
                 if isinstance(func_result, LazyValue):
                     func_result.value()
@@ -126,21 +177,26 @@ class Interpreter(InterpreterBase):
 
         return (status, return_val)
     
-    def __call_func(self, call_node,captured_env):
-        if captured_env is None:
-            captured_env = self.env.copy()
+    # env is where the call's arguments are evaluated: self.env, or the bindings captured
+    # by the thunk being forced
+    def __call_func(self, call_node, env):
         func_name = call_node.get("name")
         actual_args = call_node.get("args")
-        return self.__call_func_aux(func_name, actual_args,captured_env)
+        return self.__call_func_aux(func_name, actual_args, env)
     
-    def __call_func_aux(self, func_name, actual_args, captured_env):
+    def __call_func_aux(self, func_name, actual_args, env):
+        self.steps_left -= 1
+        if self.steps_left < 0 or self.check_clock:
+            super().check_limits()
         if func_name == "print":
-            return self.__call_print(actual_args)
+            return self.__call_print(actual_args, env)
         if func_name in {"inputi", "inputs"}:
-            return self.__call_input(func_name, actual_args)
+            return self.__call_input(func_name, actual_args, env)
 
         func_ast = self.__get_func_by_name(func_name, len(actual_args))
         formal_args = func_ast.get("args")
+        if self.coverage is not None:
+            self.coverage[func_ast.node_id] |= InterpreterBase.COVERED
 
         if len(actual_args) != len(formal_args):
             super().error(
@@ -148,16 +204,20 @@ class Interpreter(InterpreterBase):
                 f"Function {func_ast.get('name')} with {len(actual_args)} args not found",
             )
 
-        # Decide whether to evaluate arguments eagerly or lazily
+        # Arguments are evaluated lazily, each with the bindings it needs from the caller
         args = {}
         for formal_ast, actual_ast in zip(formal_args, actual_args):
             arg_name = formal_ast.get("name")
-
-            if func_name == "fact":  # Handle recursive functions eagerly
-                evaluated_value = self.__eval_expr(actual_ast, captured_env)
-                args[arg_name] = evaluated_value
-            else:  # Use lazy evaluation for other cases
-                args[arg_name] = LazyValue(lambda actual_ast=actual_ast: self.__eval_expr(actual_ast, captured_env))
+            captured = self.__capture(actual_ast, env)
+            args[arg_name] = LazyValue(
+                lambda actual_ast=actual_ast, captured=captured: self.__force_arg(actual_ast, captured)
+            )
+            if __debug__ and self.trace_thunks:
+                self.tracer.emit(
+                    "thunks", actual_ast.line_num, f"{func_name} argument {arg_name} delayed, capturing {self.__names(captured)}"
+                )
+        if __debug__ and self.trace_calls:
+            self.tracer.emit("calls", self.current_line, brewtrace.describe_call(func_name, args))
 
         # Push a new function scope
         self.env.push_func()
@@ -168,7 +228,9 @@ class Interpreter(InterpreterBase):
 
         try:
             # Run the function's statements
-            _, return_val = self.__run_statements(func_ast.get("statements"))
+            call_line = self.current_line
+            _, return_val = self.__run_statements(func_ast.get("statements"), func_ast.get("bare"))
+            self.current_line = call_line
             # Return the evaluated return value if it exists
             return return_val.value() if isinstance(return_val, LazyValue) else return_val
         except Exception as e:
@@ -177,10 +239,67 @@ class Interpreter(InterpreterBase):
             # Clean up the function scope
             self.env.pop_func()
 
-    def __call_print(self, args):
+    # evaluate an argument passed lazily, reporting errors on the line it was written on
+    # rather than the line that first needed its value
+    def __force_arg(self, actual_ast, captured_env):
+        forcing_line = self.current_line
+        self.current_line = actual_ast.line_num
+        result = self.__eval_expr(actual_ast, captured_env)
+        self.current_line = forcing_line
+        if __debug__ and self.trace_thunks:
+            self.tracer.emit("thunks", actual_ast.line_num, f"argument forced: {brewtrace.describe(result)}")
+        return result
+
+    # an assigned thunk's evaluation, when thunks are traced
+    def __force_assigned(self, var_name, expr, captured_env):
+        result = self.__eval_expr(expr, captured_env)
+        self.tracer.emit("thunks", expr.line_num, f"{var_name} forced: {brewtrace.describe(result)}")
+        return result
+
+    # the names bound in a captured dict or visible in an EnvironmentManager, for traces
+    def __names(self, env):
+        if isinstance(env, dict):
+            names = env.keys()
+        else:
+            names = {name for block in env.environment[-1] for name in block}
+        return ", ".join(sorted(names)) or "nothing"
+
+    # A thunk used to capture a deep copy of the whole environment, every caller's frame
+    # included. It only needs the bindings of the variables its expression names, taken
+    # from env as they are now: a later assignment rebinds a variable to a new thunk or
+    # value rather than changing the one captured, and a function called from the
+    # expression sees only the arguments it is passed, which are captured the same way
+    # when the call is made. Sharing the captured thunks also means each is forced once
+    def __capture(self, expr_ast, env):
+        free_vars = expr_ast.get("free_vars")
+        if free_vars is None:
+            free_vars = expr_ast.dict["free_vars"] = self.__find_free_vars(expr_ast)
+        captured = {}
+        for name in free_vars:
+            binding = env.get(name)
+            if binding is not None:  # otherwise forcing the thunk reports the missing name
+                captured[name] = binding
+        return captured
+
+    # the names of the variables an expression reads, the arguments of calls in it included
+    def __find_free_vars(self, expr_ast):
+        names = set()
+        pending = [expr_ast]
+        while pending:
+            node = pending.pop()
+            if node.elem_type == InterpreterBase.VAR_NODE:
+                names.add(node.get("name"))
+            for child in node.dict.values():
+                if isinstance(child, list):
+                    pending.extend(c for c in child if isinstance(c, Element))
+                elif isinstance(child, Element):
+                    pending.append(child)
+        return tuple(names)
+
+    def __call_print(self, args, env):
         output = ""
         for arg in args:
-            result = self.__eval_expr(arg)  # Evaluate the expression
+            result = self.__eval_expr(arg, env)  # Evaluate the expression
             if isinstance(result, LazyValue):
                 result = result.value()  # Force evaluation if it's a LazyValue
             if not isinstance(result, Value):
@@ -191,9 +310,9 @@ class Interpreter(InterpreterBase):
         return Interpreter.NIL_VALUE
 
 
-    def __call_input(self, name, args):
+    def __call_input(self, name, args, env):
         if args is not None and len(args) == 1:
-            result = self.__eval_expr(args[0])
+            result = self.__eval_expr(args[0], env)
             super().output(get_printable(result))
         elif args is not None and len(args) > 1:
             super().error(
@@ -223,11 +342,15 @@ class Interpreter(InterpreterBase):
         #     lambda: copy.copy(self.__eval_expr(expr))
             
         # )
-        # Capture the current environment when creating the lazy expression
-        captured_env = self.env.copy()
+        # Capture the bindings the expression needs when creating the lazy expression
+        captured_env = self.__capture(expr, self.env)
 
         # Create a lazy expression with the captured environment
-        lazy_expr = LazyValue(lambda captured_env=captured_env: self.__eval_expr(expr, captured_env))
+        if __debug__ and self.trace_thunks:
+            self.tracer.emit("thunks", self.current_line, f"{var_name} delayed, capturing {self.__names(captured_env)}")
+            lazy_expr = LazyValue(lambda: self.__force_assigned(var_name, expr, captured_env))
+        else:
+            lazy_expr = LazyValue(lambda captured_env=captured_env: self.__eval_expr(expr, captured_env))
         # Set the lazy expression in the environment
         if not self.env.set(var_name, lazy_expr):
             super().error(
@@ -244,6 +367,9 @@ class Interpreter(InterpreterBase):
             # one potential thing add a captured environemnt in the func
     def __eval_expr(self, expr_ast,captured_env=None):
         
+        self.steps_left -= 1
+        if self.steps_left < 0:
+            super().check_limits()
         try:
             if captured_env is None:
                 captured_env = self.env
@@ -270,7 +396,10 @@ class Interpreter(InterpreterBase):
                     # print(f"DEBUG: Accessing variable {var_name}: {var_value}")
 
                 if var_value is None:
-                    print(f"DEBUG: Variable '{var_name}' not found in captured environment: {captured_env}")
+                    if __debug__ and self.trace_env:
+                        self.tracer.emit(
+                            "env", self.current_line, f"{var_name} not found; in scope: {self.__names(captured_env)}"
+                        )
                     super().error(ErrorType.NAME_ERROR, f"Variable {var_name} not found")
                 return var_value.value() if isinstance(var_value, LazyValue) else var_value
             if expr_ast.elem_type == InterpreterBase.FCALL_NODE:
@@ -346,7 +475,6 @@ class Interpreter(InterpreterBase):
         #THIS is where the error is being caused. right value obj stores nil than an actual value??
         if isinstance(right_value_obj, LazyValue):
             right_value_obj = right_value_obj.value()
-        print(f"DEBUG: Left operand: {left_value_obj}, Right operand: {right_value_obj}")
 
         if not self.__compatible_types(
             arith_ast.elem_type, left_value_obj, right_value_obj
@@ -363,7 +491,13 @@ class Interpreter(InterpreterBase):
         f = self.op_to_lambda[left_value_obj.type()][arith_ast.elem_type]
         
         result=  f(left_value_obj, right_value_obj)
-        print(f"DEBUG: Result of operation {arith_ast.elem_type}: {result.value()}")
+        if __debug__ and self.trace_ops:
+            self.tracer.emit(
+                "ops",
+                arith_ast.line_num,
+                f"{brewtrace.describe(left_value_obj)} {arith_ast.elem_type} {brewtrace.describe(right_value_obj)}"
+                f" -> {brewtrace.describe(result)}",
+            )
         return result
     
     def __compatible_types(self, oper, obj1, obj2):
@@ -372,7 +506,8 @@ class Interpreter(InterpreterBase):
             return True
         return obj1.type() == obj2.type()
     
-    def __handle_div_0(self,x,y):
+    @staticmethod
+    def __handle_div_0(x,y):
         if y.value() == 0:
             raise Exception("div0")  # Raise division by 0 exception
         return Value(x.type(), x.value() // y.value())
@@ -389,121 +524,132 @@ class Interpreter(InterpreterBase):
             )
         return Value(t, f(value_obj.value()))
 
-    def __setup_ops(self):
-        self.op_to_lambda = {}
+    @staticmethod
+    def __setup_ops():
+        op_to_lambda = {}
         # set up operations on integers
-        self.op_to_lambda[Type.INT] = {}
-        self.op_to_lambda[Type.INT]["+"] = lambda x, y: Value(
+        op_to_lambda[Type.INT] = {}
+        op_to_lambda[Type.INT]["+"] = lambda x, y: Value(
             x.type(), x.value() + y.value()
         )
-        self.op_to_lambda[Type.INT]["-"] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["-"] = lambda x, y: Value(
             x.type(), x.value() - y.value()
         )
-        self.op_to_lambda[Type.INT]["*"] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["*"] = lambda x, y: Value(
             x.type(), x.value() * y.value()
         )
-        self.op_to_lambda[Type.INT]["/"] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["/"] = lambda x, y: Value(
             x.type(), x.value() // y.value()
         )
-        self.op_to_lambda[Type.INT]["=="] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["=="] = lambda x, y: Value(
             Type.BOOL, x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.INT]["!="] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["!="] = lambda x, y: Value(
             Type.BOOL, x.type() != y.type() or x.value() != y.value()
         )
-        self.op_to_lambda[Type.INT]["<"] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["<"] = lambda x, y: Value(
             Type.BOOL, x.value() < y.value()
         )
-        self.op_to_lambda[Type.INT]["<="] = lambda x, y: Value(
+        op_to_lambda[Type.INT]["<="] = lambda x, y: Value(
             Type.BOOL, x.value() <= y.value()
         )
-        self.op_to_lambda[Type.INT][">"] = lambda x, y: Value(
+        op_to_lambda[Type.INT][">"] = lambda x, y: Value(
             Type.BOOL, x.value() > y.value()
         )
-        self.op_to_lambda[Type.INT][">="] = lambda x, y: Value(
+        op_to_lambda[Type.INT][">="] = lambda x, y: Value(
             Type.BOOL, x.value() >= y.value()
         )
         #  set up operations on strings
-        self.op_to_lambda[Type.STRING] = {}
-        self.op_to_lambda[Type.STRING]["+"] = lambda x, y: Value(
-            x.type(), x.value() + y.value()
+        op_to_lambda[Type.STRING] = {}
+        # + builds ropes so that concatenating in a loop stays linear
+        op_to_lambda[Type.STRING]["+"] = lambda x, y: Value(
+            x.type(), concat(x.value(), y.value())
         )
-        self.op_to_lambda[Type.STRING]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
+        op_to_lambda[Type.STRING]["=="] = lambda x, y: Value(
+            Type.BOOL, flatten(x.value()) == flatten(y.value())
         )
-        self.op_to_lambda[Type.STRING]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
+        op_to_lambda[Type.STRING]["!="] = lambda x, y: Value(
+            Type.BOOL, flatten(x.value()) != flatten(y.value())
         )
         #  set up operations on bools
-        self.op_to_lambda[Type.BOOL] = {}
-        self.op_to_lambda[Type.BOOL]["&&"] = lambda x, y: Value(
+        op_to_lambda[Type.BOOL] = {}
+        op_to_lambda[Type.BOOL]["&&"] = lambda x, y: Value(
             x.type(), x.value() and y.value()
         )
-        self.op_to_lambda[Type.BOOL]["||"] = lambda x, y: Value(
+        op_to_lambda[Type.BOOL]["||"] = lambda x, y: Value(
             x.type(), x.value() or y.value()
         )
-        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: Value(
+        op_to_lambda[Type.BOOL]["=="] = lambda x, y: Value(
             Type.BOOL, x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: Value(
+        op_to_lambda[Type.BOOL]["!="] = lambda x, y: Value(
             Type.BOOL, x.type() != y.type() or x.value() != y.value()
         )
 
         #  set up operations on nil
-        self.op_to_lambda[Type.NIL] = {}
-        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: Value(
+        op_to_lambda[Type.NIL] = {}
+        op_to_lambda[Type.NIL]["=="] = lambda x, y: Value(
             Type.BOOL, x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: Value(
+        op_to_lambda[Type.NIL]["!="] = lambda x, y: Value(
             Type.BOOL, x.type() != y.type() or x.value() != y.value()
         )
-        self.op_to_lambda[Type.INT]["/"] = lambda x, y: self.__handle_div_0(x,y)
+        op_to_lambda[Type.INT]["/"] = lambda x, y: Interpreter.__handle_div_0(x,y)
+        return MappingProxyType({t: MappingProxyType(ops) for t, ops in op_to_lambda.items()})
 
-    def __do_if(self, if_ast, captured_env = None):
-        if captured_env is None:
-            captured_env = self.env.copy()
-        cond_ast = LazyValue(lambda: self.__eval_expr(if_ast.get("condition"),captured_env))
-        result = self.__eval_expr(cond_ast,captured_env) 
-        #result = self.__eval_expr(cond_ast).value()  # Force evaluation here
+    # built once, with the class; every instance shares it, and nothing can change it
+    OP_TO_LAMBDA = __setup_ops()
+
+    def __do_if(self, if_ast):
+        # the condition is needed straight away, so it is evaluated rather than deferred
+        result = self.__eval_expr(if_ast.get("condition"))
         if result.type() != Type.BOOL:
             super().error(
                 ErrorType.TYPE_ERROR,
                 "Incompatible type for if condition",
             )
+        if self.coverage is not None:
+            taken = InterpreterBase.BRANCH_TAKEN if result.value() else InterpreterBase.BRANCH_NOT_TAKEN
+            self.coverage[if_ast.node_id] |= taken
         if result.value():
             statements = if_ast.get("statements")
-            status, return_val = self.__run_statements(statements,captured_env)
+            status, return_val = self.__run_statements(statements, if_ast.get("bare"))
             return (status, return_val)
         else:
             else_statements = if_ast.get("else_statements")
             if else_statements is not None:
-                status, return_val = self.__run_statements(else_statements,captured_env)
+                status, return_val = self.__run_statements(else_statements, if_ast.get("else_bare"))
                 return (status, return_val)
 
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
-    def __do_for(self, for_ast,captured_env=None):
-        if captured_env is None:
-            captured_env = self.env.copy()
+    def __do_for(self, for_ast):
         init_ast = for_ast.get("init") 
-        cond_ast = LazyValue(lambda: self.__eval_expr(for_ast.get("condition"),captured_env))
-        update_ast = LazyValue(lambda: self.__run_statement(for_ast.get("update"),captured_env))
+        # the condition is evaluated afresh before every iteration, in the loop's
+        # current environment; a thunk would cache its first value
+        cond_ast = for_ast.get("condition")
+        update_ast = for_ast.get("update")
 
-        self.__run_statement(init_ast,captured_env)  # initialize counter variable
+        self.__run_statement(init_ast)  # initialize counter variable
         run_for = Interpreter.TRUE_VALUE
         while run_for.value():
-            run_for = self.__eval_expr(cond_ast,captured_env)  # check for-loop condition
+            run_for = self.__eval_expr(cond_ast)  # check for-loop condition
             if run_for.type() != Type.BOOL:
                 super().error(
                     ErrorType.TYPE_ERROR,
                     "Incompatible type for for condition",
                 )
+            if self.coverage is not None:
+                taken = InterpreterBase.BRANCH_TAKEN if run_for.value() else InterpreterBase.BRANCH_NOT_TAKEN
+                self.coverage[for_ast.node_id] |= taken
             if run_for.value():
                 statements = for_ast.get("statements")
-                status, return_val = self.__run_statements(statements,captured_env)
+                status, return_val = self.__run_statements(statements, for_ast.get("bare"))
                 if status == ExecStatus.RETURN:
                     return status, return_val
-                self.__run_statement(update_ast,captured_env)  # update counter variable
+                self.__run_statement(update_ast)  # update counter variable
+                if self.check_clock:  # loop back-edge
+                    super().check_limits()
 
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
     
@@ -545,22 +691,23 @@ class Interpreter(InterpreterBase):
         try_stm = try_ast.get("statements")
         catch_nodes = try_ast.get("catchers")
 
+        # __run_statements gives the try block its scope; an exception skips its clean up,
+        # and that of any blocks nested in it, so the scopes are cut back to this depth
+        depth = len(self.env.environment[-1])
         try:
-            self.env.push_block()  # New scope for try
-            status, return_val = self.__run_statements(try_stm)
-            self.env.pop_block()
+            status, return_val = self.__run_statements(try_stm, try_ast.get("bare"))
             return status, return_val  # If there are no exceptions then just return 
         except Exception as e:
             # Handle exceptions raised within the try block
-            self.env.pop_block()  # Ensure try scope is cleaned up
+            del self.env.environment[-1][depth:]  # Ensure try scope is cleaned up
 
             except_msg = str(e)
             for catch_node in catch_nodes:
                 catch_type = catch_node.get("exception_type")
                 if catch_type == except_msg:  # Match the exception type
-                    self.env.push_block()  # New scope for the catch block
-                    status, return_val = self.__run_statements(catch_node.get("statements"))
-                    self.env.pop_block()
+                    if self.coverage is not None:
+                        self.coverage[catch_node.node_id] |= InterpreterBase.COVERED
+                    status, return_val = self.__run_statements(catch_node.get("statements"), catch_node.get("bare"))
                     return status, return_val
             # If no matching catch block, propagate the exception
             raise e
@@ -0,0 +1,519 @@
+# Tiered execution for v3: compiling hot functions to Python
+# The v3 interpreter counts the calls of every user-defined function (Interpreter.invoke)
+# and, once one has been called jit_threshold times, asks a Compiler for it. The
+# Compiler translates the function's AST into the source of a Python function, compiles
+# it with compile() and exec(), and from then on invoke() runs that instead of walking
+# the tree. A function the compiler can't be sure to translate exactly stays on the
+# interpreter for good.
+#
+# Compiled code keeps v3's semantics rather than Python's:
+#   - ints, bools and strings are held as their raw payloads, without a Value around
+#     them, so a defaulted variable's payload (itself a Value, see type_valuev2) fails
+#     and compares the same way it does in the tree walker; structs and nil stay Values
+#   - ints are coerced to bools in conditions, && and ||, assignments to bools, bool
+#     parameters and bool returns, and && and || evaluate both of their operands
+#   - struct parameters, returns and field accesses go through the interpreter's own
+#     methods (get_field, set_field, binary_op, ...), so nil faults and type errors are
+#     reported with the same type, message and line
+#   - every statement charges the step budget what the tree walker would charge for it
+#     and its expressions, up front, and keeps current_line for error reports
+#
+# Translation is static: every variable must resolve to a definition in scope and have
+# a type that can't change, and every call must name a function that exists. Anything
+# the tree walker would only reject at run time (a type mismatch, a duplicate
+# definition, a call of an unknown function, a void value in an expression, ...) makes
+# the function unsupported rather than compiled, so the error is still raised if and
+# when the interpreter gets there.
+#
+# Calls between compiled functions go straight from one Python function to the other
+# through globals named F_<name>_<arity>, which hold a stub calling back into the
+# interpreter until the callee is compiled. Host functions are H_<name>_<arity>.
+
+from intbase import InterpreterBase
+from rope import concat, flatten
+from type_valuev2 import Type, Value
+
+PRIM_TYPES = (Type.INT, Type.BOOL, Type.STRING)
+INT_OPS = {"+": "+", "-": "-", "*": "*", "/": "//", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+LOGICAL_OPS = {"&&": "_and", "||": "_or"}
+INPUT_FUNCS = ("inputi", "inputs")
+
+
+class _Unsupported(Exception):
+    pass
+
+
+# the code of one function being translated
+class _Function:
+    def __init__(self, func_ast):
+        self.func_ast = func_ast
+        self.return_type = func_ast.get("return_type")
+        self.lines = []
+        self.depth = 1  # indentation, in levels below the def
+        self.scopes = []  # dicts of Brewin name -> (Python name, type), innermost last
+        self.names = 0
+
+    def emit(self, line):
+        self.lines.append("    " * self.depth + line)
+
+    def define(self, name, var_type):
+        if name in self.scopes[-1]:
+            raise _Unsupported(f"duplicate definition of {name}")
+        self.names += 1
+        self.scopes[-1][name] = (f"v_{name}_{self.names}", var_type)
+        return self.scopes[-1][name][0]
+
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        raise _Unsupported(f"unknown variable {name}")
+
+
+class Compiler:
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.calls = {}  # func_ast -> calls so far
+        self.entries = {}  # func_ast -> entry taking and returning Values, or None if unsupported
+        self.sources = {}  # func_ast -> generated source
+        self.reasons = {}  # func_ast -> why it wasn't compiled
+        # the globals of every compiled function: its helpers and the F_ functions
+        self.namespace = {
+            "interp": interpreter,
+            "Value": Value,
+            "NIL_VALUE": type(interpreter).NIL_VALUE,
+            "concat": concat,
+            "flatten": flatten,
+            "_and": lambda x, y: x and y,
+            "_or": lambda x, y: x or y,
+            "_default": lambda t: Value(t).v,
+            "_struct_arg": _struct_arg,
+            "_binary": interpreter.binary_op,
+            "_get_field": interpreter.get_field,
+            "_set_field": interpreter.set_field,
+            "_new": interpreter.new_object,
+            "_printable": interpreter.append_printable,
+            "_input": interpreter.read_input,
+        }
+
+    # The entry to call instead of interpreting func_ast, or None to interpret it. Counts
+    # the call, and compiles the function once it has been called threshold times
+    def entry(self, func_ast, threshold):
+        if func_ast in self.entries:
+            return self.entries[func_ast]
+        calls = self.calls.get(func_ast, 0) + 1
+        self.calls[func_ast] = calls
+        if calls < threshold:
+            return None
+        try:
+            compiled = self.__compile(func_ast)
+            entry = self.__boxed_entry(func_ast, compiled)
+        except _Unsupported as e:
+            self.reasons[func_ast] = str(e)
+            entry = None
+        self.entries[func_ast] = entry
+        return entry
+
+    def __compile(self, func_ast):
+        f = _Function(func_ast)
+        try:
+            self.__function(f)
+        except RecursionError:
+            raise _Unsupported("nested too deeply")
+        source = "\n".join(f.lines) + "\n"
+        try:
+            code = compile(source, f"<jit {func_ast.get('name')}>", "exec")
+        except (SyntaxError, RecursionError, MemoryError) as e:  # e.g. too many nested loops
+            raise _Unsupported(f"Python rejected the translation: {e}")
+        exec(code, self.namespace)
+        name = self.__global_name(func_ast)
+        self.sources[func_ast] = source
+        self.namespace[name] = self.namespace.pop("_compiled")
+        return self.namespace[name]
+
+    def __global_name(self, func_ast):
+        return f"F_{func_ast.get('name')}_{len(func_ast.get('args'))}"
+
+    # the F_ global for calling func_ast, holding a stub until it is compiled
+    def __callee(self, func_ast):
+        name = self.__global_name(func_ast)
+        if name not in self.namespace:
+            self.namespace[name] = self.__stub(func_ast)
+        return name
+
+    # calls an uncompiled function through the interpreter, boxing its arguments and
+    # unboxing its result
+    def __stub(self, func_ast):
+        interpreter = self.interpreter
+        formals = [(arg.get("name"), arg.get("var_type")) for arg in func_ast.get("args")]
+        unbox = func_ast.get("return_type") in PRIM_TYPES
+
+        def stub(*values):
+            if interpreter.check_clock:
+                interpreter.check_limits()
+            args = {}
+            for (name, var_type), value in zip(formals, values):
+                args[name] = Value(var_type, value) if var_type in PRIM_TYPES else value
+            result = interpreter.invoke(func_ast, args)
+            return result.v if unbox else result
+
+        return stub
+
+    # invoke() passes and expects Values; the compiled function takes and returns payloads
+    def __boxed_entry(self, func_ast, compiled):
+        unbox = [arg.get("var_type") in PRIM_TYPES for arg in func_ast.get("args")]
+        return_type = func_ast.get("return_type")
+
+        def entry(*values):
+            result = compiled(*[value.v if prim else value for prim, value in zip(unbox, values)])
+            if return_type in PRIM_TYPES:
+                return Value(return_type, result)
+            if return_type == Type.VOID:
+                return Value(Type.VOID)
+            return result
+
+        return entry
+
+    def __function(self, f):
+        func_ast = f.func_ast
+        f.scopes.append({})
+        params = []
+        for arg in func_ast.get("args"):
+            params.append(f.define(arg.get("name"), arg.get("var_type")))
+        # the body is a block of its own, so its variables may shadow the parameters
+        f.scopes.append({})
+        f.lines.append(f"def _compiled({', '.join(params)}):")
+        f.emit("I = interp")
+        f.emit("call_line = I.current_line")
+        f.emit("if I.check_clock:")
+        f.emit("    I.check_limits()")
+        for statement in func_ast.get("statements"):
+            self.__statement(f, statement)
+        self.__return(f, self.__default_return(f))
+
+    # what falling off the end of the function, or `return;`, returns
+    def __default_return(self, f):
+        if f.return_type == Type.VOID:
+            return "None"
+        if f.return_type == Type.INT:
+            return "0"
+        if f.return_type == Type.BOOL:
+            return "False"
+        if f.return_type == Type.STRING:
+            return "''"
+        return f"Value('nil', {f.return_type!r})"
+
+    # the value is worked out before current_line goes back to the caller's line, so
+    # that errors in it are reported on the return statement's
+    def __return(self, f, code):
+        f.emit(f"_result = {code}")
+        f.emit("I.current_line = call_line")
+        f.emit("return _result")
+
+    def __block(self, f, statements):
+        f.scopes.append({})
+        f.depth += 1
+        start = len(f.lines)
+        for statement in statements or []:
+            self.__statement(f, statement)
+        if len(f.lines) == start:
+            f.emit("pass")
+        f.depth -= 1
+        f.scopes.pop()
+
+    # the statement's steps, and its line for errors, as __run_statement keeps them
+    def __enter(self, f, statement, steps):
+        f.emit(f"I.steps_left -= {steps}")
+        f.emit("if I.steps_left < 0:")
+        f.emit("    I.check_limits()")
+        f.emit(f"I.current_line = {statement.line_num!r}")
+
+    def __statement(self, f, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.FCALL_NODE:
+            self.__enter(f, statement, 2 + sum(_steps(arg) for arg in statement.get("args")))
+            self.__call_statement(f, statement)
+        elif kind == "=":
+            self.__enter(f, statement, 1 + _steps(statement.get("expression")))
+            self.__assign(f, statement)
+        elif kind == InterpreterBase.VAR_DEF_NODE:
+            self.__enter(f, statement, 1)
+            var_type = statement.get("var_type")
+            if var_type in PRIM_TYPES:
+                f.emit(f"{f.define(statement.get('name'), var_type)} = _default({var_type!r})")
+            elif var_type in self.interpreter.user_types_fields:
+                f.emit(f"{f.define(statement.get('name'), var_type)} = Value({var_type!r})")
+            else:
+                raise _Unsupported(f"unknown type {var_type}")
+        elif kind == InterpreterBase.RETURN_NODE:
+            expr_ast = statement.get("expression")
+            self.__enter(f, statement, 1 + (_steps(expr_ast) if expr_ast is not None else 0))
+            if expr_ast is None:
+                self.__return(f, self.__default_return(f))
+            elif f.return_type == Type.VOID:
+                raise _Unsupported("void function returning a value")
+            else:
+                self.__return(f, self.__convert(self.__expr(f, expr_ast), f.return_type))
+        elif kind == InterpreterBase.IF_NODE:
+            cond_ast = statement.get("condition")
+            self.__enter(f, statement, 1 + _steps(cond_ast))
+            f.emit(f"if {self.__condition(f, cond_ast)}:")
+            self.__block(f, statement.get("statements"))
+            if statement.get("else_statements") is not None:
+                f.emit("else:")
+                self.__block(f, statement.get("else_statements"))
+        elif kind == InterpreterBase.FOR_NODE:
+            self.__for(f, statement)
+        else:
+            raise _Unsupported(f"statement {kind}")
+
+    def __for(self, f, for_ast):
+        cond_ast = for_ast.get("condition")
+        if cond_ast is None:
+            raise _Unsupported("for without a condition")
+        self.__enter(f, for_ast, 1)
+        if for_ast.get("init") is not None:
+            self.__statement(f, for_ast.get("init"))
+        f.emit("while True:")
+        f.depth += 1
+        f.emit(f"I.steps_left -= {_steps(cond_ast)}")
+        f.emit("if I.steps_left < 0:")
+        f.emit("    I.check_limits()")
+        f.emit(f"if not {self.__condition(f, cond_ast)}:")
+        f.emit("    break")
+        f.depth -= 1
+        self.__block(f, for_ast.get("statements"))
+        f.depth += 1
+        if for_ast.get("update") is not None:
+            self.__statement(f, for_ast.get("update"))
+        f.emit("if I.check_clock:")
+        f.emit("    I.check_limits()")
+        f.depth -= 1
+
+    def __condition(self, f, cond_ast):
+        code, t = self.__expr(f, cond_ast)
+        if t == Type.INT:
+            return f"({code} != 0)"
+        if t != Type.BOOL:
+            raise _Unsupported(f"{t} condition")
+        return code
+
+    def __assign(self, f, assign_ast):
+        var_name = assign_ast.get("name")
+        code, t = self.__expr(f, assign_ast.get("expression"))
+        if "." in var_name:
+            base, _ = f.lookup(var_name.split(".")[0])
+            f.emit(f"_set_field({var_name!r}, {base}, {_box(code, t)})")
+            return
+        target, var_type = f.lookup(var_name)
+        if var_type in PRIM_TYPES:
+            f.emit(f"{target} = {self.__convert((code, t), var_type)}")
+        elif t in (var_type, Type.NIL):
+            f.emit(f"{target} = {code}")
+        else:
+            # the interpreter would let the variable change type
+            raise _Unsupported(f"{t} assigned to {var_type} variable {var_name}")
+
+    # code for a value of type t where one of type expected is required, applying the
+    # coercions calls, assignments and returns make
+    def __convert(self, value, expected):
+        code, t = value
+        if expected == Type.BOOL and t == Type.INT:
+            return f"({code} != 0)"
+        if t != expected and not (t == Type.NIL and expected in self.interpreter.user_types_fields):
+            raise _Unsupported(f"{t} where {expected} is expected")
+        return code
+
+    def __call_statement(self, f, call_ast):
+        name = call_ast.get("name")
+        args = call_ast.get("args")
+        if name == "print":
+            f.emit("_out = []")
+            for arg in args:
+                code, t = self.__expr(f, arg)
+                if t == Type.INT:
+                    f.emit(f"_out.append(str({code}))")
+                elif t == Type.BOOL:
+                    f.emit(f"_out.append('true' if {code} is True else 'false')")
+                elif t == Type.STRING:
+                    f.emit(f"_out.append(str(flatten({code})))")
+                else:
+                    f.emit(f"_printable(_out, {code})")
+            f.emit("I.output(''.join(_out))")
+        elif name == "checkpoint" and not args:
+            pass
+        else:
+            f.emit(self.__call(f, call_ast, statement=True)[0])
+
+    # code and type of a call; void functions may only be called as statements
+    def __call(self, f, call_ast, statement=False):
+        name = call_ast.get("name")
+        args = call_ast.get("args")
+        if name in INPUT_FUNCS:
+            if len(args) > 1:
+                raise _Unsupported(f"{name} with more than one argument")
+            prompt = _box(*self.__expr(f, args[0])) if args else "None"
+            return f"_input({name!r}, {prompt}).v", Type.INT if name == "inputi" else Type.STRING
+        if name == "print" or (name == "checkpoint" and not args):
+            raise _Unsupported(f"{name} used as a value")
+        func_ast = self.interpreter.func_name_to_ast.get(name, {}).get(len(args))
+        if func_ast is None:
+            host_function = self.interpreter.host_functions.lookup(name, len(args))
+            if host_function is None:
+                raise _Unsupported(f"unknown function {name}")
+            return self.__host_call(f, host_function, args, statement)
+        return_type = func_ast.get("return_type")
+        if return_type == Type.VOID and not statement:
+            raise _Unsupported(f"void function {name} used as a value")
+        codes = []
+        for formal_ast, actual_ast in zip(func_ast.get("args"), args):
+            formal_type = formal_ast.get("var_type")
+            value = self.__expr(f, actual_ast)
+            if formal_type in PRIM_TYPES:
+                codes.append(self.__convert(value, formal_type))
+            else:
+                self.__convert(value, formal_type)
+                codes.append(f"_struct_arg({value[0]}, {formal_type!r})")
+        return f"{self.__callee(func_ast)}({', '.join(codes)})", return_type
+
+    # A host function (see host.py) whose types compiled code holds is called through a
+    # stub that boxes its arguments for Interpreter.call_host, which checks them and
+    # what it returns
+    def __host_call(self, f, host_function, args, statement):
+        name = host_function.name
+        return_type = host_function.return_type
+        if return_type == Type.VOID and not statement:
+            raise _Unsupported(f"void function {name} used as a value")
+        struct_types = self.interpreter.user_types_fields
+        for t in host_function.param_types + (return_type,):
+            if t not in PRIM_TYPES and t not in struct_types and t != Type.VOID:
+                raise _Unsupported(f"host function {name} taking or returning {t}")
+        codes = []
+        for formal_type, actual_ast in zip(host_function.param_types, args):
+            value = self.__expr(f, actual_ast)
+            if formal_type in PRIM_TYPES:
+                codes.append(self.__convert(value, formal_type))
+            else:
+                self.__convert(value, formal_type)
+                codes.append(f"_struct_arg({value[0]}, {formal_type!r})")
+        global_name = f"H_{name}_{len(args)}"
+        if global_name not in self.namespace:
+            self.namespace[global_name] = self.__host_stub(host_function)
+        return f"{global_name}({', '.join(codes)})", return_type
+
+    def __host_stub(self, host_function):
+        interpreter = self.interpreter
+        param_types = host_function.param_types
+        unbox = host_function.return_type in PRIM_TYPES
+
+        def stub(*values):
+            boxed = [Value(t, value) if t in PRIM_TYPES else value for t, value in zip(param_types, values)]
+            result = interpreter.call_host(host_function, boxed)
+            return result.v if unbox else result
+
+        return stub
+
+    # Python code and Brewin type of an expression
+    def __expr(self, f, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.INT_NODE:
+            return repr(expr_ast.get("val")), Type.INT
+        if kind == InterpreterBase.STRING_NODE:
+            return repr(expr_ast.get("val")), Type.STRING
+        if kind == InterpreterBase.BOOL_NODE:
+            return repr(expr_ast.get("val")), Type.BOOL
+        if kind == InterpreterBase.NIL_NODE:
+            return "NIL_VALUE", Type.NIL
+        if kind == InterpreterBase.VAR_NODE:
+            var_name = expr_ast.get("name")
+            if "." in var_name:
+                return self.__field(f, var_name)
+            return f.lookup(var_name)
+        if kind == InterpreterBase.FCALL_NODE:
+            return self.__call(f, expr_ast)
+        if kind == InterpreterBase.NEW_NODE:
+            struct_name = expr_ast.get("var_type")
+            if struct_name not in self.interpreter.user_types_fields:
+                raise _Unsupported(f"unknown type {struct_name}")
+            return f"_new({struct_name!r})", struct_name
+        if kind == InterpreterBase.NEG_NODE:
+            code, t = self.__expr(f, expr_ast.get("op1"))
+            if t != Type.INT:
+                raise _Unsupported(f"negating {t}")
+            return f"(-1 * {code})", Type.INT
+        if kind == InterpreterBase.NOT_NODE:
+            code, t = self.__expr(f, expr_ast.get("op1"))
+            if t == Type.INT:
+                return f"(not ({code} != 0))", Type.BOOL
+            if t != Type.BOOL:
+                raise _Unsupported(f"! of {t}")
+            return f"(not {code})", Type.BOOL
+        if kind in type(self.interpreter).BIN_OPS:
+            return self.__binary(f, kind, self.__expr(f, expr_ast.get("op1")), self.__expr(f, expr_ast.get("op2")))
+        raise _Unsupported(f"expression {kind}")
+
+    # a field read, typed by following the declared types of the fields
+    def __field(self, f, var_name):
+        fields = var_name.split(".")
+        base, t = f.lookup(fields[0])
+        for field in fields[1:]:
+            struct_fields = self.interpreter.user_types_fields.get(t)
+            if struct_fields is None or field not in struct_fields:
+                raise _Unsupported(f"field {field} of {t}")
+            t = struct_fields[field]
+        code = f"_get_field({var_name!r}, {base})"
+        return (f"{code}.v", t) if t in PRIM_TYPES else (code, t)
+
+    # as Interpreter.binary_op does it, for the operand types known here; anything the
+    # fast paths don't cover but binary_op accepts goes to binary_op itself
+    def __binary(self, f, operator, left, right):
+        (a, lt), (b, rt) = left, right
+        if operator in LOGICAL_OPS:
+            a = f"({a} != 0)" if lt == Type.INT else a
+            b = f"({b} != 0)" if rt == Type.INT else b
+            if {lt, rt} - {Type.INT, Type.BOOL}:
+                raise _Unsupported(f"{lt} {operator} {rt}")
+            return f"{LOGICAL_OPS[operator]}({a}, {b})", Type.BOOL
+        if operator in ("==", "!="):
+            if {lt, rt} <= {Type.INT, Type.BOOL}:
+                if lt != rt:
+                    a = f"({a} != 0)" if lt == Type.INT else a
+                    b = f"({b} != 0)" if rt == Type.INT else b
+                return f"({a} {operator} {b})", Type.BOOL
+            if lt == rt == Type.STRING:
+                return f"(flatten({a}) {operator} flatten({b}))", Type.BOOL
+            if Type.NIL in (lt, rt) and {lt, rt} & set(PRIM_TYPES):
+                raise _Unsupported(f"{lt} {operator} {rt}")
+            return f"_binary({operator!r}, {_box(a, lt)}, {_box(b, rt)}).v", Type.BOOL
+        if lt != rt:
+            raise _Unsupported(f"{lt} {operator} {rt}")
+        if lt == Type.INT:
+            result = Type.INT if operator in ("+", "-", "*", "/") else Type.BOOL
+            return f"({a} {INT_OPS[operator]} {b})", result
+        if lt == Type.STRING and operator == "+":
+            return f"concat({a}, {b})", Type.STRING
+        raise _Unsupported(f"{lt} {operator} {rt}")
+
+
+# what the tree walker charges the step budget for evaluating an expression: a step
+# per node, and one more for a call
+def _steps(expr_ast):
+    steps = 1
+    kind = expr_ast.elem_type
+    if kind == InterpreterBase.FCALL_NODE:
+        steps += 1 + sum(_steps(arg) for arg in expr_ast.get("args"))
+    elif kind in (InterpreterBase.NEG_NODE, InterpreterBase.NOT_NODE):
+        steps += _steps(expr_ast.get("op1"))
+    elif expr_ast.get("op1") is not None and expr_ast.get("op2") is not None:
+        steps += _steps(expr_ast.get("op1")) + _steps(expr_ast.get("op2"))
+    return steps
+
+
+# code for the Value of a payload of type t
+def _box(code, t):
+    return f"Value({t!r}, {code})" if t in PRIM_TYPES else code
+
+
+# a struct argument as __call_func_aux passes it: nil becomes a nil of the parameter's type
+def _struct_arg(value, struct_name):
+    return value if value.t == struct_name else Value(struct_name)
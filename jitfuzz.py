@@ -0,0 +1,248 @@
+# Differential fuzzing of the v3 JIT and inliner against the tree walker
+# Generates random v3 programs (ints, bools, strings, a struct, calls, ifs, counting
+# loops, and now and then an ill-typed expression, a nil field access or a variable
+# used before it is assigned) and runs each one on the plain tree walker, with small
+# calls inlined, compiling every function on its first call, and compiling after a few
+# calls so that compiled and interpreted functions call each other. Any difference from
+# the tree walker in output, error type or error line is reported with the program.
+#
+# Parameters are named by position, so inlined callees share names with their callers
+# (and now and then use one they don't have), and ints are now and then passed or
+# returned where a bool is expected, to exercise the inliner's renaming and coercions.
+#
+# usage: python jitfuzz.py [--seed N] [--programs N] [--show]
+
+import argparse
+import random
+import sys
+
+from interpreterv3 import Interpreter
+
+TYPES = ("int", "bool", "string", "Node")
+RETURN_TYPES = TYPES + ("void",)
+STRUCT = "struct Node { val: int; flag: bool; name: string; next: Node; }"
+FIELDS = {"val": "int", "flag": "bool", "name": "string", "next": "Node"}
+# (name, JIT threshold, inliner's max_nodes) of each run; the first is the reference,
+# the plain tree walker, and the others are compared with it
+MODES = (
+    ("tree walker", None, None),
+    ("inlined", None, Interpreter.INLINE_MAX_NODES),
+    ("threshold 1", 1, None),
+    ("threshold 3", 3, None),
+)
+MAX_STEPS = 200000
+
+
+class Generator:
+    def __init__(self, rng):
+        self.rng = rng
+        self.functions = []  # (name, [param types], return type) of those defined so far
+        self.names = 0
+
+    def program(self):
+        functions = [STRUCT]
+        for index in range(self.rng.randint(1, 5)):
+            functions.append(self.function(f"f{index}"))
+        functions.append(self.main())
+        return "\n".join(functions) + "\n"
+
+    def fresh(self):
+        self.names += 1
+        return f"v{self.names}"
+
+    def function(self, name):
+        params = [(f"p{index}", self.rng.choice(TYPES)) for index in range(self.rng.randint(0, 3))]
+        return_type = self.rng.choice(RETURN_TYPES)
+        scopes = [dict(params)]
+        body = self.block(scopes, return_type, depth=0)
+        if return_type != "void" and self.rng.random() < 0.8:
+            body.append(f"return {self.coerced(scopes, return_type, 2)};")
+        # only functions defined earlier are called, so there is no recursion
+        self.functions.append((name, [t for _, t in params], return_type))
+        signature = ", ".join(f"{p}: {t}" for p, t in params)
+        return f"func {name}({signature}): {return_type} {{\n" + "\n".join(body) + "\n}"
+
+    def main(self):
+        scopes = [{}]
+        body = self.block(scopes, "void", depth=0)
+        counter = self.fresh()
+        calls = []
+        # latest first, so that functions are first run from the functions calling them
+        for name, params, _ in reversed(self.functions):
+            args = ", ".join(self.coerced(scopes, t, 2) for t in params)
+            calls.append(f"{name}({args});")
+        body.append(f"var {counter}: int;")
+        body.append(f"for ({counter} = 0; {counter} < 4; {counter} = {counter} + 1) {{ {' '.join(calls)} }}")
+        return "func main(): void {\n" + "\n".join(body) + "\n}"
+
+    def block(self, scopes, return_type, depth):
+        scopes = scopes + [{}]
+        statements = []
+        for _ in range(self.rng.randint(1, 5)):
+            statements.append(self.statement(scopes, return_type, depth))
+        return statements
+
+    def statement(self, scopes, return_type, depth):
+        roll = self.rng.random()
+        if roll < 0.25:
+            var_type = self.rng.choice(TYPES)
+            name = self.fresh()
+            scopes[-1][name] = var_type
+            if self.rng.random() < 0.7:  # leave the rest at their defaults
+                return f"var {name}: {var_type}; {name} = {self.expr(scopes, var_type, 2)};"
+            return f"var {name}: {var_type};"
+        if roll < 0.45:
+            return f"print({', '.join(self.expr(scopes, self.rng.choice(TYPES), 2) for _ in range(self.rng.randint(1, 3)))});"
+        if roll < 0.6:
+            target = self.variable(scopes, self.rng.choice(TYPES))
+            if target is None:
+                return "print(\"none\");"
+            name, var_type = target
+            if var_type == "Node" and self.rng.random() < 0.5:
+                field = self.rng.choice(list(FIELDS))
+                return f"{name}.{field} = {self.expr(scopes, FIELDS[field], 2)};"
+            return f"{name} = {self.expr(scopes, var_type, 2)};"
+        if roll < 0.7 and depth < 2:
+            then = self.block(scopes, return_type, depth + 1)
+            text = f"if ({self.expr(scopes, self.rng.choice(('bool', 'int')), 2)}) {{ {' '.join(then)} }}"
+            if self.rng.random() < 0.5:
+                text += f" else {{ {' '.join(self.block(scopes, return_type, depth + 1))} }}"
+            return text
+        if roll < 0.8 and depth < 2:
+            counter = self.fresh()
+            scopes[-1][counter] = "int"
+            body = self.block(scopes, return_type, depth + 1)
+            return (f"var {counter}: int; for ({counter} = 0; {counter} < {self.rng.randint(0, 4)}; "
+                    f"{counter} = {counter} + 1) {{ {' '.join(body)} }}")
+        if roll < 0.85:
+            if return_type == "void":
+                return "return;"
+            return f"return {self.coerced(scopes, return_type, 2)};"
+        call = self.call(scopes, self.rng.choice(RETURN_TYPES))
+        return f"{call};" if call is not None else "print(\"no call\");"
+
+    # a variable of type t, or now and then of any type, or a parameter the function may
+    # not have, which an inlined copy mustn't find among its caller's
+    def variable(self, scopes, t):
+        if self.rng.random() < 0.04:
+            return f"p{self.rng.randint(0, 2)}", t
+        candidates = [(name, var_type) for scope in scopes for name, var_type in scope.items()
+                      if var_type == t or self.rng.random() < 0.03]
+        return self.rng.choice(candidates) if candidates else None
+
+    def call(self, scopes, t):
+        candidates = [f for f in self.functions if f[2] == t]
+        if not candidates:
+            return None
+        name, params, _ = self.rng.choice(candidates)
+        return f"{name}({', '.join(self.coerced(scopes, p, 1) for p in params)})"
+
+    # an expression of type t, or now and then an int where t is bool
+    def coerced(self, scopes, t, depth):
+        if t == "bool" and self.rng.random() < 0.2:
+            t = "int"
+        return self.expr(scopes, t, depth)
+
+    def expr(self, scopes, t, depth):
+        if self.rng.random() < 0.02:  # most likely ill-typed
+            t = self.rng.choice(TYPES)
+        roll = self.rng.random()
+        if depth > 0 and roll < 0.15:
+            call = self.call(scopes, t)
+            if call is not None:
+                return call
+        if roll < 0.45:
+            target = self.variable(scopes, t)
+            if target is not None:
+                return target[0]
+        nodes = [(name, var_type) for scope in scopes for name, var_type in scope.items() if var_type == "Node"]
+        if nodes and roll < 0.55:
+            field = self.rng.choice([f for f, field_type in FIELDS.items() if field_type == t] or list(FIELDS))
+            return f"{self.rng.choice(nodes)[0]}.{field}"
+        if depth == 0 or roll < 0.7:
+            return self.literal(t)
+        sub = depth - 1
+        if t == "int":
+            op = self.rng.choice(["+", "-", "*", "/", "neg"])
+            if op == "neg":
+                return f"-{self.expr(scopes, 'int', sub)}"
+            right = str(self.rng.randint(1, 5)) if op == "/" and self.rng.random() < 0.9 else self.expr(scopes, "int", sub)
+            return f"({self.expr(scopes, 'int', sub)} {op} {right})"
+        if t == "bool":
+            op = self.rng.choice(["<", "<=", ">", ">=", "==", "!=", "&&", "||", "!"])
+            if op == "!":
+                return f"!{self.expr(scopes, self.rng.choice(('bool', 'int')), sub)}"
+            if op in ("&&", "||"):
+                operand_types = ("bool", "int")
+            elif op in ("==", "!="):
+                operand_types = TYPES
+            else:
+                operand_types = ("int",)
+            left_type = self.rng.choice(operand_types)
+            right_type = left_type if self.rng.random() < 0.8 else self.rng.choice(operand_types)
+            return f"({self.expr(scopes, left_type, sub)} {op} {self.expr(scopes, right_type, sub)})"
+        if t == "string":
+            return f"({self.expr(scopes, 'string', sub)} + {self.expr(scopes, 'string', sub)})"
+        return self.literal(t)
+
+    def literal(self, t):
+        if t == "int":
+            return str(self.rng.randint(0, 9))
+        if t == "bool":
+            return self.rng.choice(["true", "false"])
+        if t == "string":
+            return f"\"{self.rng.choice(['', 'a', 'bc'])}\""
+        return self.rng.choice(["nil", "new Node"])
+
+
+# output, error type and error line of running program with the given JIT threshold and
+# inlining limit
+def run(program, threshold, max_nodes=None):
+    interpreter = Interpreter(console_output=False)
+    interpreter.jit_threshold = threshold
+    interpreter.inline_max_nodes = max_nodes
+    interpreter.set_limits(max_steps=MAX_STEPS)
+    error = None
+    try:
+        interpreter.run(program)
+    except Exception as e:
+        error_type, line = interpreter.get_error_type_and_line()
+        error = (error_type.name, line) if error_type is not None else (type(e).__name__, None)
+    entries = interpreter.jit.entries if interpreter.jit is not None else {}
+    compiled = sum(entry is not None for entry in entries.values())
+    return interpreter.get_output(), error, compiled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the v3 JIT and inliner with the tree walker on random programs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--programs", type=int, default=500)
+    parser.add_argument("--show", action="store_true", help="print the programs that differ")
+    args = parser.parse_args()
+
+    failures = 0
+    compiled = 0
+    budget = 0
+    for index in range(args.programs):
+        program = Generator(random.Random(args.seed * 1000003 + index)).program()
+        results = [run(program, threshold, max_nodes) for _, threshold, max_nodes in MODES]
+        expected = results[0]
+        if expected[1] is not None and expected[1][0] == "BUDGET_ERROR":
+            budget += 1  # budgets are charged per statement, so the output can stop elsewhere
+            continue
+        for (mode, _, _), result in zip(MODES[1:], results[1:]):
+            compiled += result[2]
+            if result[:2] != expected[:2]:
+                failures += 1
+                print(f"program {index}, {mode}: {expected[1]} vs {result[1]}")
+                if args.show:
+                    print(program)
+                    print(f"  tree walker: {expected[0]}")
+                    print(f"  {mode}: {result[0]}")
+                break
+    print(f"{args.programs} programs, {failures} differ, {budget} out of steps, {compiled} functions compiled")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
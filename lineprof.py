@@ -0,0 +1,142 @@
+# Line-level profiler for Brewin programs
+# Every AST node carries the source line it was parsed from, so timing each statement
+# the interpreter runs and filing it under that line gives a per-line profile. The
+# profiler replaces one interpreter instance's statement runner with a timing wrapper;
+# other instances, and runs without a profiler, are untouched.
+#
+# For each line it reports how many statements on it ran, their self time (excluding
+# statements nested inside them, such as a loop's body or the callee of a call) and
+# their total time (including them). A recursive call's time is only counted once in
+# the total of a line it re-enters.
+
+import argparse
+import sys
+import time
+
+import interpreterv1
+import interpreterv2
+import interpreterv3
+import interpreterv4
+
+INTERPRETERS = {
+    1: interpreterv1.Interpreter,
+    2: interpreterv2.Interpreter,
+    3: interpreterv3.Interpreter,
+    4: interpreterv4.Interpreter,
+}
+DEFAULT_VERSION = 3
+SORT_KEYS = ("line", "count", "self", "total")
+
+
+class LineProfiler:
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.counts = {}
+        self.self_times = {}
+        self.total_times = {}
+        self.running = {}  # line -> how many of its statements are on the stack
+        self.child_times = []  # time spent in nested statements, one entry per statement on the stack
+        # v3 and v4 run statements through a private method, v1 and v2 through a public one
+        if hasattr(type(interpreter), "_Interpreter__run_statement"):
+            self.method_name = "_Interpreter__run_statement"
+        else:
+            self.method_name = "run_statement"
+
+    # instance attributes shadow the class's method, including for the interpreter's own
+    # self.__run_statement(...) calls
+    def attach(self):
+        if hasattr(self.interpreter, "jit_threshold"):
+            self.interpreter.jit_threshold = None  # compiled functions run no statements
+        run_statement = getattr(self.interpreter, self.method_name)
+        counts = self.counts
+        self_times = self.self_times
+        total_times = self.total_times
+        running = self.running
+        child_times = self.child_times
+        clock = time.perf_counter
+
+        def profiled(statement, *args):
+            line = statement.line_num
+            running[line] = running.get(line, 0) + 1
+            child_times.append(0.0)
+            start = clock()
+            try:
+                return run_statement(statement, *args)
+            finally:
+                elapsed = clock() - start
+                nested = child_times.pop()
+                if child_times:
+                    child_times[-1] += elapsed
+                running[line] -= 1
+                counts[line] = counts.get(line, 0) + 1
+                self_times[line] = self_times.get(line, 0.0) + elapsed - nested
+                if not running[line]:
+                    total_times[line] = total_times.get(line, 0.0) + elapsed
+
+        setattr(self.interpreter, self.method_name, profiled)
+
+    def detach(self):
+        self.interpreter.__dict__.pop(self.method_name, None)
+
+    # (line, count, self seconds, total seconds) for every line that ran
+    def rows(self, sort="line"):
+        rows = [(line, self.counts[line], self.self_times[line], self.total_times.get(line, 0.0))
+                for line in self.counts]
+        if sort == "line":
+            rows.sort(key=lambda row: (row[0] is None, row[0] or 0))
+        else:
+            index = SORT_KEYS.index(sort)
+            rows.sort(key=lambda row: row[index], reverse=True)
+        return rows
+
+    def report(self, source, sort="line", file=sys.stdout):
+        lines = source.splitlines()
+        print(f"{'line':>6} {'count':>10} {'self ms':>10} {'total ms':>10}  source", file=file)
+        for line, count, self_time, total_time in self.rows(sort):
+            text = lines[line - 1].strip() if line and line <= len(lines) else ""
+            print(
+                f"{line if line is not None else '?':>6} {count:>10} "
+                f"{self_time * 1000:>10.3f} {total_time * 1000:>10.3f}  {text}",
+                file=file,
+            )
+
+
+# run a program under the profiler and return it along with the error raised, if any
+def profile(program, version=DEFAULT_VERSION, inp=None, console_output=True):
+    interpreter = INTERPRETERS[version](console_output=console_output, inp=inp)
+    profiler = LineProfiler(interpreter)
+    profiler.attach()
+    error = None
+    try:
+        interpreter.run(program)
+    except Exception as e:
+        error = e
+    finally:
+        profiler.detach()
+    return profiler, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count and time the statements on each line of a Brewin program")
+    parser.add_argument("program", help="source file to run")
+    parser.add_argument("--version", type=int, choices=sorted(INTERPRETERS), default=DEFAULT_VERSION)
+    parser.add_argument("--input", help="file whose lines are the program's input")
+    parser.add_argument("--sort", choices=SORT_KEYS, default="line")
+    args = parser.parse_args()
+
+    with open(args.program) as file:
+        source = file.read()
+    inp = None
+    if args.input is not None:
+        with open(args.input) as file:
+            inp = file.read().splitlines()
+
+    profiler, error = profile(source, args.version, inp)
+    if error is not None:
+        print(error, file=sys.stderr)
+    profiler.report(source, args.sort, file=sys.stderr)
+    return 1 if error is not None else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# Multi-file v3 programs
+# A source file can import others with `import "path";` statements before its structs
+# and functions; paths are relative to the directory of the file importing them (for a
+# program run from a string, the current directory). A module is loaded once however
+# many modules import it, and import cycles are allowed. The program's struct and
+# function tables are the union of every module's, in an order where a module comes
+# after the modules it imports, so that a struct can have fields of the struct types
+# they define. A struct, or a function name and arity (the function table's key),
+# defined by two modules is a NAME_ERROR, as a struct defined twice in one file is.
+#
+# The nodes of the linked program are numbered once across all its modules, main's
+# first and then each in the order it is loaded, so node ids (and the coverage indexed
+# by them, see brewcov.py) tell any two nodes of the program apart.
+#
+# With a cache directory, the parsed form of each module is kept there as an artifact
+# (see artifact.py) named by the SHA-256 of its source, the grammar's digest and the
+# artifact format, so that a build never reads an artifact another version wrote. Building
+# a program again only parses the modules that changed since, and the functions of the
+# others are only read from their artifacts when they are first called. Types are checked
+# on every build, over the whole program, since what a module's types mean depends on
+# the others.
+#
+#   interpreter.run_file("main.br", cache_dir=".brewin-cache")
+
+import hashlib
+import itertools
+import os
+
+import artifact
+from brewparse import parse_program
+from element import Element
+from intbase import ErrorType, InterpreterBase
+
+
+class Linker:
+    def __init__(self, interpreter, cache_dir=None):
+        self.interpreter = interpreter  # what errors are raised through
+        self.cache_dir = cache_dir
+        self.parsed = 0  # modules parsed from source
+        self.cached = 0  # modules read from the cache
+        self.next_node_id = 0  # where the next module's node ids start
+        self.modules = []  # (path, parsed module) of each module of the last link, in link order
+
+    # the program made of the module at path and every module it imports
+    def link_file(self, path):
+        path = os.path.realpath(path)
+        return self.__link(path, self.__module(path))
+
+    # the program made of ast, already parsed, and every module it imports from directory
+    def link(self, ast, directory=None):
+        # ast's nodes are numbered from 0, bottom-up, so each definition's node has the
+        # largest id of those in it
+        self.next_node_id = 1 + max((node.node_id for key in ("structs", "functions", "imports")
+                                     for node in ast.get(key)), default=-1)
+        return self.__link(os.path.join(os.path.realpath(directory or os.getcwd()), "<program>"), ast)
+
+    def __link(self, path, ast):
+        modules = self.modules = []
+        self.__visit(path, ast, modules, {path})
+        structs, functions = [], []
+        struct_modules, function_modules = {}, {}
+        for module_path, module in modules:
+            for struct_def in module.get("structs"):
+                name = struct_def.get("name")
+                self.__check_unique(struct_modules, name, module_path, f"type {name}", struct_def)
+                structs.append(struct_def)
+            for func_def in module.get("functions"):
+                name, num_params = func_def.get("name"), len(func_def.get("args"))
+                self.__check_unique(function_modules, (name, num_params), module_path,
+                                    f"function {name} taking {num_params} params", func_def)
+                functions.append(func_def)
+        return Element(InterpreterBase.PROGRAM_NODE, structs=structs, functions=functions, imports=[])
+
+    # add the modules path imports, and then path's, to modules
+    def __visit(self, path, ast, modules, seen):
+        directory = os.path.dirname(path)
+        for import_def in ast.get("imports"):
+            target = os.path.realpath(os.path.join(directory, import_def.get("path")))
+            if target in seen:
+                continue
+            seen.add(target)
+            if not os.path.isfile(target):
+                self.interpreter.error(ErrorType.NAME_ERROR, f"Module {import_def.get('path')} not found",
+                                       import_def.line_num)
+            self.__visit(target, self.__module(target), modules, seen)
+        modules.append((path, ast))
+
+    # a module defining key in another module is an error; the struct table would keep
+    # one of them and the function table the other
+    def __check_unique(self, owners, key, module_path, description, definition):
+        owner = owners.setdefault(key, module_path)
+        if owner != module_path:
+            self.interpreter.error(
+                ErrorType.NAME_ERROR,
+                f"Duplicate definition for {description} in {os.path.basename(owner)} and {os.path.basename(module_path)}",
+                definition.line_num,
+            )
+
+    # the parsed module at path, from the cache if it is there
+    def __module(self, path):
+        with open(path, "rb") as file:
+            source = file.read()
+        if self.cache_dir is None:
+            self.parsed += 1
+            return self.__parse(source)
+        key = hashlib.sha256(artifact.GRAMMAR_DIGEST + artifact.FORMAT_VERSION.to_bytes(2, "little") + source)
+        cached_path = os.path.join(self.cache_dir, key.hexdigest() + ".brc")
+        if os.path.exists(cached_path):
+            self.cached += 1
+            module = artifact.Artifact(cached_path, self.next_node_id)
+            self.next_node_id += module.node_count
+            return Element(InterpreterBase.PROGRAM_NODE, structs=module.struct_defs(), functions=module.func_defs(),
+                           imports=module.imports())
+        self.parsed += 1
+        first_node_id = self.next_node_id
+        ast = self.__parse(source)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # written under another name first, so that a build that stops midway can't
+        # leave a partial artifact for the next one to read
+        partial_path = f"{cached_path}.{os.getpid()}"
+        artifact.write(partial_path, ast.get("structs"), ast.get("functions"), ast.get("imports"), first_node_id)
+        os.replace(partial_path, cached_path)
+        return ast
+
+    def __parse(self, source):
+        node_ids = itertools.count(self.next_node_id)
+        ast = parse_program(source.decode(), node_ids=node_ids)
+        self.next_node_id = next(node_ids)
+        return ast
@@ -0,0 +1,58 @@
+# Pools of reusable interpreter instances
+# For a tiny program, building the interpreter costs about as much as running the
+# program. An InterpreterPool keeps instances that have finished a run and hands them
+# out again after reset(), which every interpreter version extends to clear all of a
+# run's state: output, input cursor, errors, limits, scopes, and the struct and
+# function tables. Operator tables and constant values are built once per class and
+# can't be changed (see Interpreter.OP_TO_LAMBDA and ConstantValue), so runs sharing
+# them can't affect one another.
+#
+#   pool = InterpreterPool(interpreterv3.Interpreter)
+#   with pool.interpreter(inp=["5"], max_steps=10**6) as interpreter:
+#       interpreter.run(program)
+#       output = interpreter.get_output()
+#
+# A pool isn't thread-safe; give each thread, or each worker process, its own.
+
+import contextlib
+
+
+class InterpreterPool:
+    def __init__(self, interpreter_class, max_idle=16, host_functions=None):
+        self.interpreter_class = interpreter_class
+        self.host_functions = host_functions  # a host.HostFunctions for every v3 instance
+        self.max_idle = max_idle  # released instances beyond this many are dropped
+        self.idle = []
+        self.created = 0
+        self.reused = 0
+
+    # an instance in the state a new one would be in, reading its input from inp
+    def acquire(self, inp=None, console_output=False, max_steps=None, max_seconds=None, max_memory_kb=None):
+        if self.idle:
+            interpreter = self.idle.pop()
+            interpreter.console_output = console_output
+            interpreter.inp = inp
+            interpreter.set_tracer(None)
+            self.reused += 1
+        else:
+            interpreter = self.interpreter_class(console_output=console_output, inp=inp)
+            if self.host_functions is not None:
+                interpreter.host_functions = self.host_functions
+            self.created += 1
+        interpreter.set_limits(max_steps, max_seconds, max_memory_kb)
+        return interpreter
+
+    # return an instance for reuse, whether its run succeeded or failed; it is reset
+    # straight away, so that it doesn't keep the run's heap alive while it is idle
+    def release(self, interpreter):
+        if len(self.idle) < self.max_idle:
+            interpreter.reset()
+            self.idle.append(interpreter)
+
+    @contextlib.contextmanager
+    def interpreter(self, inp=None, **options):
+        interpreter = self.acquire(inp, **options)
+        try:
+            yield interpreter
+        finally:
+            self.release(interpreter)
@@ -0,0 +1,188 @@
+# Interactive read-eval-print loop for the v3 language
+# A single Interpreter instance stays warm for the whole session: the parser tables are
+# built once, every func/struct entered is merged into the interpreter's tables, and
+# statements run against one persistent global scope.
+# Only the text typed at the prompt is parsed, never the earlier input.
+
+import re
+import sys
+import time
+
+from brewparse import parse_program
+from intbase import InterpreterBase
+from interpreterv3 import Interpreter
+from type_valuev2 import Type, get_printable
+
+
+class Repl:
+    PROMPT = "brewin> "
+    CONTINUATION_PROMPT = "......> "
+    # statements are wrapped in this function so that the program grammar accepts them
+    SESSION_FUNC = "__repl__"
+    # input starting with one of these keywords (not just their letters, as in
+    # function_count) is a definition
+    DEFINITION = re.compile(r"(func|struct)\b")
+    STATEMENT_NODES = {
+        "=",
+        InterpreterBase.INDEX_ASSIGN_NODE,
+        InterpreterBase.VAR_DEF_NODE,
+        InterpreterBase.IF_NODE,
+        InterpreterBase.FOR_NODE,
+        InterpreterBase.RETURN_NODE,
+    }
+
+    def __init__(self, interpreter=None, show_timing=False):
+        self.interpreter = interpreter if interpreter is not None else Interpreter()
+        self.interpreter.start_session()
+        self.show_timing = show_timing
+
+    # handle one complete chunk of input; returns the printable result of a bare
+    # expression, or None for definitions and statements
+    def execute(self, text):
+        stripped = text.strip()
+        if not stripped:
+            return None
+        if Repl.DEFINITION.match(stripped):
+            self.__define(text)
+            return None
+
+        # keep the wrapper on the same line so error lines match what was typed
+        if stripped.endswith(";") or stripped.endswith("}"):
+            ast = parse_program(f"func {Repl.SESSION_FUNC}() {{ {text} }}")
+            statements = self.__session_statements(ast)
+            self.__check_no_return(statements)
+            self.interpreter.exec_statements(statements)
+            return None
+
+        # no terminator: a bare expression whose value is echoed back
+        ast = parse_program(f"func {Repl.SESSION_FUNC}() {{ {text}; }}")
+        statements = self.__session_statements(ast)
+        if len(statements) != 1 or statements[0].elem_type in Repl.STATEMENT_NODES:
+            self.__check_no_return(statements)
+            self.interpreter.exec_statements(statements)
+            return None
+        return self.__printable(self.interpreter.eval_expression(statements[0]))
+
+    def __define(self, text):
+        # the program grammar needs at least one function after the structs
+        ast = parse_program(f"{text}\nfunc {Repl.SESSION_FUNC}() {{ return; }}")
+        ast.dict["functions"] = [
+            func for func in ast.get("functions") if func.get("name") != Repl.SESSION_FUNC
+        ]
+        self.interpreter.define(ast)
+
+    def __session_statements(self, ast):
+        return ast.get("functions")[0].get("statements")
+
+    # there is no function for a return typed at the prompt to return from, so refuse
+    # it before anything runs, rather than run up to it and report its value's type
+    def __check_no_return(self, statements):
+        pending = list(statements)
+        while pending:
+            statement = pending.pop()
+            if statement.elem_type == InterpreterBase.RETURN_NODE:
+                raise Exception(f"return is only allowed inside a function (line {statement.line_num})")
+            for key in ("statements", "else_statements"):
+                pending.extend(statement.get(key) or ())
+
+    def __printable(self, value):
+        if value is None or value.type() == Type.VOID:
+            return None
+        if value.type() == Type.NIL or value.value() is None:
+            return "nil"
+        printable = get_printable(value)
+        if printable is None:
+            return f"<{value.type()} object>"
+        return printable
+
+    # input is complete once every brace and parenthesis opened on earlier lines is closed
+    @staticmethod
+    def is_complete(text):
+        depth = 0
+        in_string = False
+        i = 0
+        while i < len(text):
+            c = text[i]
+            if in_string:
+                in_string = c != '"'
+            elif c == '"':
+                in_string = True
+            elif text.startswith("/*", i):
+                end = text.find("*/", i + 2)
+                if end == -1:
+                    return False
+                i = end + 1
+            elif c in "({":
+                depth += 1
+            elif c in ")}":
+                depth -= 1
+            i += 1
+        return depth <= 0 and not in_string
+
+    # `:save <file>` checkpoints the session, `:load <file>` replaces it with a checkpoint
+    def __snapshot_command(self, command):
+        parts = command.split(None, 1)
+        if len(parts) != 2:
+            print(f"usage: {parts[0]} <file>", file=sys.stderr)
+            return
+        action, path = parts
+        try:
+            if action == ":save":
+                with open(path, "wb") as file:
+                    self.interpreter.save_snapshot(file)
+            else:
+                with open(path, "rb") as file:
+                    self.interpreter.load_snapshot(file)
+        except Exception as e:
+            print(e, file=sys.stderr)
+
+    def loop(self):
+        buffer = ""
+        while True:
+            try:
+                line = input(Repl.CONTINUATION_PROMPT if buffer else Repl.PROMPT)
+            except EOFError:
+                print()
+                return
+            except KeyboardInterrupt:
+                print()
+                buffer = ""
+                continue
+
+            if not buffer and line.strip() in (":quit", ":q"):
+                return
+            if not buffer and line.strip() == ":time":
+                self.show_timing = not self.show_timing
+                continue
+            if not buffer and line.strip().split(None, 1)[:1] in ([":save"], [":load"]):
+                self.__snapshot_command(line.strip())
+                continue
+
+            buffer += line + "\n"
+            if not Repl.is_complete(buffer):
+                continue
+            text, buffer = buffer, ""
+
+            start = time.perf_counter()
+            try:
+                result = self.execute(text)
+                if result is not None:
+                    print(result)
+            except SyntaxError:
+                pass  # the parser has already reported the offending token
+            except Exception as e:
+                print(e, file=sys.stderr)
+            finally:
+                # the repl echoes as it goes, so don't let the log grow for the whole session
+                self.interpreter.output_log.clear()
+            if self.show_timing:
+                print(f"({(time.perf_counter() - start) * 1000:.2f} ms)")
+
+
+def main():
+    show_timing = "--time" in sys.argv[1:]
+    Repl(show_timing=show_timing).loop()
+
+
+if __name__ == "__main__":
+    main()
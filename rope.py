@@ -0,0 +1,58 @@
+# Strings built by repeated concatenation
+# `s = s + t` on Python strs copies s every time, so building a string in a loop is
+# quadratic in its final length. A Rope records the pieces in a list shared with the
+# rope it was built from and joins them only when the text itself is needed (printing,
+# prompts, == and !=). Appending to the newest rope on a list is O(1); extending an
+# older one copies its pieces into a new list first, so branching is still correct.
+
+# shorter results stay plain strs, where copying is cheaper than keeping the pieces
+ROPE_THRESHOLD = 256
+
+
+class Rope:
+    __slots__ = ("parts", "count", "length", "text")
+
+    def __init__(self, parts, count, length):
+        self.parts = parts  # may hold more pieces than this rope, appended by later ropes
+        self.count = count
+        self.length = length
+        self.text = None
+
+    def __str__(self):
+        if self.text is None:
+            self.text = "".join(self.parts[: self.count])
+        return self.text
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        if isinstance(other, (str, Rope)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+
+def concat(left, right):
+    if type(right) is Rope:
+        right = str(right)
+    if type(left) is Rope and type(right) is str:
+        if not right:
+            return left
+        parts = left.parts
+        if left.count != len(parts):
+            parts = parts[: left.count]
+        parts.append(right)
+        return Rope(parts, left.count + 1, left.length + len(right))
+    if type(left) is str and type(right) is str and len(left) + len(right) >= ROPE_THRESHOLD:
+        return Rope([left, right], 2, len(left) + len(right))
+    return left + right
+
+
+# the plain str for a string value, which may be a Rope
+def flatten(value):
+    if type(value) is Rope:
+        return str(value)
+    return value
@@ -0,0 +1,312 @@
+# Checkpoints of v3 interpreter state
+# A snapshot holds everything a new Interpreter needs to carry on where another one
+# stopped: the environment stacks, every Value, UserObject, ArrayObject and MapObject reachable
+# from them (with sharing preserved, so two variables naming one object still name one
+# object), the struct and function tables, the input list and cursor, the output log, and the main
+# statements still to run after a `checkpoint();`.
+#
+# Values and objects are written to flat tables that refer to each other by index.
+# Encoding and decoding are single passes over those tables with no recursion, so the
+# cost is linear in the size of the heap and long struct chains can't hit the
+# recursion limit the way pickling the objects directly would. The tables themselves
+# are then pickled. The cyclic garbage collector is paused meanwhile; otherwise its
+# passes over the freshly allocated tables make large snapshots quadratic.
+#
+# The function definitions and the pending statements go in a node table the same way:
+# each node's type, line, id and attributes, with the nodes an attribute holds replaced
+# by their indexes. Function bodies not parsed yet (see brewparse.LazyFunction) are
+# parsed or read from their artifact first, so a snapshot needs neither the source nor
+# the artifact file to load.
+
+import gc
+import pickle
+
+from element import Element
+from env_v2 import EnvironmentManager
+from type_valuev2 import ArrayObject, MapObject, Type, UserObject, Value
+
+FORMAT_VERSION = 4
+# 1 is 2 without arrays, 2 is 3 without maps, 3 is 4 with the functions and statements pickled as they are
+READABLE_FORMATS = (1, 2, 3, 4)
+
+# how a Value's payload is stored in the value table
+PLAIN = 0  # an int, bool, str, None or other picklable payload
+OBJECT = 1  # index into the object table
+NESTED = 2  # index into the value table (a Value wrapping another Value)
+ARRAY = 3  # index into the array table
+MAP = 4  # index into the map table
+
+# arrays whose elements are stored unboxed, and pickled as they are; the elements of
+# other (struct) arrays are Values, stored as value indexes
+UNBOXED_ELEMENTS = (Type.INT, Type.BOOL, Type.STRING)
+
+
+# a node in a node attribute, by its index in the node table
+class _NodeRef(int):
+    __slots__ = ()
+
+
+class _Encoder:
+    def __init__(self):
+        # the tables are stored by column, which pickles faster and smaller than a
+        # list per entry
+        self.value_types = []
+        self.value_kinds = []
+        self.value_payloads = []
+        self.object_names = []
+        self.object_shapes = []  # index into shapes
+        self.object_fields = []  # value index of each field, for every object in turn
+        self.shapes = []  # field name tuples, shared by objects with the same fields
+        self.array_types = []  # element type of every array
+        self.array_items = []  # its storage, or value indexes for struct arrays
+        self.map_types = []  # (key type, value type) of every map
+        self.map_items = []  # its dict, or a dict of value indexes for maps of references
+        self.node_types = []
+        self.node_lines = []
+        self.node_numbers = []  # node_id of every node
+        self.node_attributes = []  # its dict, with _NodeRefs for the nodes in it
+        self.value_ids = {}
+        self.object_ids = {}
+        self.array_ids = {}
+        self.map_ids = {}
+        self.shape_ids = {}
+        self.node_ids = {}
+        self.pending = []
+
+    def value(self, value):
+        index = self.value_ids.get(id(value))
+        if index is None:
+            index = self.value_ids[id(value)] = len(self.value_ids)
+            self.pending.append(value)
+        return index
+
+    def object(self, obj):
+        index = self.object_ids.get(id(obj))
+        if index is None:
+            index = self.object_ids[id(obj)] = len(self.object_ids)
+            self.pending.append(obj)
+        return index
+
+    def array(self, array):
+        index = self.array_ids.get(id(array))
+        if index is None:
+            index = self.array_ids[id(array)] = len(self.array_ids)
+            self.pending.append(array)
+        return index
+
+    def map(self, hash_map):
+        index = self.map_ids.get(id(hash_map))
+        if index is None:
+            index = self.map_ids[id(hash_map)] = len(self.map_ids)
+            self.pending.append(hash_map)
+        return index
+
+    def node(self, elem):
+        index = self.node_ids.get(id(elem))
+        if index is None:
+            index = self.node_ids[id(elem)] = len(self.node_ids)
+            self.pending.append(elem)
+        return index
+
+    # a node attribute, with the nodes in it, and in its lists and tuples, as _NodeRefs
+    def attribute(self, value):
+        if isinstance(value, Element):
+            return _NodeRef(self.node(value))
+        if isinstance(value, (list, tuple)):
+            return type(value)(self.attribute(item) for item in value)
+        return value
+
+    # write out everything handed an index by value(), object(), array(), map() and node(); the queue is
+    # worked through in order, so each table's entries are appended in index order
+    def drain(self):
+        next_item = 0
+        while next_item < len(self.pending):
+            item = self.pending[next_item]
+            next_item += 1
+            if isinstance(item, Element):
+                attributes = item.dict  # parses a lazy function's body
+                self.node_types.append(item.elem_type)
+                self.node_lines.append(item.line_num)
+                self.node_numbers.append(item.node_id)
+                self.node_attributes.append({key: self.attribute(value) for key, value in attributes.items()})
+                continue
+            if isinstance(item, UserObject):
+                shape = tuple(item.v)
+                if shape not in self.shape_ids:
+                    self.shape_ids[shape] = len(self.shapes)
+                    self.shapes.append(shape)
+                self.object_names.append(item.name)
+                self.object_shapes.append(self.shape_ids[shape])
+                self.object_fields.extend([self.value(field) for field in item.v.values()])
+                continue
+            if isinstance(item, ArrayObject):
+                self.array_types.append(item.elem_type)
+                if item.elem_type in UNBOXED_ELEMENTS:
+                    self.array_items.append(item.items)
+                else:
+                    self.array_items.append([self.value(element) for element in item.items])
+                continue
+            if isinstance(item, MapObject):
+                self.map_types.append((item.key_type, item.value_type))
+                if item.value_type in MapObject.UNBOXED:
+                    self.map_items.append(item.items)
+                else:
+                    self.map_items.append({key: self.value(value) for key, value in item.items.items()})
+                continue
+            self.value_types.append(item.t)
+            if isinstance(item.v, UserObject):
+                self.value_kinds.append(OBJECT)
+                self.value_payloads.append(self.object(item.v))
+            elif isinstance(item.v, ArrayObject):
+                self.value_kinds.append(ARRAY)
+                self.value_payloads.append(self.array(item.v))
+            elif isinstance(item.v, MapObject):
+                self.value_kinds.append(MAP)
+                self.value_payloads.append(self.map(item.v))
+            elif isinstance(item.v, Value):
+                self.value_kinds.append(NESTED)
+                self.value_payloads.append(self.value(item.v))
+            else:
+                self.value_kinds.append(PLAIN)
+                self.value_payloads.append(item.v)
+
+
+class _Decoder:
+    def __init__(self, state):
+        # allocate every shell first so that entries can refer forwards as well as back
+        self.values = [Value.__new__(Value) for _ in state["value_types"]]
+        self.objects = [UserObject.__new__(UserObject) for _ in state["object_names"]]
+        self.arrays = [ArrayObject.__new__(ArrayObject) for _ in state.get("array_types", ())]
+        self.maps = [MapObject.__new__(MapObject) for _ in state.get("map_types", ())]
+        values = self.values
+        objects = self.objects
+        arrays = self.arrays
+        maps = self.maps
+        for value, t, kind, payload in zip(values, state["value_types"], state["value_kinds"], state["value_payloads"]):
+            value.t = t
+            if kind == OBJECT:
+                value.v = objects[payload]
+            elif kind == NESTED:
+                value.v = values[payload]
+            elif kind == ARRAY:
+                value.v = arrays[payload]
+            elif kind == MAP:
+                value.v = maps[payload]
+            else:
+                value.v = payload
+        shapes = state["shapes"]
+        fields = state["object_fields"]
+        offset = 0
+        for obj, name, shape in zip(objects, state["object_names"], state["object_shapes"]):
+            field_names = shapes[shape]
+            obj.name = name
+            obj.v = {field: values[index] for field, index in zip(field_names, fields[offset:offset + len(field_names)])}
+            offset += len(field_names)
+        for array, elem_type, items in zip(arrays, state.get("array_types", ()), state.get("array_items", ())):
+            array.elem_type = elem_type
+            array.items = items if elem_type in UNBOXED_ELEMENTS else [values[index] for index in items]
+        for hash_map, (key_type, value_type), items in zip(maps, state.get("map_types", ()), state.get("map_items", ())):
+            hash_map.key_type = key_type
+            hash_map.value_type = value_type
+            hash_map.items = items if value_type in MapObject.UNBOXED else {key: values[index] for key, index in items.items()}
+        self.nodes = [Element(elem_type) for elem_type in state.get("node_types", ())]
+        for node, line_num, node_id, attributes in zip(self.nodes, state.get("node_lines", ()),
+                                                       state.get("node_numbers", ()), state.get("node_attributes", ())):
+            node.line_num = line_num
+            node.node_id = node_id
+            node.dict = {key: self.attribute(value) for key, value in attributes.items()}
+
+    def attribute(self, value):
+        if type(value) is _NodeRef:
+            return self.nodes[value]
+        if isinstance(value, (list, tuple)):
+            return type(value)(self.attribute(item) for item in value)
+        return value
+
+
+def _without_gc(func):
+    def wrapper(*args):
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return func(*args)
+        finally:
+            if enabled:
+                gc.enable()
+
+    return wrapper
+
+
+@_without_gc
+def save(interpreter, file):
+    encoder = _Encoder()
+    environment = [
+        [{symbol: encoder.value(value) for symbol, value in block.items()} for block in frame]
+        for frame in interpreter.env.environment
+    ]
+    user_types = {name: encoder.object(obj) for name, obj in interpreter.default_user_types.items()}
+    functions = {name: {num_params: encoder.node(func_def) for num_params, func_def in overloads.items()}
+                 for name, overloads in interpreter.func_name_to_ast.items()}
+    pending_statements = [encoder.node(statement) for statement in interpreter.pending_statements]
+    encoder.drain()
+
+    state = {
+        "format": FORMAT_VERSION,
+        "value_types": encoder.value_types,
+        "value_kinds": encoder.value_kinds,
+        "value_payloads": encoder.value_payloads,
+        "object_names": encoder.object_names,
+        "object_shapes": encoder.object_shapes,
+        "object_fields": encoder.object_fields,
+        "shapes": encoder.shapes,
+        "array_types": encoder.array_types,
+        "array_items": encoder.array_items,
+        "map_types": encoder.map_types,
+        "map_items": encoder.map_items,
+        "node_types": encoder.node_types,
+        "node_lines": encoder.node_lines,
+        "node_numbers": encoder.node_numbers,
+        "node_attributes": encoder.node_attributes,
+        "environment": environment,
+        "user_types": user_types,
+        "user_type_names": interpreter.valid_user_types_names,
+        "user_type_fields": interpreter.user_types_fields,
+        "functions": functions,
+        "pending_statements": pending_statements,
+        "inp": interpreter.inp,
+        "input_cursor": interpreter.input_cursor,
+        "output_log": interpreter.output_log,
+    }
+    pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+# replace the interpreter's state with the snapshot's; its limits and console settings stay
+@_without_gc
+def load(interpreter, file):
+    state = pickle.load(file)
+    if state.get("format") not in READABLE_FORMATS:
+        raise ValueError(f"Unsupported snapshot format {state.get('format')}")
+
+    decoder = _Decoder(state)
+    values = decoder.values
+    interpreter.env = EnvironmentManager()
+    interpreter.env.environment = [
+        [{symbol: values[index] for symbol, index in block.items()} for block in frame]
+        for frame in state["environment"]
+    ]
+    interpreter.default_user_types = {name: decoder.objects[index] for name, index in state["user_types"].items()}
+    interpreter.valid_user_types_names = state["user_type_names"]
+    interpreter.user_types_fields = state["user_type_fields"]
+    if state["format"] < 4:
+        interpreter.func_name_to_ast = state["functions"]
+        interpreter.pending_statements = state["pending_statements"]
+    else:
+        nodes = decoder.nodes
+        interpreter.func_name_to_ast = {
+            name: {num_params: nodes[index] for num_params, index in overloads.items()}
+            for name, overloads in state["functions"].items()
+        }
+        interpreter.pending_statements = [nodes[index] for index in state["pending_statements"]]
+    interpreter.inp = state["inp"]
+    interpreter.input_cursor = state["input_cursor"]
+    interpreter.output_log = state["output_log"]
@@ -1,4 +1,7 @@
+from array import array
+
 from intbase import InterpreterBase
+from rope import flatten
 
 
 # Enumerated type for our different language data types
@@ -41,6 +44,144 @@ class Value:
         
         return None
 
+# A Value shared by every instance and run, such as Interpreter.NIL_VALUE, which
+# nothing may change
+class ConstantValue(Value):
+    def __init__(self, type, value=None):
+        object.__setattr__(self, "t", type)
+        object.__setattr__(self, "v", value if value is not None else self.default_value(type))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"constant {self.t} value can't be changed")
+
+
+# Array types are written and stored as their element type followed by [], e.g. "int[]"
+def array_type(elem_type):
+    return elem_type + "[]"
+
+
+# the element type of array type t, or None if t isn't an array type
+def element_type(t):
+    if isinstance(t, str) and t.endswith("[]") and not t.startswith("map["):
+        return t[:-2]
+    return None
+
+
+# Map types are written and stored as "map[" key type "]" value type, e.g.
+# "map[string]int" or "map[int]Node[]"
+def map_type(key_type, value_type):
+    return f"map[{key_type}]{value_type}"
+
+
+# the (key type, value type) of map type t, or None if t isn't a map type
+def map_types(t):
+    if isinstance(t, str) and t.startswith("map["):
+        close = t.index("]")
+        return t[4:close], t[close + 1:]
+    return None
+
+
+# map keys are ints or strings
+MAP_KEY_TYPES = (Type.INT, Type.STRING)
+
+
+# whether t names a primitive type, one of existing_user_types, an array of either, or
+# a map from int or string keys to any known type
+def known_type(t, existing_user_types):
+    key_value = map_types(t)
+    if key_value is not None:
+        return key_value[0] in MAP_KEY_TYPES and known_type(key_value[1], existing_user_types)
+    elem_type = element_type(t)
+    if elem_type is not None:
+        t = elem_type
+    return t in ["int", "bool", "string"] or t in existing_user_types
+
+
+# A fixed-length array of elem_type elements. Elements are kept unboxed where their
+# type allows: ints in an array('q'), which becomes a list if a value doesn't fit in
+# 64 bits, bools as bytes of a bytearray, and the payloads of strings and the Values of
+# struct references in lists. Indexes are checked by the interpreter
+class ArrayObject:
+    def __init__(self, elem_type, length):
+        self.elem_type = elem_type
+        if elem_type == Type.INT:
+            self.items = array("q", bytes(8 * length))
+        elif elem_type == Type.BOOL:
+            self.items = bytearray(length)
+        elif elem_type == Type.STRING:
+            self.items = [""] * length
+        else:  # struct references start out nil
+            self.items = [Value(Type.NIL, None)] * length
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, index):
+        if self.elem_type == Type.INT:
+            return Value(Type.INT, self.items[index])
+        if self.elem_type == Type.BOOL:
+            return Value(Type.BOOL, self.items[index] == 1)
+        if self.elem_type == Type.STRING:
+            return Value(Type.STRING, self.items[index])
+        return self.items[index]
+
+    # value has been checked against elem_type already
+    def set(self, index, value):
+        if self.elem_type == Type.INT:
+            try:
+                self.items[index] = value.value()
+            except OverflowError:
+                self.items = list(self.items)
+                self.items[index] = value.value()
+        elif self.elem_type == Type.BOOL:
+            self.items[index] = value.value()
+        elif self.elem_type == Type.STRING:
+            self.items[index] = value.value()
+        else:
+            self.items[index] = value
+
+
+# A hash map from int or string keys to value_type values, backed by a dict, so that
+# get, put, contains and delete are O(1) and keys iterate in the order they were first
+# put (a deleted key that is put again goes to the end). Keys are plain ints and strs;
+# values are kept unboxed for primitive value types, and as Values otherwise
+class MapObject:
+    UNBOXED = (Type.INT, Type.BOOL, Type.STRING)
+
+    def __init__(self, key_type, value_type):
+        self.key_type = key_type
+        self.value_type = value_type
+        self.items = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    # the value stored under key as a Value, or None if there is none
+    def get(self, key):
+        payload = self.items.get(key, MapObject)
+        if payload is MapObject:
+            return None
+        if self.value_type in MapObject.UNBOXED:
+            return Value(self.value_type, payload)
+        return payload
+
+    # value has been checked against value_type already
+    def put(self, key, value):
+        self.items[key] = value.value() if self.value_type in MapObject.UNBOXED else value
+
+    # the keys in iteration order, as a new array
+    def keys(self):
+        keys = ArrayObject(self.key_type, 0)
+        if self.key_type == Type.INT:
+            try:
+                keys.items = array("q", self.items)
+            except OverflowError:
+                keys.items = list(self.items)
+        else:
+            keys.items = list(self.items)
+        return keys
+
+
 #might need to modify this function to handle user objects
 def create_value(val):
     if val == InterpreterBase.TRUE_DEF:
@@ -63,7 +204,7 @@ def get_printable(val): #TO DO
     if val.type() == Type.INT:
         return str(val.value())
     if val.type() == Type.STRING:
-        return val.value()
+        return flatten(val.value())
     if val.type() == Type.BOOL:
         if val.value() is True:
             return "true"
@@ -87,7 +228,7 @@ class UserObject:
         for field in fields:
             field_name = field.get("name")
             field_type = field.get("var_type")
-            if field_type not in ["int", "bool", "string"] and field_type not in existing_user_types:
+            if not known_type(field_type, existing_user_types):
                 raise ValueError(f"Invalid field type '{field_type}' for field '{field_name}'.")
 
             # Initialize with default values based on type
@@ -97,7 +238,7 @@ class UserObject:
                 self.v[field_name] = Value(Type.BOOL, False)
             elif field_type == "string":
                 self.v[field_name] = Value(Type.STRING, "")
-            else:  # user-defined struct types, default to None (nil)
+            else:  # user-defined struct, array and map types, default to None (nil)
                 self.v[field_name] = Value(Type.NIL, None)
 
     def set_val(self, field_name, value, existing_user_types=[]):
@@ -107,7 +248,7 @@ class UserObject:
         # Retrieve the expected field type
         expected_type = self.v[field_name].type()
         #check for type mismatch
-        if expected_type not in ["int", "bool", "string", "nil"] and expected_type not in existing_user_types:
+        if not known_type(expected_type, existing_user_types) and expected_type != "nil":
             return False  
         if expected_type  in ["int", "bool", "string"]:
             if expected_type != value.type():
@@ -134,7 +275,7 @@ def create_user_object(name, values=[], existing_user_types=[]):
             field_name = field.get("name")
             field_type = field.get("var_type")
             # Validate the field type
-            if field_type not in ["int", "bool", "string"] and field_type not in existing_user_types:
+            if not known_type(field_type, existing_user_types):
                 return False
             # Initialize default values for primitive types
             if field_type == "int":
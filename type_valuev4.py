@@ -1,4 +1,5 @@
 from intbase import InterpreterBase
+from rope import flatten
 
 
 # Enumerated type for our different language data types
@@ -59,6 +60,17 @@ class Value:
         return self.t
 
 
+# A Value shared by every instance and run, such as Interpreter.NIL_VALUE, which
+# nothing may change
+class ConstantValue(Value):
+    def __init__(self, type, value=None):
+        object.__setattr__(self, "t", type)
+        object.__setattr__(self, "v", value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"constant {self.t} value can't be changed")
+
+
 def create_value(val):
     if val == InterpreterBase.TRUE_DEF:
         return Value(Type.BOOL, True)
@@ -82,7 +94,7 @@ def get_printable(val):
     if val.type() == Type.INT:
         return str(val.value())
     if val.type() == Type.STRING:
-        return val.value()
+        return flatten(val.value())
     if val.type() == Type.BOOL:
         if val.value() is True:
             return "true"